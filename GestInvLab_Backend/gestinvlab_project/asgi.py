@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestinvlab_project.settings')
 
-application = get_asgi_application()
+
+class GestInvLabASGIHandler(ASGIHandler):
+    """ Bajo ASGI los endpoints de lectura los atienden las vistas async (urls_asgi.py) """
+    urlconf = 'gestinvlab_project.urls_asgi'
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+
+# Equivale a get_asgi_application() con el handler propio
+django.setup(set_prefix=False)
+application = GestInvLabASGIHandler()
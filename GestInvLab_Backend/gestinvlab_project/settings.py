@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que la latencia medida incluya todo el resto de la cadena
+    'inventory.middleware.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -82,6 +84,54 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Con varios procesos (WEB_CONCURRENCY > 1 en gunicorn/uvicorn) la caché debe
+# ser compartida: la versión del catálogo se incrementa con cada entrada o
+# salida, y con una caché por proceso los demás seguirían sirviendo stock y
+# ETags viejos. CACHE_REDIS_URL (p. ej. redis://127.0.0.1:6379/1) usa Redis;
+# sin ella, la memoria del proceso (solo para un proceso: runserver, pruebas).
+# El check inventory.E001 impide arrancar varios procesos con caché local.
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+            'KEY_PREFIX': 'gestinvlab',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gestinvlab',
+        }
+    }
+
+# Procesos que atienden peticiones (la misma variable que leen gunicorn y uvicorn)
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+# Segundos que una respuesta de catálogo (insumos, servicios, usuarios)
+# puede quedar en caché; las escrituras la invalidan antes (inventory/cache.py)
+CATALOGO_CACHE_TIMEOUT = int(os.getenv('CATALOGO_CACHE_TIMEOUT', '300'))
+
+# Números de documento (ENT-/SAL-) que cada proceso reserva de una vez.
+# 1 = un número por documento, en orden de registro (solo dejan huecos los
+# documentos que fallan después de validarse, ver inventory/secuencias.py); con bloques mayores cada proceso toma números sin consultar
+# la base, a cambio de más huecos al reiniciarse.
+DOCUMENTO_BLOQUE_SECUENCIA = int(os.getenv('DOCUMENTO_BLOQUE_SECUENCIA', '1'))
+
+# Caché de tokens de la API en cada proceso: segundos de vigencia y máximo de entradas
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', '300'))
+TOKEN_CACHE_MAX = int(os.getenv('TOKEN_CACHE_MAX', '1000'))
+
+# Peticiones que tardan al menos estos milisegundos se registran en el logger 'inventory.lentas'
+SOLICITUD_LENTA_MS = int(os.getenv('SOLICITUD_LENTA_MS', '1000'))
+# Si se define, /metrics exige la cabecera 'Authorization: Bearer <METRICAS_TOKEN>'
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -126,8 +176,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        # Autenticación por Token
-        'rest_framework.authentication.TokenAuthentication',
+        # Autenticación por Token (con caché token -> usuario, ver inventory/authentication.py)
+        'inventory.authentication.CachedTokenAuthentication',
 
         # Autenticación de sesión 
         'rest_framework.authentication.SessionAuthentication', 
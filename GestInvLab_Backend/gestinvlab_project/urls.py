@@ -2,10 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 
 
-from inventory.views import CustomAuthToken
+from inventory.views import CustomAuthToken, metricas_prometheus
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/inventory/', include('inventory.urls')), 
     path('api-token-auth/', CustomAuthToken.as_view()),
+    path('metrics', metricas_prometheus),
 ]
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+URLconf para el despliegue ASGI (ver asgi.py): los endpoints de lectura
+de inventory/urls_async.py van primero y toman precedencia; el resto de
+las rutas son las mismas de urls.py.
+"""
+from django.urls import path, include
+
+from .urls import urlpatterns as urlpatterns_wsgi
+
+urlpatterns = [
+    path('api/inventory/', include('inventory.urls_async')),
+] + urlpatterns_wsgi
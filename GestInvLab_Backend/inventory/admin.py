@@ -1,8 +1,33 @@
 from django.contrib import admin
-from .models import Servicio, Insumo, Lote, Movimiento, Detalle_Movimiento
+from .models import Servicio, Insumo, Lote, Movimiento, Detalle_Movimiento, ConsumoDiario, AlertaInventario, GeneracionAlertas, CorteStock, CorteStockLote, SecuenciaDocumento, MovimientoArchivado, DetalleMovimientoArchivado, AnioArchivado, ContadorVersion
+
+
+class SoloLecturaAdmin(admin.ModelAdmin):
+    """
+    Tablas que mantiene el sistema (contadores, secuencias, archivo, cortes,
+    resúmenes y snapshots): se pueden consultar, pero editarlas a mano las
+    descuadraría con los movimientos.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(Servicio)
 admin.site.register(Insumo)
 admin.site.register(Lote)
 admin.site.register(Movimiento)
-admin.site.register(Detalle_Movimiento)
\ No newline at end of file
+admin.site.register(Detalle_Movimiento)
+admin.site.register(
+    [
+        ConsumoDiario, AlertaInventario, GeneracionAlertas, CorteStock, CorteStockLote, SecuenciaDocumento,
+        MovimientoArchivado, DetalleMovimientoArchivado, AnioArchivado, ContadorVersion,
+    ],
+    SoloLecturaAdmin,
+)
@@ -0,0 +1,140 @@
+"""
+Motor de alertas de inventario: insumos en o bajo su umbral crítico y lotes
+con stock que vencen dentro de N días. Cada tipo de alerta es una sola
+consulta agregada sobre todo el catálogo, nunca una consulta por insumo.
+
+Un insumo está en stock crítico cuando su stock vigente es menor o igual
+que umbral_critico (la misma regla que la tabla de stock del frontend);
+umbral_critico=0 desactiva la alerta.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AlertaInventario, GeneracionAlertas, Insumo, Lote
+
+
+def calcular_alertas(dias, hoy=None):
+    hoy = hoy or timezone.localdate()
+
+    # Stock vigente = lotes sin caducidad o que aún no vencen (GROUP BY insumo)
+    vigente = Q(lotes__fecha_caducidad__isnull=True) | Q(lotes__fecha_caducidad__gte=hoy)
+    criticos = (
+        Insumo.objects
+        .filter(umbral_critico__gt=0)
+        .annotate(stock_vigente=Coalesce(Sum('lotes__stock_por_lote', filter=vigente), Value(0)))
+        .filter(stock_vigente__lte=F('umbral_critico'))
+        .order_by('stock_vigente', 'nombre')
+        .values('id', 'nombre', 'codigo_producto', 'stock_total', 'stock_vigente', 'umbral_critico')
+    )
+
+    # Lotes con stock que vencen hasta hoy + dias (incluye los ya vencidos)
+    por_vencer = (
+        Lote.objects
+        .filter(stock_por_lote__gt=0, fecha_caducidad__lte=hoy + timedelta(days=dias))
+        .order_by('fecha_caducidad', 'id')
+        .values('id', 'numero_lote', 'fecha_caducidad', 'stock_por_lote',
+                'insumo_id', 'insumo__nombre', 'insumo__codigo_producto')
+    )
+
+    return {
+        'generado_en': timezone.now(),
+        'dias': dias,
+        'stock_critico': [
+            {
+                'insumo_id': fila['id'],
+                'insumo_nombre': fila['nombre'],
+                'insumo_codigo': fila['codigo_producto'],
+                'stock_total': fila['stock_total'],
+                'stock_vigente': fila['stock_vigente'],
+                'umbral_critico': fila['umbral_critico'],
+            }
+            for fila in criticos
+        ],
+        'por_vencer': [
+            {
+                'lote_id': fila['id'],
+                'lote_numero': fila['numero_lote'],
+                'insumo_id': fila['insumo_id'],
+                'insumo_nombre': fila['insumo__nombre'],
+                'insumo_codigo': fila['insumo__codigo_producto'],
+                'stock_por_lote': fila['stock_por_lote'],
+                'fecha_caducidad': fila['fecha_caducidad'],
+                'dias_restantes': (fila['fecha_caducidad'] - hoy).days,
+            }
+            for fila in por_vencer
+        ],
+    }
+
+
+def guardar_snapshot(resultado):
+    """ Reemplaza la foto anterior de alertas (cabecera y filas) por `resultado`, atómicamente """
+    filas = [
+        AlertaInventario(
+            tipo='stock_critico', insumo_id=alerta['insumo_id'], stock=alerta['stock_vigente'],
+            umbral_critico=alerta['umbral_critico'], dias_aviso=resultado['dias'],
+            generado_en=resultado['generado_en'],
+        )
+        for alerta in resultado['stock_critico']
+    ] + [
+        AlertaInventario(
+            tipo='por_vencer', insumo_id=alerta['insumo_id'], lote_id=alerta['lote_id'],
+            stock=alerta['stock_por_lote'], fecha_caducidad=alerta['fecha_caducidad'],
+            dias_aviso=resultado['dias'], generado_en=resultado['generado_en'],
+        )
+        for alerta in resultado['por_vencer']
+    ]
+    with transaction.atomic():
+        AlertaInventario.objects.all().delete()
+        GeneracionAlertas.objects.all().delete()
+        GeneracionAlertas.objects.create(generado_en=resultado['generado_en'], dias_aviso=resultado['dias'])
+        AlertaInventario.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def ultima_generacion():
+    """ Cabecera de la última foto guardada por generar_alertas, o None si nunca se generó """
+    return GeneracionAlertas.objects.order_by('-generado_en').first()
+
+
+def leer_snapshot(generacion):
+    """ Foto de 'generacion' (ver ultima_generacion), con la misma forma que calcular_alertas() """
+    filas = list(
+        AlertaInventario.objects
+        .order_by('tipo', 'fecha_caducidad', 'stock', 'id')
+        .values('tipo', 'stock', 'umbral_critico', 'fecha_caducidad', 'dias_aviso', 'generado_en',
+                'insumo_id', 'insumo__nombre', 'insumo__codigo_producto', 'insumo__stock_total',
+                'lote_id', 'lote__numero_lote')
+    )
+    generado_en = generacion.generado_en
+    return {
+        'generado_en': generado_en,
+        'dias': generacion.dias_aviso,
+        'stock_critico': [
+            {
+                'insumo_id': fila['insumo_id'],
+                'insumo_nombre': fila['insumo__nombre'],
+                'insumo_codigo': fila['insumo__codigo_producto'],
+                'stock_total': fila['insumo__stock_total'],
+                'stock_vigente': fila['stock'],
+                'umbral_critico': fila['umbral_critico'],
+            }
+            for fila in filas if fila['tipo'] == 'stock_critico'
+        ],
+        'por_vencer': [
+            {
+                'lote_id': fila['lote_id'],
+                'lote_numero': fila['lote__numero_lote'],
+                'insumo_id': fila['insumo_id'],
+                'insumo_nombre': fila['insumo__nombre'],
+                'insumo_codigo': fila['insumo__codigo_producto'],
+                'stock_por_lote': fila['stock'],
+                'fecha_caducidad': fila['fecha_caducidad'],
+                'dias_restantes': (fila['fecha_caducidad'] - timezone.localdate(generado_en)).days,
+            }
+            for fila in filas if fila['tipo'] == 'por_vencer'
+        ],
+    }
@@ -1,8 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
 
     def ready(self):
-        import inventory.signals
\ No newline at end of file
+        import inventory.checks
+        import inventory.signals
+        from .metricas import instrumentar_conexion
+
+        # Consultas SQL por petición para las métricas (ver metricas.py)
+        connection_created.connect(instrumentar_conexion, dispatch_uid='inventory.metricas')
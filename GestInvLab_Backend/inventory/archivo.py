@@ -0,0 +1,155 @@
+"""
+Archivo del historial de movimientos de años cerrados.
+
+Movimiento y Detalle_Movimiento crecen sin límite y los reportes, la
+exportación y los índices se vuelven más lentos cada año. 'manage.py
+archivar_movimientos' mueve los años cerrados (anteriores al actual) a
+MovimientoArchivado y DetalleMovimientoArchivado por lotes de movimientos:
+cada lote se copia con INSERT ... SELECT (mismos id) y se borra de las tablas
+vivas en una sola transacción, así que el comando se puede interrumpir y
+retomar donde quedó.
+
+El borrado es SQL directo, sin el ORM ni signals.py: archivar no anula
+movimientos, así que ConsumoDiario, los CorteStock y el stock de los lotes
+no cambian. Lo que lee el ledger completo (historico.py, conciliar_stock_lotes,
+reconstruir_consumo_diario) suma las dos tablas con detalles_ledger().
+
+Las tablas de archivo usan los mismos nombres de campo que las vivas, así que
+los mismos filtros sirven para ambas. Los reportes solo consultan el archivo
+si el rango de fechas empieza antes de limite_archivo(), el 1 de enero
+siguiente al último año archivado (o en curso); si no, leen solo las tablas vivas.
+"""
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import AnioArchivado, Detalle_Movimiento, DetalleMovimientoArchivado, Movimiento, MovimientoArchivado
+
+VIVAS = (Movimiento, Detalle_Movimiento)
+ARCHIVO = (MovimientoArchivado, DetalleMovimientoArchivado)
+
+
+def inicio_del_anio(anio):
+    return timezone.make_aware(datetime(anio, 1, 1))
+
+
+def _limite(anio):
+    return inicio_del_anio(anio + 1) if anio is not None else None
+
+
+def limite_archivo():
+    """ Antes de esta fecha puede haber movimientos archivados (None si el archivo está vacío) """
+    return _limite(AnioArchivado.objects.aggregate(anio=Max('anio'))['anio'])
+
+
+async def alimite_archivo():
+    """ Igual que limite_archivo(), con el ORM async (ver views_async.py) """
+    return _limite((await AnioArchivado.objects.aaggregate(anio=Max('anio')))['anio'])
+
+
+def _sin_archivo(desde):
+    # Solo se archivan años cerrados: un rango que empieza este año no lo necesita (ni se consulta)
+    return desde is not None and desde >= inicio_del_anio(timezone.localdate().year)
+
+
+def tablas(desde, limite):
+    """ [(modelo de movimientos, modelo de detalles)] que pueden tener movimientos con fecha_registro >= desde """
+    if limite is not None and (desde is None or desde < limite):
+        return [VIVAS, ARCHIVO]
+    return [VIVAS]
+
+
+def tablas_para(desde=None):
+    return [VIVAS] if _sin_archivo(desde) else tablas(desde, limite_archivo())
+
+
+async def atablas_para(desde=None):
+    return [VIVAS] if _sin_archivo(desde) else tablas(desde, await alimite_archivo())
+
+
+def detalles_ledger(desde=None, **filtros):
+    """
+    Querysets de detalles con movimiento__fecha_registro >= desde (None: todos)
+    y los filtros dados: el de Detalle_Movimiento y, si el rango lo necesita,
+    el de DetalleMovimientoArchivado.
+    """
+    if desde is not None:
+        filtros['movimiento__fecha_registro__gte'] = desde
+    return [detalle.objects.filter(**filtros) for _, detalle in tablas_para(desde)]
+
+
+def _copiar(origen, destino, columna, ids):
+    """ INSERT INTO destino SELECT ... FROM origen WHERE columna IN ids; devuelve las filas copiadas """
+    qn = connection.ops.quote_name
+    columnas = ", ".join(qn(campo.column) for campo in destino._meta.concrete_fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO {} ({}) SELECT {} FROM {} WHERE {} IN ({})".format(
+                qn(destino._meta.db_table), columnas, columnas,
+                qn(origen._meta.db_table), qn(columna), ", ".join(["%s"] * len(ids)),
+            ),
+            ids,
+        )
+        return cursor.rowcount
+
+
+def _borrar(modelo, columna, ids):
+    """ DELETE directo: sin signals (no se descuenta ConsumoDiario ni se invalidan cortes) """
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM {} WHERE {} IN ({})".format(qn(modelo._meta.db_table), qn(columna), ", ".join(["%s"] * len(ids))),
+            ids,
+        )
+        return cursor.rowcount
+
+
+def archivar_lote(anio, tamano=2000):
+    """
+    Mueve al archivo los 'tamano' movimientos de menor id del año (con sus
+    detalles) en una transacción. Devuelve (movimientos, detalles) movidos;
+    (0, 0) cuando el año ya no tiene movimientos vivos.
+    """
+    with transaction.atomic():
+        # Bloqueados: nadie puede agregarles detalles entre la copia y el borrado
+        ids = list(
+            Movimiento.objects.select_for_update()
+            .filter(fecha_registro__gte=inicio_del_anio(anio), fecha_registro__lt=inicio_del_anio(anio + 1))
+            .order_by('id').values_list('id', flat=True)[:tamano]
+        )
+        if not ids:
+            return 0, 0
+        movimientos = _copiar(Movimiento, MovimientoArchivado, 'id', ids)
+        detalles = _copiar(Detalle_Movimiento, DetalleMovimientoArchivado, 'movimiento_id', ids)
+        _borrar(Detalle_Movimiento, 'movimiento_id', ids)
+        _borrar(Movimiento, 'id', ids)
+        AnioArchivado.objects.filter(anio=anio).update(
+            movimientos=F('movimientos') + movimientos, detalles=F('detalles') + detalles
+        )
+    return movimientos, detalles
+
+
+def archivar_anio(anio, tamano=2000, progreso=None):
+    """
+    Archiva un año cerrado completo, lote a lote. Si se interrumpe, volver a
+    llamarla sigue con lo que quedó en las tablas vivas. Devuelve el AnioArchivado.
+    'progreso', si se indica, recibe (movimientos, detalles) tras cada lote.
+    """
+    if anio >= timezone.localdate().year:
+        raise ValueError(f"Solo se archivan años cerrados; {anio} no ha terminado.")
+    # Se registra (y se confirma) antes de mover nada: desde ahora los reportes consultan el archivo
+    registro, _ = AnioArchivado.objects.get_or_create(anio=anio)
+    while True:
+        movimientos, detalles = archivar_lote(anio, tamano)
+        if not movimientos:
+            break
+        if progreso:
+            progreso(movimientos, detalles)
+    registro.refresh_from_db()
+    if not registro.completo:
+        registro.completo = True
+        registro.completado_en = timezone.now()
+        registro.save(update_fields=['completo', 'completado_en'])
+    return registro
@@ -0,0 +1,99 @@
+"""
+Autenticación por token con caché en el proceso.
+
+TokenAuthentication de DRF consulta authtoken_token JOIN auth_user en cada
+petición. CachedTokenAuthentication guarda token -> (usuario, token) en un
+LRU en memoria con vencimiento (TOKEN_CACHE_TTL segundos, TOKEN_CACHE_MAX
+entradas), así que con la caché caliente autenticar no toca la base de datos.
+
+Invalidación (desde signals.py): guardar o eliminar un usuario (p. ej.
+AdminUserDetailView al cambiar is_active o is_staff) y eliminar un token
+borran sus entradas del proceso e incrementan la versión de ese usuario en
+la caché de Django (como las de cache.py); cada entrada guarda la versión
+de su usuario y se descarta si cambió. Con varios procesos la caché es
+compartida (check inventory.E001), así que la revocación llega a todos en
+la siguiente petición, sin tocar las entradas de los demás usuarios.
+Cada petición recibe su propia copia del usuario en caché.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import invalidar_version, version_catalogo
+
+# key -> (usuario, token, vence_en, versión del usuario), del menos al más usado
+_tokens = OrderedDict()
+_lock = threading.Lock()
+
+
+def clave_usuario(user_id):
+    """ Clave de la versión del usuario en la caché de Django """
+    return f'auth:usuario:{user_id}'
+
+
+def obtener(key):
+    """ (usuario, token) en caché para key, o None si no está, venció o cambió su usuario """
+    with _lock:
+        entrada = _tokens.get(key)
+        if entrada is not None and entrada[2] < time.monotonic():
+            del _tokens[key]
+            entrada = None
+    if entrada is None:
+        return None
+    usuario, token, _, version = entrada
+    if version_catalogo(clave_usuario(usuario.pk)) != version:
+        with _lock:
+            if _tokens.get(key) is entrada:
+                del _tokens[key]
+        return None
+    with _lock:
+        if key in _tokens:
+            _tokens.move_to_end(key)
+    # Quien autentica puede modificar el usuario (p. ej. last_login): no el de la caché
+    return copy.copy(usuario), token
+
+
+def guardar(key, usuario, token):
+    # La versión se lee después de la consulta; invalidar_version() la vuelve a
+    # incrementar al confirmar, así que un usuario leído antes del commit queda obsoleto
+    version = version_catalogo(clave_usuario(usuario.pk))
+    with _lock:
+        _tokens[key] = (copy.copy(usuario), token, time.monotonic() + settings.TOKEN_CACHE_TTL, version)
+        _tokens.move_to_end(key)
+        while len(_tokens) > settings.TOKEN_CACHE_MAX:
+            _tokens.popitem(last=False)
+
+
+def invalidar_usuario(user_id):
+    with _lock:
+        for key in [key for key, entrada in _tokens.items() if entrada[0].pk == user_id]:
+            del _tokens[key]
+    invalidar_version(clave_usuario(user_id))
+
+
+def invalidar_token(key_eliminada, user_id):
+    with _lock:
+        _tokens.pop(key_eliminada, None)
+    # Los demás procesos lo descartan por la versión de su usuario
+    invalidar_version(clave_usuario(user_id))
+
+
+def limpiar():
+    with _lock:
+        _tokens.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ TokenAuthentication con la caché de este módulo; mismas respuestas de error """
+
+    def authenticate_credentials(self, key):
+        entrada = obtener(key)
+        if entrada is not None:
+            return entrada
+        usuario, token = super().authenticate_credentials(key)
+        guardar(key, usuario, token)
+        return usuario, token
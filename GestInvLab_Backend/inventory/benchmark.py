@@ -0,0 +1,211 @@
+"""
+Benchmark de los endpoints de inventory/urls.py con presupuesto de consultas SQL.
+
+Cada caso declara cuántas consultas puede hacer su endpoint como máximo, con
+la caché de catálogos invalidada (el peor caso). ejecutar_benchmark() siembra un volumen base de
+datos sintéticos (datos_sinteticos.py), mide cada caso, multiplica el volumen
+y lo vuelve a medir. Es una infracción:
+- superar el presupuesto declarado;
+- hacer más consultas con más filas (N+1: el número debe ser constante);
+- que una URL de inventory/urls.py no tenga caso.
+La latencia (p50/p95/p99) se mide con la caché ya caliente, como en uso normal.
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import urls
+from .busqueda import invalidar_indice_codigos
+from .cache import invalidar_catalogo
+from .datos_sinteticos import sembrar
+from .models import Insumo, Lote, Movimiento, Servicio
+
+
+def percentil(latencias, p):
+    """ latencias ordenadas """
+    if not latencias:
+        return 0
+    return latencias[min(len(latencias) - 1, int(len(latencias) * p))]
+
+
+def casos(contexto):
+    """
+    Un caso por operación de cada URL: (url_name, método, presupuesto, staff, preparar).
+    preparar(n) devuelve (ruta, datos) para la n-ésima petición; las escrituras
+    usan n para no repetir claves únicas.
+    """
+    insumo_id = contexto['insumo_id']
+    usuario_id = contexto['usuario_id']
+    hoy = timezone.localdate()
+    fecha = (hoy - timedelta(days=30)).isoformat()
+    ruta = reverse
+
+    return [
+        # --- Lectura ---
+        ('insumo-list', 'get', 1, False, lambda n: (ruta('inventory:insumo-list'), None)),
+        ('insumo-buscar', 'get', 3, False, lambda n: (f"{ruta('inventory:insumo-buscar')}?q=SIN&limite=20", None)),
+        ('servicio-list', 'get', 1, False, lambda n: (ruta('inventory:servicio-list'), None)),
+        ('lote-list', 'get', 1, False, lambda n: (f"{ruta('inventory:lote-list')}?insumo_id={insumo_id}", None)),
+        ('user-list', 'get', 1, False, lambda n: (ruta('inventory:user-list'), None)),
+        ('arranque', 'get', 4, False, lambda n: (ruta('inventory:arranque'), None)),
+        ('cambios', 'get', 3, False, lambda n: (ruta('inventory:cambios'), None)),
+        # --- Escritura ---
+        # La salida lee sus lotes dos veces: sin bloqueo antes de reservar el número y con FOR UPDATE
+        ('movimiento-create', 'post', 19, False, lambda n: (ruta('inventory:movimiento-create'), {
+            'servicio_destino': contexto['servicio_id'],
+            'detalles': [{'insumo_id': insumo_id, 'cantidad': 1}],
+        })),
+        ('entrada-create', 'post', 19, False, lambda n: (ruta('inventory:entrada-create'), {
+            'detalles': [{'insumo_id': insumo_id, 'numero_lote': f"BENCH-{n}", 'cantidad': 10}],
+        })),
+        # --- Reportes ---
+        # Un rango que empieza antes de este año consulta además el límite del archivo
+        # (archivo.py): los sin fecha_inicio siempre, los de hace 30 días en enero
+        ('reporte-movimientos', 'get', 3, False, lambda n: (f"{ruta('inventory:reporte-movimientos')}?page_size=100", None)),
+        ('reporte-movimientos-agrupado', 'get', 2, False, lambda n: (
+            f"{ruta('inventory:reporte-movimientos-agrupado')}?group_by={('insumo', 'servicio', 'month')[n % 3]}&fecha_inicio={fecha}", None)),
+        ('reporte-movimientos-exportar', 'get', 2, False, lambda n: (
+            f"{ruta('inventory:reporte-movimientos-exportar')}?fecha_inicio={fecha}", None)),
+        ('reporte-consumo', 'get', 1, False, lambda n: (f"{ruta('inventory:reporte-consumo')}?periodo=mes", None)),
+        ('reporte-stock-historico', 'get', 4, False, lambda n: (
+            f"{ruta('inventory:reporte-stock-historico')}?fecha={fecha}&insumo_id={insumo_id}", None)),
+        ('alertas', 'get', 2, False, lambda n: (f"{ruta('inventory:alertas')}?en_vivo=1", None)),
+        # --- Administración ---
+        ('admin-insumos', 'get', 1, True, lambda n: (ruta('inventory:admin-insumos'), None)),
+        ('admin-insumos', 'post', 2, True, lambda n: (ruta('inventory:admin-insumos'), {
+            'nombre': f"Insumo benchmark {n}", 'codigo_producto': f"BENCH-{n}", 'umbral_critico': 5,
+        })),
+        ('admin-servicios', 'get', 1, True, lambda n: (ruta('inventory:admin-servicios'), None)),
+        ('admin-servicios', 'post', 2, True, lambda n: (ruta('inventory:admin-servicios'), {'nombre': f"Servicio benchmark {n}"})),
+        ('admin-insumos-importar', 'post', 4, True, lambda n: (ruta('inventory:admin-insumos-importar'), {
+            'archivo': f"codigo_producto,nombre,umbral_critico\nBENCH-IMP-{n},Importado {n},1\n",
+        })),
+        ('admin-insumo-detail', 'patch', 2, True, lambda n: (
+            ruta('inventory:admin-insumo-detail', args=[insumo_id]), {'umbral_critico': n % 50})),
+        ('admin-usuarios', 'get', 1, True, lambda n: (ruta('inventory:admin-usuarios'), None)),
+        ('admin-usuarios', 'post', 3, True, lambda n: (ruta('inventory:admin-usuarios'), {
+            'username': f"benchmark-{n}", 'password': 'clave-benchmark-123', 'is_staff': False,
+        })),
+        ('admin-usuario-detail', 'patch', 3, True, lambda n: (
+            ruta('inventory:admin-usuario-detail', args=[usuario_id]), {'is_active': True})),
+    ]
+
+
+def _contexto():
+    # Un insumo sintético con stock, para que las salidas se puedan despachar
+    lote = Lote.objects.filter(stock_por_lote__gt=0, insumo__codigo_producto__startswith='SIN').order_by('-stock_por_lote').first()
+    return {
+        'insumo_id': lote.insumo_id,
+        'servicio_id': Servicio.objects.filter(nombre__startswith='Servicio ').order_by('id').values_list('id', flat=True)[0],
+        'usuario_id': User.objects.filter(username__startswith='sin-usuario-').order_by('id').values_list('id', flat=True)[0],
+    }
+
+
+class _Peticiones:
+    """ Clientes con token (el usuario normal y el staff) y un contador global para las claves únicas """
+
+    def __init__(self):
+        self.clientes = {}
+        for staff in (False, True):
+            usuario, _ = User.objects.get_or_create(username=f"benchmark-{'staff' if staff else 'usuario'}", defaults={'is_staff': staff})
+            token, _ = Token.objects.get_or_create(user=usuario)
+            cliente = APIClient()
+            cliente.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            self.clientes[staff] = cliente
+        self.n = 0
+
+    def hacer(self, metodo, staff, preparar):
+        self.n += 1
+        ruta, datos = preparar(self.n)
+        cliente = self.clientes[staff]
+        if metodo == 'get':
+            respuesta = cliente.get(ruta)
+        elif isinstance(datos, dict) and 'archivo' in datos:
+            respuesta = cliente.post(ruta, datos['archivo'], content_type='text/csv')
+        else:
+            respuesta = getattr(cliente, metodo)(ruta, datos, format='json')
+        # Consumir respuestas en streaming (exportar CSV) para medir el trabajo completo
+        if getattr(respuesta, 'streaming', False):
+            b''.join(respuesta.streaming_content)
+        return respuesta
+
+
+def medir(peticiones, repeticiones=20):
+    """ Mide todos los casos sobre los datos actuales. Devuelve una fila por caso. """
+    resultados = []
+    for url_name, metodo, presupuesto, staff, preparar in casos(_contexto()):
+        # Peor caso: catálogos sin caché (los tokens de autenticación sí siguen en caché)
+        peticiones.hacer(metodo, staff, preparar)
+        invalidar_catalogo()
+        invalidar_indice_codigos()
+        # Con DEBUG=True el registro de consultas puede estar lleno (maxlen) tras la siembra
+        reset_queries()
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = peticiones.hacer(metodo, staff, preparar)
+        # Contar ya: las peticiones siguientes vacían connection.queries
+        consultas = len(capturadas)
+        latencias = []
+        errores = 0 if respuesta.status_code < 400 else 1
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            respuesta = peticiones.hacer(metodo, staff, preparar)
+            latencias.append(time.perf_counter() - inicio)
+            errores += respuesta.status_code >= 400
+        latencias.sort()
+        resultados.append({
+            'endpoint': url_name,
+            'metodo': metodo.upper(),
+            'presupuesto': presupuesto,
+            'consultas': consultas,
+            'errores': errores,
+            'p50_ms': round(percentil(latencias, 0.50) * 1000, 3),
+            'p95_ms': round(percentil(latencias, 0.95) * 1000, 3),
+            'p99_ms': round(percentil(latencias, 0.99) * 1000, 3),
+        })
+    return resultados
+
+
+def urls_sin_caso():
+    con_caso = {caso[0] for caso in casos({'insumo_id': 0, 'servicio_id': 0, 'usuario_id': 0})}
+    return sorted({patron.name for patron in urls.urlpatterns} - con_caso)
+
+
+def ejecutar_benchmark(volumen, factor=4, repeticiones=20, semilla=0):
+    """
+    Siembra 'volumen' (argumentos de sembrar()), mide, siembra factor-1 veces más
+    y vuelve a medir. Devuelve el informe: {'volumenes', 'mediciones', 'infracciones'}.
+    """
+    volumenes = []
+    mediciones = []
+    peticiones = None
+    for ronda in range(2):
+        prefijos = ['SIN'] if ronda == 0 else [f"SIN{i}" for i in range(1, factor)]
+        for prefijo in prefijos:
+            sembrar(prefijo=prefijo, semilla=semilla + len(volumenes), **volumen)
+        volumenes.append({
+            'insumos': Insumo.objects.count(),
+            'lotes': Lote.objects.count(),
+            'movimientos': Movimiento.objects.count(),
+        })
+        peticiones = peticiones or _Peticiones()
+        mediciones.append(medir(peticiones, repeticiones))
+
+    infracciones = [f"{url_name}: sin caso de benchmark" for url_name in urls_sin_caso()]
+    for base, grande in zip(*mediciones):
+        nombre = f"{base['metodo']} {base['endpoint']}"
+        if grande['consultas'] > grande['presupuesto']:
+            infracciones.append(f"{nombre}: {grande['consultas']} consultas, presupuesto {grande['presupuesto']}")
+        if grande['consultas'] > base['consultas']:
+            infracciones.append(
+                f"{nombre}: las consultas crecen con el volumen ({base['consultas']} -> {grande['consultas']})"
+            )
+        if base['errores'] or grande['errores']:
+            infracciones.append(f"{nombre}: {base['errores'] + grande['errores']} respuesta(s) con error")
+    return {'volumenes': volumenes, 'mediciones': mediciones, 'infracciones': infracciones}
@@ -0,0 +1,78 @@
+"""
+Búsqueda de insumos para los selects con autocompletado (typeahead).
+
+Orden de los resultados, hasta 'limite':
+1. Códigos que empiezan por el texto: índice en memoria de cada proceso
+   (lista ordenada de códigos en minúsculas + bisect), sin consultar la base de datos.
+2. Nombres que empiezan por el texto: LIKE 'texto%' sobre insumo_nombre_idx.
+3. Nombre o código que contienen el texto: LIKE '%texto%', que recorre la tabla,
+   así que solo se ejecuta si los pasos anteriores no completaron el límite.
+
+El índice de códigos se reconstruye cuando cambia su versión en la caché de
+Django, que se incrementa al crear, editar, eliminar o importar insumos (no
+con los cambios de stock, que no tocan los códigos). Comprobarla en cada
+búsqueda no consulta la base de datos; con varios procesos la caché es
+compartida (check inventory.E001), así que ninguno sigue con un índice obsoleto.
+"""
+import threading
+from bisect import bisect_left
+
+from django.db.models import Q
+
+from .cache import invalidar_version, version_catalogo
+from .models import Insumo
+
+VERSION_CODIGOS_KEY = 'catalogo:codigos:version'
+
+# (versión, códigos en minúsculas ordenados, filas en el mismo orden); se reemplaza completo
+_indice = (None, [], [])
+_lock = threading.Lock()
+
+
+def invalidar_indice_codigos():
+    invalidar_version(VERSION_CODIGOS_KEY)
+
+
+def _indice_codigos():
+    global _indice
+    # Antes de leer los códigos: un cambio concurrente deja el índice con la versión anterior
+    version = version_catalogo(VERSION_CODIGOS_KEY)
+    if _indice[0] == version:
+        return _indice
+    with _lock:
+        if _indice[0] != version:
+            filas = sorted(
+                (codigo.lower(), {'id': pk, 'nombre': nombre, 'codigo_producto': codigo})
+                for pk, nombre, codigo in Insumo.objects.order_by().values_list('id', 'nombre', 'codigo_producto')
+            )
+            _indice = (version, [clave for clave, _ in filas], [fila for _, fila in filas])
+        return _indice
+
+
+def buscar_por_codigo(prefijo, limite):
+    """ Insumos cuyo código empieza por 'prefijo' (sin distinguir mayúsculas), en orden de código """
+    _, claves, filas = _indice_codigos()
+    prefijo = prefijo.lower()
+    resultados = []
+    i = bisect_left(claves, prefijo)
+    while i < len(claves) and len(resultados) < limite and claves[i].startswith(prefijo):
+        resultados.append(filas[i])
+        i += 1
+    return resultados
+
+
+def buscar_insumos(texto, limite):
+    """ [{'id', 'nombre', 'codigo_producto'}] que coinciden con 'texto', sin repetidos """
+    resultados = buscar_por_codigo(texto, limite)
+    consultas = (
+        Insumo.objects.filter(nombre__istartswith=texto).order_by('nombre'),
+        Insumo.objects.filter(Q(nombre__icontains=texto) | Q(codigo_producto__icontains=texto)).order_by('nombre'),
+    )
+    for consulta in consultas:
+        if len(resultados) >= limite:
+            break
+        vistos = [fila['id'] for fila in resultados]
+        resultados.extend(
+            consulta.exclude(id__in=vistos).values('id', 'nombre', 'codigo_producto')[:limite - len(resultados)]
+        )
+    return resultados
@@ -0,0 +1,117 @@
+"""
+Caché de las respuestas de catálogo (insumos, servicios, usuarios).
+
+Las claves incluyen un contador de versión del catálogo: cualquier escritura
+(admin, entradas, salidas) llama a invalidar_catalogo(), que incrementa el
+contador y deja huérfanas todas las entradas anteriores, sin tener que
+recorrerlas. Las respuestas incluyen stock_total, así que el contador tiene
+que ser el mismo para todos los procesos: con varios, la caché debe ser
+compartida (CACHE_REDIS_URL, ver settings.py y el check de checks.py).
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .renderers import renderizar_json
+
+VERSION_KEY = 'catalogo:version'
+
+
+def _version_inicial():
+    # Si la caché pierde el contador (reinicio, desalojo) no se repite una versión
+    # anterior: las entradas guardadas con ella volverían a parecer vigentes
+    return time.time_ns()
+
+
+def version_catalogo(clave=VERSION_KEY):
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _version_inicial(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def _incrementar_version(clave=VERSION_KEY):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, _version_inicial(), timeout=None)
+
+
+def invalidar_version(clave):
+    """
+    Incrementa la versión ahora y otra vez al confirmar la transacción:
+    así ninguna lectura concurrente deja en caché datos de antes del commit.
+    """
+    _incrementar_version(clave)
+    transaction.on_commit(lambda: _incrementar_version(clave))
+
+
+def invalidar_catalogo():
+    invalidar_version(VERSION_KEY)
+
+
+def _entrada(data):
+    contenido = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    return (data, f'"{hashlib.md5(contenido).hexdigest()}"')
+
+
+def _no_modificado(request, etag):
+    etags_cliente = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in etags_cliente or '*' in etags_cliente
+
+
+def _clave(version, request, variante):
+    return f"catalogo:{version}:{variante}:{request.get_full_path()}"
+
+
+def respuesta_catalogo(request, construir, variante=''):
+    """
+    Devuelve la respuesta de un catálogo desde la caché, o la construye con
+    construir() (que devuelve datos serializables) y la guarda.
+    'variante' separa en la caché respuestas distintas para la misma URL (p. ej. por rol).
+    Responde 304 si el If-None-Match del cliente coincide con el ETag.
+    """
+    clave = _clave(version_catalogo(), request, variante)
+    entrada = cache.get(clave)
+    if entrada is None:
+        entrada = _entrada(construir())
+        cache.set(clave, entrada, settings.CATALOGO_CACHE_TIMEOUT)
+
+    data, etag = entrada
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if _no_modificado(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
+
+
+async def arespuesta_catalogo(request, construir):
+    """
+    Versión async de respuesta_catalogo() para las vistas de views_async.py:
+    construir es una corrutina. Comparte claves y ETags con la versión sync,
+    y devuelve el mismo JSON que el JSONRenderer de DRF.
+    """
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, _version_inicial(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    clave = _clave(version, request, '')
+    entrada = await cache.aget(clave)
+    if entrada is None:
+        entrada = _entrada(await construir())
+        await cache.aset(clave, entrada, settings.CATALOGO_CACHE_TIMEOUT)
+
+    data, etag = entrada
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if _no_modificado(request, etag):
+        return HttpResponseNotModified(headers=headers)
+    return HttpResponse(renderizar_json(data), content_type='application/json', headers=headers)
@@ -0,0 +1,23 @@
+"""
+Checks de configuración (manage.py check, y al arrancar el servidor).
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends cuyo contenido es de cada proceso
+_CACHES_LOCALES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def cache_compartida(app_configs, **kwargs):
+    """ Varios procesos con caché local servirían catálogos, ETags y tokens revocados (ver cache.py y authentication.py) """
+    if settings.WEB_CONCURRENCY > 1 and settings.CACHES['default']['BACKEND'] in _CACHES_LOCALES:
+        return [Error(
+            f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} con una caché local a cada proceso.",
+            hint="Configure CACHE_REDIS_URL para que todos los procesos compartan la caché.",
+            id='inventory.E001',
+        )]
+    return []
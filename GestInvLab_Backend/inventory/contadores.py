@@ -0,0 +1,63 @@
+"""
+Contadores monótonos en la base de datos (ContadorVersion) y numeración de
+los cambios de Insumo y Lote para la sincronización incremental.
+
+Una escritura deja sus filas con cambio=None (pendientes) y registra con
+registrar_cambios() qué filas tocó. Al confirmarse, sellar() les asigna el
+siguiente número de CAMBIOS en una transacción propia y corta: el UPDATE del
+contador bloquea su fila hasta el commit, así que los sellos se confirman en
+el orden de sus números. La transacción de la escritura no toca el contador
+y no espera a las demás, dure lo que dure.
+
+Leer el contador (sin bloquear) devuelve el último sello confirmado: todas
+las filas con un número menor o igual ya son visibles. Ver sincronizacion.py.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ContadorVersion, Insumo, Lote
+
+CAMBIOS = 'sincronizacion:cambios'
+
+
+def leer(clave):
+    """ Valor actual del contador (0 si nunca se incrementó) """
+    return ContadorVersion.objects.filter(clave=clave).values_list('valor', flat=True).first() or 0
+
+
+def incrementar(clave):
+    """ Incrementa el contador y devuelve el valor nuevo; la fila queda bloqueada hasta el fin de la transacción """
+    if not ContadorVersion.objects.filter(clave=clave).update(valor=F('valor') + 1):
+        try:
+            with transaction.atomic():
+                ContadorVersion.objects.create(clave=clave, valor=1)
+            return 1
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            ContadorVersion.objects.filter(clave=clave).update(valor=F('valor') + 1)
+    return leer(clave)
+
+
+def sellar(*querysets):
+    """ Asigna a las filas de los querysets (Insumo o Lote) el siguiente número de cambio """
+    with transaction.atomic():
+        # Primero las filas y después el contador: si otra transacción tiene las
+        # filas bloqueadas se espera sin retener el contador, que frenaría todos los sellos
+        for queryset in querysets:
+            queryset.update(cambio=None)
+        numero = incrementar(CAMBIOS)
+        for queryset in querysets:
+            queryset.update(cambio=numero)
+
+
+def registrar_cambios(*querysets):
+    """ Llamar dentro de la transacción que modificó las filas: se sellan al confirmarla """
+    transaction.on_commit(lambda: sellar(*querysets))
+
+
+def sellar_pendientes():
+    """
+    Sella las filas que quedaron con cambio=None: cargas masivas sin
+    registrar_cambios() o un proceso que terminó antes de su on_commit.
+    """
+    sellar(Insumo.objects.filter(cambio__isnull=True), Lote.objects.filter(cambio__isnull=True))
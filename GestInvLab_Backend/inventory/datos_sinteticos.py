@@ -0,0 +1,303 @@
+"""
+Datos sintéticos para pruebas de rendimiento y de capacidad.
+
+El historial se genera día a día, en orden cronológico, y se inserta por
+bloques: en memoria solo queda el stock de cada lote y el consumo del día
+en curso, así que se pueden generar decenas de millones de detalles. El
+ledger es coherente: una salida despacha por FEFO y nunca más de lo que el
+lote tiene en ese momento, y al final Lote.stock_por_lote,
+Insumo.stock_total y ConsumoDiario quedan iguales a los que se obtendrían
+registrando los movimientos por la API.
+
+Distribuciones:
+- Insumos y servicios con popularidad de Zipf: unos pocos concentran la
+  mayor parte de los movimientos.
+- Días hábiles con más movimientos que los fines de semana, en horario de 8 a 20 h.
+- Salidas frecuentes y pequeñas; entradas menos frecuentes y grandes.
+- Caducidades entre dos meses atrás y dos años y medio adelante; el 10 % sin caducidad.
+
+Nada pasa por save() ni por las señales. Catálogos y lotes se crean con
+bulk_create; movimientos, detalles y ConsumoDiario, que son el volumen, con
+INSERT ... executemany. Los ids de los movimientos se leen por su número de
+documento (MySQL no los devuelve en un INSERT de varias filas).
+"""
+import itertools
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .busqueda import invalidar_indice_codigos
+from .cache import invalidar_catalogo
+from .contadores import sellar_pendientes
+from .models import ConsumoDiario, Detalle_Movimiento, Insumo, Lote, Movimiento, Servicio
+from .stock import case_por_id
+
+TAMANO_LOTE = 1000
+PROPORCION_ENTRADAS = 0.25
+
+
+def _insertar(modelo, campos, filas):
+    """
+    INSERT con executemany, sin instanciar modelos ni compilar el SQL por bloque:
+    para las tablas de millones de filas, donde bulk_create pasa la mayor parte
+    del tiempo en Python. Los valores ya deben estar adaptados para la base de datos.
+    """
+    if not filas:
+        return
+    opts = modelo._meta
+    qn = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        qn(opts.db_table),
+        ", ".join(qn(opts.get_field(campo).column) for campo in campos),
+        ", ".join(["%s"] * len(campos)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, filas)
+
+
+def pesos_zipf(n, s=1.1):
+    """ Pesos acumulados de una distribución de Zipf para random.choices(cum_weights=...) """
+    return list(itertools.accumulate(1 / (rango ** s) for rango in range(1, n + 1)))
+
+
+def _por_lotes(filas, tamano):
+    for inicio in range(0, len(filas), tamano):
+        yield filas[inicio:inicio + tamano]
+
+
+class _Generador:
+
+    def __init__(self, azar, insumos, lotes_por_insumo, servicios, usuarios, detalles_por_movimiento, prefijo, tamano_lote):
+        self.azar = azar
+        self.prefijo = prefijo
+        self.tamano_lote = tamano_lote
+        self.detalles_por_movimiento = detalles_por_movimiento
+        self.usuario_ids = usuarios
+        self.servicio_ids = servicios
+        self.pesos_servicios = pesos_zipf(len(servicios))
+        # El orden de popularidad no coincide con el de los códigos
+        self.insumo_ids = azar.sample(insumos, len(insumos))
+        self.pesos_insumos = pesos_zipf(len(insumos))
+        self.lotes = lotes_por_insumo  # {insumo_id: [(lote_id, caducidad)] en orden FEFO}
+        self.stock = defaultdict(int)
+        self.consumo = defaultdict(int)
+        self.pendientes = []  # [(documento, usuario, tipo, fecha, servicio, [(lote_id, insumo_id, cantidad)])]
+        self.totales = defaultdict(int)
+        self.numero = 0
+
+    def lineas_salida(self, dia):
+        cantidad_lineas = self.azar.randint(1, 2 * self.detalles_por_movimiento - 1)
+        lineas = []
+        for insumo_id in set(self.azar.choices(self.insumo_ids, cum_weights=self.pesos_insumos, k=cantidad_lineas)):
+            pedido = self.azar.randint(1, 12)
+            for lote_id, caducidad in self.lotes[insumo_id]:
+                if pedido == 0:
+                    break
+                if caducidad is not None and caducidad < dia:
+                    continue
+                tomar = min(pedido, self.stock[lote_id])
+                if tomar:
+                    self.stock[lote_id] -= tomar
+                    pedido -= tomar
+                    lineas.append((lote_id, insumo_id, tomar))
+        return lineas
+
+    def lineas_entrada(self):
+        cantidad_lineas = self.azar.randint(1, 2 * self.detalles_por_movimiento - 1)
+        lineas = []
+        for insumo_id in set(self.azar.choices(self.insumo_ids, cum_weights=self.pesos_insumos, k=cantidad_lineas)):
+            lote_id, _ = self.azar.choice(self.lotes[insumo_id])
+            cantidad = self.azar.randint(50, 300)
+            self.stock[lote_id] += cantidad
+            lineas.append((lote_id, insumo_id, cantidad))
+        return lineas
+
+    def movimiento(self, fecha):
+        dia = timezone.localdate(fecha)
+        tipo, servicio_id = 'Entrada', None
+        lineas = []
+        if self.azar.random() >= PROPORCION_ENTRADAS:
+            lineas = self.lineas_salida(dia)
+            tipo = 'Salida'
+            servicio_id = self.azar.choices(self.servicio_ids, cum_weights=self.pesos_servicios)[0]
+        if not lineas:
+            # Sin stock que despachar (p. ej. al principio): la bodega repone
+            tipo, servicio_id = 'Entrada', None
+            lineas = self.lineas_entrada()
+
+        self.numero += 1
+        self.pendientes.append((
+            f"{self.prefijo}-{self.numero:09d}",
+            self.azar.choice(self.usuario_ids),
+            tipo,
+            connection.ops.adapt_datetimefield_value(fecha),
+            servicio_id,
+            lineas,
+        ))
+        for _, insumo_id, cantidad in lineas:
+            self.consumo[(dia, insumo_id, servicio_id, tipo)] += cantidad
+        if len(self.pendientes) >= self.tamano_lote:
+            self.guardar_movimientos()
+
+    def guardar_movimientos(self):
+        if not self.pendientes:
+            return
+        with transaction.atomic():
+            _insertar(
+                Movimiento,
+                ('numero_documento', 'usuario', 'tipo_movimiento', 'fecha_registro', 'servicio_destino'),
+                [fila[:5] for fila in self.pendientes],
+            )
+            # Los números de documento del bloque son consecutivos y de ancho fijo
+            ids = dict(
+                Movimiento.objects.filter(numero_documento__range=(self.pendientes[0][0], self.pendientes[-1][0]))
+                .values_list('numero_documento', 'id')
+            )
+            detalles = [
+                (ids[fila[0]], lote_id, cantidad)
+                for fila in self.pendientes
+                for lote_id, _, cantidad in fila[5]
+            ]
+            _insertar(Detalle_Movimiento, ('movimiento', 'lote', 'cantidad'), detalles)
+        self.totales['movimientos'] += len(self.pendientes)
+        self.totales['detalles'] += len(detalles)
+        self.pendientes = []
+
+    def guardar_consumo(self):
+        # Las claves son nuevas (insumos de esta siembra): no chocan con filas existentes
+        adaptar = connection.ops.adapt_datefield_value
+        _insertar(
+            ConsumoDiario,
+            ('fecha', 'insumo', 'servicio', 'tipo_movimiento', 'cantidad'),
+            [
+                (adaptar(dia), insumo_id, servicio_id, tipo, cantidad)
+                for (dia, insumo_id, servicio_id, tipo), cantidad in self.consumo.items()
+            ],
+        )
+        self.totales['consumos_diarios'] += len(self.consumo)
+        self.consumo = defaultdict(int)
+
+
+def _movimientos_por_dia(azar, movimientos, primer_dia, dias):
+    """ Reparte 'movimientos' entre los días: los fines de semana con un 30 % de los de un día hábil """
+    pesos = [0.3 if (primer_dia + timedelta(days=n)).weekday() >= 5 else 1.0 for n in range(dias)]
+    total = sum(pesos)
+    acumulado = 0.0
+    asignados = 0
+    for n, peso in enumerate(pesos):
+        acumulado += movimientos * peso / total
+        cantidad = round(acumulado) - asignados
+        asignados += cantidad
+        yield primer_dia + timedelta(days=n), cantidad
+
+
+def sembrar(insumos=100, lotes_por_insumo=3, movimientos=500, detalles_por_movimiento=3,
+            servicios=10, usuarios=5, dias=365, prefijo='SIN', semilla=None, tamano_lote=TAMANO_LOTE,
+            progreso=None):
+    """
+    Inserta un catálogo y un historial de movimientos sintéticos de los últimos 'dias'.
+    'prefijo' distingue una siembra de otra (códigos, lotes, documentos, servicios y
+    usuarios), así que se puede llamar varias veces sobre la misma base de datos
+    para aumentar el volumen. progreso(dia, totales) se llama al terminar cada día.
+    Devuelve el número de filas insertadas por modelo.
+    """
+    azar = random.Random(semilla)
+    hoy = timezone.localdate()
+
+    # --- 1. Catálogos ---
+    with transaction.atomic():
+        nombres_usuarios = [f"{prefijo.lower()}-usuario-{i}" for i in range(usuarios)]
+        User.objects.bulk_create([User(username=nombre) for nombre in nombres_usuarios], ignore_conflicts=True)
+        usuario_ids = list(User.objects.filter(username__in=nombres_usuarios).values_list('id', flat=True))
+
+        nombres_servicios = [f"Servicio {prefijo} {i}" for i in range(servicios)]
+        Servicio.objects.bulk_create([Servicio(nombre=nombre) for nombre in nombres_servicios], ignore_conflicts=True)
+        servicio_ids = list(Servicio.objects.filter(nombre__in=nombres_servicios).values_list('id', flat=True))
+
+    codigos = [f"{prefijo}-{i:06d}" for i in range(insumos)]
+    insumo_ids = []
+    lotes = {}
+    for bloque in _por_lotes(codigos, tamano_lote):
+        with transaction.atomic():
+            Insumo.objects.bulk_create([
+                Insumo(
+                    nombre=f"Insumo {prefijo} {azar.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{codigo[-6:]}",
+                    codigo_producto=codigo,
+                    umbral_critico=azar.choice((0, 10, 20, 50, 100)),
+                )
+                for codigo in bloque
+            ])
+            ids = list(Insumo.objects.filter(codigo_producto__in=bloque).values_list('id', flat=True))
+            Lote.objects.bulk_create(
+                [
+                    Lote(
+                        insumo_id=insumo_id,
+                        numero_lote=f"{prefijo}-L{j}",
+                        fecha_caducidad=hoy + timedelta(days=azar.randint(-60, 900)) if azar.random() < 0.9 else None,
+                    )
+                    for insumo_id in ids
+                    for j in range(lotes_por_insumo)
+                ],
+                batch_size=tamano_lote,
+            )
+            for lote_id, insumo_id, caducidad in Lote.objects.filter(insumo_id__in=ids).values_list('id', 'insumo_id', 'fecha_caducidad'):
+                lotes.setdefault(insumo_id, []).append((lote_id, caducidad))
+        insumo_ids.extend(ids)
+    for lista in lotes.values():
+        # FEFO: primero el que caduca antes; los sin caducidad al final
+        lista.sort(key=lambda lote: (lote[1] is None, lote[1] or hoy, lote[0]))
+
+    # --- 2. Ledger, día por día ---
+    generador = _Generador(azar, insumo_ids, lotes, servicio_ids, usuario_ids, detalles_por_movimiento, prefijo, tamano_lote)
+    for dia, cantidad in _movimientos_por_dia(azar, movimientos, hoy - timedelta(days=dias - 1), dias):
+        inicio = timezone.make_aware(datetime.combine(dia, time(8)))
+        fechas = sorted(inicio + timedelta(seconds=azar.randrange(12 * 3600)) for _ in range(cantidad))
+        for fecha in fechas:
+            if fecha > timezone.now():
+                fecha = timezone.now()
+            generador.movimiento(fecha)
+        # El día ya no recibe más movimientos: su consumo se puede escribir
+        if len(generador.consumo) >= tamano_lote:
+            with transaction.atomic():
+                generador.guardar_consumo()
+        if progreso is not None:
+            progreso(dia, generador.totales)
+
+    generador.guardar_movimientos()
+    with transaction.atomic():
+        generador.guardar_consumo()
+
+    # --- 3. Stock final ---
+    stock_insumo = defaultdict(int)
+    por_lote = {lote_id: cantidad for lote_id, cantidad in generador.stock.items() if cantidad}
+    lote_insumo = {lote_id: insumo_id for insumo_id, lista in lotes.items() for lote_id, _ in lista}
+    for lote_id, cantidad in por_lote.items():
+        stock_insumo[lote_insumo[lote_id]] += cantidad
+    ahora = timezone.now()
+    for bloque in _por_lotes(list(por_lote), tamano_lote):
+        with transaction.atomic():
+            Lote.objects.filter(id__in=bloque).update(
+                stock_por_lote=case_por_id({i: por_lote[i] for i in bloque}), modificado_en=ahora, cambio=None
+            )
+    for bloque in _por_lotes(list(stock_insumo), tamano_lote):
+        with transaction.atomic():
+            Insumo.objects.filter(id__in=bloque).update(
+                stock_total=case_por_id({i: stock_insumo[i] for i in bloque}), modificado_en=ahora, cambio=None
+            )
+
+    # bulk_create y update no disparan post_save
+    invalidar_catalogo()
+    invalidar_indice_codigos()
+    sellar_pendientes()
+
+    return {
+        'insumos': len(insumo_ids),
+        'lotes': sum(len(lista) for lista in lotes.values()),
+        'movimientos': generador.totales['movimientos'],
+        'detalles': generador.totales['detalles'],
+        'consumos_diarios': generador.totales['consumos_diarios'],
+    }
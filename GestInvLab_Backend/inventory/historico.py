@@ -0,0 +1,130 @@
+"""
+Stock a una fecha pasada, reconstruido desde el ledger (Detalle_Movimiento
++ Movimiento.fecha_registro). Para no reproducir el ledger completo en cada
+consulta se parte del CorteStock más cercano anterior a la fecha y solo se
+aplican los movimientos posteriores al corte. El ledger incluye el historial
+archivado (ver archivo.py) cuando el rango lo necesita.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Min, Sum, When
+from django.utils import timezone
+
+from .archivo import detalles_ledger
+from .models import CorteStock, CorteStockLote, Movimiento, MovimientoArchivado
+
+
+def inicio_del_dia(fecha):
+    """ 00:00 de la fecha en la zona horaria actual (la misma que usa __date) """
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def variacion_ledger(desde=None, hasta=None, insumo_id=None, lote_id=None):
+    """
+    Variación neta de stock por lote (entradas - salidas) de los movimientos
+    con desde <= fecha_registro < hasta. Devuelve {lote_id: (insumo_id, cantidad)}.
+    """
+    filtros = {}
+    if hasta is not None:
+        filtros['movimiento__fecha_registro__lt'] = hasta
+    if insumo_id is not None:
+        filtros['lote__insumo_id'] = insumo_id
+    if lote_id is not None:
+        filtros['lote_id'] = lote_id
+    return neto_por_lote(*detalles_ledger(desde, **filtros))
+
+
+def neto_por_lote(*detalles):
+    """
+    Entradas - salidas de uno o más querysets de detalles (vivos y archivados),
+    en un GROUP BY por lote cada uno.
+    """
+    neto = {}
+    for queryset in detalles:
+        filas = (
+            queryset
+            .values('lote_id', 'lote__insumo_id')
+            .annotate(neto=Sum(Case(
+                When(movimiento__tipo_movimiento='Salida', then=-F('cantidad')),
+                default=F('cantidad'),
+            )))
+            .order_by()
+        )
+        for fila in filas:
+            anterior = neto.get(fila['lote_id'], (None, 0))[1]
+            neto[fila['lote_id']] = (fila['lote__insumo_id'], anterior + fila['neto'])
+    return neto
+
+
+def stock_a_fecha(fecha, insumo_id=None, lote_id=None, usar_cortes=True):
+    """
+    Stock de cada lote al cierre del día 'fecha'. Devuelve (corte, {lote_id: (insumo_id, stock)}),
+    donde corte es el CorteStock usado (None si se reprodujo el ledger completo).
+    Los lotes con stock cero se omiten.
+    """
+    hasta = inicio_del_dia(fecha + timedelta(days=1))
+    corte = None
+    if usar_cortes:
+        corte = CorteStock.objects.filter(fecha__lte=fecha + timedelta(days=1)).order_by('-fecha').first()
+
+    stock = defaultdict(int)
+    insumos = {}
+    if corte is not None:
+        base = CorteStockLote.objects.filter(corte=corte)
+        if insumo_id is not None:
+            base = base.filter(insumo_id=insumo_id)
+        if lote_id is not None:
+            base = base.filter(lote_id=lote_id)
+        for fila in base.values('lote_id', 'insumo_id', 'stock'):
+            stock[fila['lote_id']] += fila['stock']
+            insumos[fila['lote_id']] = fila['insumo_id']
+
+    desde = inicio_del_dia(corte.fecha) if corte is not None else None
+    for lote, (insumo, neto) in variacion_ledger(desde, hasta, insumo_id, lote_id).items():
+        stock[lote] += neto
+        insumos[lote] = insumo
+
+    return corte, {lote: (insumos[lote], cantidad) for lote, cantidad in stock.items() if cantidad}
+
+
+def fechas_de_corte(hasta=None):
+    """ Primer día de cada mes desde el mes siguiente al primer movimiento hasta 'hasta' (hoy) """
+    primeros = [modelo.objects.aggregate(primero=Min('fecha_registro'))['primero'] for modelo in (MovimientoArchivado, Movimiento)]
+    primeros = [fecha for fecha in primeros if fecha is not None]
+    if not primeros:
+        return []
+    primero = min(primeros)
+    hasta = hasta or timezone.localdate()
+    inicio = timezone.localdate(primero)
+    anio, mes = (inicio.year + 1, 1) if inicio.month == 12 else (inicio.year, inicio.month + 1)
+    fechas = []
+    while date(anio, mes, 1) <= hasta:
+        fechas.append(date(anio, mes, 1))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return fechas
+
+
+def construir_corte(fecha):
+    """
+    Crea (o rehace) el corte de 'fecha' a partir del corte anterior más
+    los movimientos entre ambos, en una transacción.
+    """
+    with transaction.atomic():
+        CorteStock.objects.filter(fecha=fecha).delete()
+        _, stock = stock_a_fecha(fecha - timedelta(days=1))
+        corte = CorteStock.objects.create(fecha=fecha)
+        CorteStockLote.objects.bulk_create(
+            [
+                CorteStockLote(corte=corte, lote_id=lote_id, insumo_id=insumo_id, stock=cantidad)
+                for lote_id, (insumo_id, cantidad) in stock.items()
+            ],
+            batch_size=1000,
+        )
+    return corte, len(stock)
+
+
+def invalidar_cortes_desde(fecha_registro):
+    """ Un cambio en el ledger con esta fecha deja obsoletos los cortes posteriores """
+    CorteStock.objects.filter(fecha__gt=timezone.localdate(fecha_registro)).delete()
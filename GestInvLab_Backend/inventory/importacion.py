@@ -0,0 +1,120 @@
+"""
+Importación masiva del catálogo de insumos desde CSV.
+
+El archivo se lee fila a fila (nunca completo en memoria) y se procesa por
+lotes de tamaño fijo: cada lote consulta en una sola query qué códigos ya
+existen y hace un único bulk_create(update_conflicts=True) en su propia
+transacción. Las filas inválidas no detienen la importación: se devuelven
+en el informe con su número de línea.
+
+Columnas: codigo_producto y nombre (obligatorias), umbral_critico (opcional).
+Se acepta ',' o ';' como separador.
+"""
+import csv
+import itertools
+
+from django.db import connection, transaction
+
+from .busqueda import invalidar_indice_codigos
+from .cache import invalidar_catalogo
+from .contadores import registrar_cambios
+from .models import Insumo
+
+COLUMNAS_OBLIGATORIAS = ('codigo_producto', 'nombre')
+TAMANO_LOTE = 500
+
+
+def _validar_fila(fila):
+    """ Devuelve (Insumo sin guardar, errores) de una fila del CSV """
+    codigo = (fila.get('codigo_producto') or '').strip()
+    nombre = (fila.get('nombre') or '').strip()
+    umbral = (fila.get('umbral_critico') or '').strip()
+    errores = []
+    if not codigo:
+        errores.append("codigo_producto es obligatorio.")
+    elif len(codigo) > Insumo._meta.get_field('codigo_producto').max_length:
+        errores.append("codigo_producto es demasiado largo.")
+    if not nombre:
+        errores.append("nombre es obligatorio.")
+    elif len(nombre) > Insumo._meta.get_field('nombre').max_length:
+        errores.append("nombre es demasiado largo.")
+    try:
+        umbral = int(umbral) if umbral else 0
+        if umbral < 0:
+            raise ValueError
+    except ValueError:
+        errores.append("umbral_critico debe ser un entero mayor o igual a 0.")
+    return Insumo(codigo_producto=codigo, nombre=nombre, umbral_critico=umbral), errores
+
+
+def _guardar_lote(insumos, solo_nuevos, informe):
+    """ Un lote: una consulta de códigos existentes y un upsert, en una transacción """
+    with transaction.atomic():
+        existentes = set(
+            Insumo.objects.filter(codigo_producto__in=[insumo.codigo_producto for insumo in insumos.values()])
+            .values_list('codigo_producto', flat=True)
+        )
+        if solo_nuevos:
+            for linea, insumo in insumos.items():
+                if insumo.codigo_producto in existentes:
+                    informe['errores'].append({
+                        'fila': linea, 'codigo_producto': insumo.codigo_producto,
+                        'errores': ["Ya existe un insumo con este codigo_producto."],
+                    })
+            insumos = {linea: insumo for linea, insumo in insumos.items() if insumo.codigo_producto not in existentes}
+
+        # MySQL no admite unique_fields: usa ON DUPLICATE KEY sobre cualquier clave única
+        unique_fields = ['codigo_producto'] if connection.features.supports_update_conflicts_with_target else None
+        Insumo.objects.bulk_create(
+            list(insumos.values()),
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['nombre', 'umbral_critico', 'modificado_en', 'cambio'],
+        )
+        actualizados = sum(1 for insumo in insumos.values() if insumo.codigo_producto in existentes)
+        informe['actualizados'] += actualizados
+        informe['creados'] += len(insumos) - actualizados
+        # bulk_create no dispara post_save
+        invalidar_catalogo()
+        invalidar_indice_codigos()
+        registrar_cambios(Insumo.objects.filter(codigo_producto__in=[insumo.codigo_producto for insumo in insumos.values()]))
+
+
+def importar_insumos(lineas, tamano_lote=TAMANO_LOTE, solo_nuevos=False):
+    """
+    Importa insumos desde un iterable de líneas de texto (archivo abierto en modo texto).
+    Un codigo_producto existente se actualiza (nombre, umbral_critico), salvo con
+    solo_nuevos, que lo informa como error. Lanza ValueError si faltan columnas.
+    Devuelve {'procesadas', 'creados', 'actualizados', 'errores': [{'fila', 'codigo_producto', 'errores'}]}.
+    """
+    lineas = iter(lineas)
+    encabezado = next(lineas, '')
+    separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+    lector = csv.DictReader(itertools.chain([encabezado], lineas), delimiter=separador)
+    columnas = [(columna or '').strip() for columna in (lector.fieldnames or [])]
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in columnas]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}.")
+    lector.fieldnames = columnas
+
+    informe = {'procesadas': 0, 'creados': 0, 'actualizados': 0, 'errores': []}
+    vistos = {}
+    pendientes = {}
+    for fila in lector:
+        informe['procesadas'] += 1
+        insumo, errores = _validar_fila(fila)
+        if not errores and insumo.codigo_producto in vistos:
+            errores.append(f"codigo_producto repetido en el archivo (fila {vistos[insumo.codigo_producto]}).")
+        if errores:
+            informe['errores'].append({'fila': lector.line_num, 'codigo_producto': insumo.codigo_producto, 'errores': errores})
+            continue
+        vistos[insumo.codigo_producto] = lector.line_num
+        pendientes[lector.line_num] = insumo
+        if len(pendientes) >= tamano_lote:
+            _guardar_lote(pendientes, solo_nuevos, informe)
+            pendientes = {}
+    if pendientes:
+        _guardar_lote(pendientes, solo_nuevos, informe)
+
+    informe['errores'].sort(key=lambda error: error['fila'])
+    return informe
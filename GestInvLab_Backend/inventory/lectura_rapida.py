@@ -0,0 +1,142 @@
+"""
+Camino rápido de lectura para los listados y el reporte de movimientos.
+
+Los serializers de DRF construyen cada campo con objetos Field (source= con
+puntos, StringRelatedField, serializers anidados) y cuestan más que las
+consultas. Aquí se leen filas planas con .values() (los JOIN que hacen falta,
+sin instanciar modelos) y se arman los mismos diccionarios, con las mismas
+claves en el mismo orden y los mismos valores que los serializers. Son solo
+textos, enteros, booleanos y null (fechas ya formateadas, sin floats), así
+que renderizados con ORJSONRenderer el JSON es idéntico byte a byte.
+
+El reporte hace dos consultas por página (movimientos y detalles) en vez de
+seis; los detalles vienen ordenados por movimiento y se agrupan en una pasada.
+Si la página incluye movimientos archivados (ver archivo.py), sus detalles se
+leen de DetalleMovimientoArchivado en una consulta más.
+"""
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import F, Value
+from rest_framework import serializers
+
+from .models import Detalle_Movimiento, DetalleMovimientoArchivado, Insumo, Lote, MovimientoArchivado, Servicio
+
+# Mismo formato que los serializers (ISO 8601, 'Z' en UTC, zona horaria actual)
+_fecha_hora = serializers.DateTimeField().to_representation
+_fecha = serializers.DateField().to_representation
+
+CAMPOS_INSUMO = ('id', 'nombre', 'codigo_producto', 'stock_total', 'umbral_critico')
+CAMPOS_SERVICIO = ('id', 'nombre')
+CAMPOS_USUARIO = ('id', 'username', 'first_name', 'last_name')
+CAMPOS_USUARIO_ADMIN = CAMPOS_USUARIO + ('is_staff', 'is_active', 'is_superuser')
+
+
+def insumos():
+    """ = InsumoSerializer(Insumo.objects.order_by('nombre'), many=True).data """
+    return list(Insumo.objects.order_by('nombre').values(*CAMPOS_INSUMO))
+
+
+def servicios():
+    """ = ServicioSerializer(Servicio.objects.order_by('nombre'), many=True).data """
+    return list(Servicio.objects.order_by('nombre').values(*CAMPOS_SERVICIO))
+
+
+def usuarios(queryset=None, campos=CAMPOS_USUARIO):
+    """ = UserSerializer (o UserAdminSerializer con CAMPOS_USUARIO_ADMIN), ordenados por username """
+    if queryset is None:
+        queryset = User.objects.filter(is_active=True)
+    return list(queryset.order_by('username').values(*campos))
+
+
+def consulta_lotes(insumo_id):
+    """ Lotes con stock de un insumo, por caducidad, con las columnas de LoteSerializer """
+    return (
+        Lote.objects.filter(insumo_id=insumo_id, stock_por_lote__gt=0)
+        .order_by('fecha_caducidad')
+        .values_list('id', 'insumo_id', 'insumo__nombre', 'numero_lote', 'fecha_caducidad', 'stock_por_lote')
+    )
+
+
+def armar_lotes(filas):
+    return [
+        {
+            'id': lote_id,
+            'insumo': insumo_id,
+            'insumo_nombre': insumo_nombre,
+            'numero_lote': numero_lote,
+            'fecha_caducidad': _fecha(caducidad),
+            'stock_por_lote': stock,
+        }
+        for lote_id, insumo_id, insumo_nombre, numero_lote, caducidad, stock in filas
+    ]
+
+
+def lotes(insumo_id):
+    """ = LoteSerializer(lotes con stock del insumo, many=True).data """
+    return armar_lotes(consulta_lotes(insumo_id))
+
+
+def movimientos_reporte(queryset):
+    """
+    Filas planas de un queryset de Movimiento o MovimientoArchivado (ya filtrado)
+    para el reporte. Se pagina igual que el queryset de modelos (ver MovimientoKeysetPagination).
+    """
+    return queryset.values(
+        'id', 'tipo_movimiento', 'fecha_registro', 'numero_documento',
+        usuario_nombre=F('usuario__username'),
+        servicio_nombre=F('servicio_destino__nombre'),
+        archivado=Value(queryset.model is MovimientoArchivado),
+    )
+
+
+def consulta_detalles(movimiento_ids, modelo=Detalle_Movimiento):
+    return (
+        modelo.objects.filter(movimiento_id__in=movimiento_ids)
+        .order_by('movimiento_id', 'id')
+        .values_list('movimiento_id', 'lote__insumo__nombre', 'lote__insumo__codigo_producto', 'lote__numero_lote', 'cantidad')
+    )
+
+
+def armar_reporte(movimientos, detalles):
+    """ = ReporteMovimientoSerializer(page, many=True).data, desde las filas de movimientos y de detalles """
+    por_movimiento = defaultdict(list)
+    for movimiento_id, insumo_nombre, insumo_codigo, lote_numero, cantidad in detalles:
+        por_movimiento[movimiento_id].append({
+            'insumo_nombre': insumo_nombre,
+            'insumo_codigo': insumo_codigo,
+            'lote_numero': lote_numero,
+            'cantidad': cantidad,
+        })
+    return [
+        {
+            'id': fila['id'],
+            'tipo_movimiento': fila['tipo_movimiento'],
+            'fecha_registro': _fecha_hora(fila['fecha_registro']),
+            'usuario': fila['usuario_nombre'],
+            'servicio_destino': fila['servicio_nombre'],
+            'numero_documento': fila['numero_documento'],
+            'detalles': por_movimiento.get(fila['id'], []),
+        }
+        for fila in movimientos
+    ]
+
+
+def _detalles_por_tabla(movimientos):
+    """ Consultas de detalles de la página: una por tabla (viva, archivo) con movimientos en ella """
+    ids = {Detalle_Movimiento: [], DetalleMovimientoArchivado: []}
+    for fila in movimientos:
+        ids[DetalleMovimientoArchivado if fila['archivado'] else Detalle_Movimiento].append(fila['id'])
+    return [consulta_detalles(movimiento_ids, modelo) for modelo, movimiento_ids in ids.items() if movimiento_ids]
+
+
+def reporte(movimientos):
+    """ Página del reporte desde las filas de movimientos_reporte() """
+    detalles = [fila for consulta in _detalles_por_tabla(movimientos) for fila in consulta]
+    return armar_reporte(movimientos, detalles)
+
+
+async def areporte(movimientos):
+    """ Igual que reporte(), con el ORM async (ver views_async.py) """
+    detalles = [fila for consulta in _detalles_por_tabla(movimientos) async for fila in consulta]
+    return armar_reporte(movimientos, detalles)
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from inventory.archivo import archivar_anio, inicio_del_anio
+from inventory.models import Movimiento
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva el historial de movimientos de años cerrados: mueve Movimiento y "
+        "Detalle_Movimiento a las tablas de archivo por lotes, cada lote en su propia "
+        "transacción, así que el comando se puede interrumpir y volver a ejecutar. "
+        "No cambia el stock, ConsumoDiario ni los cortes; los reportes siguen incluyendo "
+        "lo archivado cuando el rango de fechas llega a ello (ver inventory/archivo.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hasta-anio', type=int,
+            help="Último año a archivar (inclusive). Por defecto, el antepenúltimo: el último año cerrado sigue vivo.",
+        )
+        parser.add_argument('--tamano', type=int, default=2000, help="Movimientos por lote (por defecto 2000).")
+        parser.add_argument('--pausa', type=float, default=0, help="Segundos de espera entre lotes, para no cargar la base de datos.")
+
+    def handle(self, *args, **options):
+        actual = timezone.localdate().year
+        hasta_anio = options['hasta_anio'] if options['hasta_anio'] is not None else actual - 2
+        if hasta_anio >= actual:
+            raise CommandError(f"Solo se archivan años cerrados: --hasta-anio debe ser menor que {actual}.")
+        if options['tamano'] < 1:
+            raise CommandError("--tamano debe ser al menos 1.")
+
+        primero = Movimiento.objects.filter(fecha_registro__lt=inicio_del_anio(hasta_anio + 1)).aggregate(
+            primero=Min('fecha_registro'))['primero']
+        if primero is None:
+            self.stdout.write(f"No hay movimientos hasta {hasta_anio} que archivar.")
+            return
+
+        def progreso(movimientos, detalles):
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        for anio in range(timezone.localtime(primero).year, hasta_anio + 1):
+            if not Movimiento.objects.filter(
+                fecha_registro__gte=inicio_del_anio(anio), fecha_registro__lt=inicio_del_anio(anio + 1)
+            ).exists():
+                continue
+            inicio = time.perf_counter()
+            registro = archivar_anio(anio, options['tamano'], progreso)
+            self.stdout.write(
+                f"{anio}: {registro.movimientos} movimiento(s) y {registro.detalles} detalle(s) archivados "
+                f"en total ({time.perf_counter() - inicio:.1f}s)."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Historial archivado hasta {hasta_anio}."))
@@ -0,0 +1,214 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from rest_framework.authtoken.models import Token
+
+from inventory.models import Insumo
+
+
+def percentil(latencias, p):
+    if not latencias:
+        return 0
+    return latencias[min(len(latencias) - 1, int(len(latencias) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara WSGI (vistas sync, un hilo por cliente) con ASGI (vistas async, un solo event loop) "
+        "en los endpoints de lectura: req/s y latencia p50/p99 bajo N clientes concurrentes. "
+        "Por defecto llama en proceso a las aplicaciones de wsgi.py y asgi.py contra la base "
+        "de datos configurada; con --wsgi-url/--asgi-url mide servidores ya levantados "
+        "(p. ej. gunicorn y uvicorn)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=16, help="Clientes concurrentes.")
+        parser.add_argument('--peticiones', type=int, default=400, help="Peticiones por endpoint y despliegue.")
+        parser.add_argument('--wsgi-url', help="URL base de un servidor WSGI (p. ej. http://127.0.0.1:8000).")
+        parser.add_argument('--asgi-url', help="URL base de un servidor ASGI (p. ej. http://127.0.0.1:8001).")
+        parser.add_argument('--json', help="Guardar los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        usuario = User.objects.create_user(username=f"benchmark-{get_random_string(8)}")
+        token = Token.objects.create(user=usuario)
+        try:
+            endpoints = self.endpoints()
+            resultados = []
+            for despliegue in ('wsgi', 'asgi'):
+                url_base = options[f'{despliegue}_url']
+                for nombre, ruta in endpoints:
+                    if url_base:
+                        medicion = self.medir_http(url_base + ruta, token.key, options)
+                    elif despliegue == 'wsgi':
+                        medicion = self.medir_wsgi(ruta, token.key, options)
+                    else:
+                        medicion = self.medir_asgi(ruta, token.key, options)
+                    medicion.update({'despliegue': despliegue, 'endpoint': nombre})
+                    resultados.append(medicion)
+                    self.stdout.write(
+                        f"{despliegue:5} {nombre:10} {medicion['req_s']:8.1f} req/s  "
+                        f"p50 {medicion['p50_ms']:7.1f} ms  p99 {medicion['p99_ms']:7.1f} ms  "
+                        f"errores {medicion['errores']}"
+                    )
+        finally:
+            usuario.delete()
+
+        if options['json']:
+            with open(options['json'], 'w') as archivo:
+                json.dump({'clientes': options['clientes'], 'resultados': resultados}, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['json']}"))
+
+    def endpoints(self):
+        # Lotes del insumo con más lotes, para que la consulta no sea trivial
+        insumo = Insumo.objects.annotate(n=Count('lotes')).order_by('-n').first()
+        return [
+            ('insumos', reverse('inventory:insumo-list')),
+            ('servicios', reverse('inventory:servicio-list')),
+            ('lotes', f"{reverse('inventory:lote-list')}?insumo_id={insumo.id if insumo else 0}"),
+            ('reportes', f"{reverse('inventory:reporte-movimientos')}?page_size=100"),
+        ]
+
+    def resumir(self, latencias, errores, duracion):
+        latencias.sort()
+        return {
+            'peticiones': len(latencias),
+            'errores': errores,
+            'req_s': len(latencias) / duracion if duracion else 0,
+            'p50_ms': percentil(latencias, 0.50) * 1000,
+            'p99_ms': percentil(latencias, 0.99) * 1000,
+        }
+
+    def en_hilos(self, peticion, options):
+        """ options['clientes'] hilos repartiéndose options['peticiones'] llamadas a peticion() """
+        pendientes = iter(range(options['peticiones']))
+        lock = threading.Lock()
+        latencias = []
+        errores = []
+
+        def cliente():
+            try:
+                while True:
+                    with lock:
+                        if next(pendientes, None) is None:
+                            return
+                    inicio = time.perf_counter()
+                    status_code = peticion()
+                    latencia = time.perf_counter() - inicio
+                    with lock:
+                        latencias.append(latencia)
+                        if status_code != 200:
+                            errores.append(status_code)
+            finally:
+                connections.close_all()
+
+        peticion()  # Calentar (caché de catálogos, conexiones)
+        hilos = [threading.Thread(target=cliente) for _ in range(options['clientes'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return self.resumir(latencias, len(errores), time.perf_counter() - inicio)
+
+    def medir_wsgi(self, ruta, token, options):
+        from gestinvlab_project.wsgi import application
+
+        path, _, query = ruta.partition('?')
+
+        def peticion():
+            estado = []
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'HTTP_AUTHORIZATION': f'Token {token}', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.multithread': True,
+                'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            cuerpo = application(environ, lambda status, headers: estado.append(status))
+            try:
+                for _ in cuerpo:
+                    pass
+            finally:
+                cuerpo.close()
+            return int(estado[0].split()[0])
+
+        return self.en_hilos(peticion, options)
+
+    def medir_asgi(self, ruta, token, options):
+        from gestinvlab_project.asgi import application
+
+        path, _, query = ruta.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            'headers': [(b'host', b'localhost'), (b'authorization', f'Token {token}'.encode())],
+        }
+
+        async def peticion():
+            estado = []
+            enviado = False
+            desconexion = asyncio.Event()
+
+            async def receive():
+                nonlocal enviado
+                if not enviado:
+                    enviado = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await desconexion.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    estado.append(mensaje['status'])
+
+            await application(dict(scope), receive, send)
+            desconexion.set()
+            return estado[0]
+
+        async def medir():
+            pendientes = iter(range(options['peticiones']))
+            latencias = []
+            errores = 0
+
+            async def cliente():
+                nonlocal errores
+                while next(pendientes, None) is not None:
+                    inicio = time.perf_counter()
+                    status_code = await peticion()
+                    latencias.append(time.perf_counter() - inicio)
+                    if status_code != 200:
+                        errores += 1
+
+            await peticion()  # Calentar
+            inicio = time.perf_counter()
+            await asyncio.gather(*(cliente() for _ in range(options['clientes'])))
+            return self.resumir(latencias, errores, time.perf_counter() - inicio)
+
+        return asyncio.run(medir())
+
+    def medir_http(self, url, token, options):
+        def peticion():
+            solicitud = urllib.request.Request(url, headers={'Authorization': f'Token {token}'})
+            try:
+                with urllib.request.urlopen(solicitud, timeout=30) as respuesta:
+                    respuesta.read()
+                    return respuesta.status
+            except urllib.error.HTTPError as e:
+                return e.code
+            except OSError as e:
+                return type(e).__name__
+
+        return self.en_hilos(peticion, options)
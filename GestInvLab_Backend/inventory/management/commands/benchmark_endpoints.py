@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from inventory.benchmark import ejecutar_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de todos los endpoints de inventory/urls.py: siembra datos sintéticos en una "
+        "base de datos de prueba (se crea y se destruye, como en 'manage.py test'), mide latencia "
+        "p50/p95/p99 y consultas SQL por endpoint, multiplica el volumen por --factor y vuelve a medir. "
+        "Falla si un endpoint supera su presupuesto de consultas o si sus consultas crecen con el volumen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--insumos', type=int, default=200, help="Insumos del volumen base.")
+        parser.add_argument('--lotes-por-insumo', type=int, default=3, help="Lotes por insumo.")
+        parser.add_argument('--movimientos', type=int, default=2000, help="Movimientos del volumen base.")
+        parser.add_argument('--detalles-por-movimiento', type=int, default=3, help="Detalles por movimiento.")
+        parser.add_argument('--factor', type=int, default=4, help="Multiplicador del volumen en la segunda medición.")
+        parser.add_argument('--repeticiones', type=int, default=20, help="Peticiones por endpoint para la latencia.")
+        parser.add_argument('--json', help="Guardar el informe en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        if options['factor'] < 2:
+            raise CommandError("--factor debe ser al menos 2.")
+        volumen = {
+            'insumos': options['insumos'],
+            'lotes_por_insumo': options['lotes_por_insumo'],
+            'movimientos': options['movimientos'],
+            'detalles_por_movimiento': options['detalles_por_movimiento'],
+        }
+
+        setup_test_environment()
+        nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            informe = ejecutar_benchmark(volumen, factor=options['factor'], repeticiones=options['repeticiones'])
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        for volumen_medido, filas in zip(informe['volumenes'], informe['mediciones']):
+            self.stdout.write(
+                f"\n{volumen_medido['insumos']} insumos, {volumen_medido['lotes']} lotes, "
+                f"{volumen_medido['movimientos']} movimientos"
+            )
+            for fila in filas:
+                self.stdout.write(
+                    f"  {fila['metodo']:5} {fila['endpoint']:30} {fila['consultas']:3}/{fila['presupuesto']:<3} consultas  "
+                    f"p50 {fila['p50_ms']:8.2f} ms  p95 {fila['p95_ms']:8.2f} ms  p99 {fila['p99_ms']:8.2f} ms"
+                )
+
+        if options['json']:
+            with open(options['json'], 'w') as archivo:
+                json.dump({'vendor': connection.vendor, 'opciones': volumen, **informe}, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Informe guardado en {options['json']}"))
+
+        if informe['infracciones']:
+            raise CommandError("Presupuesto de consultas superado:\n" + "\n".join(informe['infracciones']))
+        self.stdout.write(self.style.SUCCESS("Todos los endpoints dentro de su presupuesto."))
@@ -0,0 +1,87 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from inventory.metricas import registrar_consulta
+from inventory.models import Insumo
+
+MIDDLEWARE_METRICAS = 'inventory.middleware.MetricasMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de MetricasMiddleware: las mismas peticiones en proceso con y sin el "
+        "middleware, en rondas alternadas, sobre un endpoint servido desde la caché (sin SQL, "
+        "el peor caso relativo) y uno con una consulta. Informa la mediana por petición y el sobrecosto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=1000, help="Peticiones por ronda.")
+        parser.add_argument('--rondas', type=int, default=5, help="Rondas de cada variante (alternadas).")
+        parser.add_argument('--json', help="Guardar los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        usuario = User.objects.create_user(username=f"benchmark-{get_random_string(8)}")
+        token = Token.objects.create(user=usuario)
+        insumo = Insumo.objects.order_by('id').first()
+        endpoints = [
+            ('insumos (caché)', reverse('inventory:insumo-list')),
+            ('lotes (1 consulta)', f"{reverse('inventory:lote-list')}?insumo_id={insumo.id if insumo else 0}"),
+        ]
+        sin_metricas = [m for m in settings.MIDDLEWARE if m != MIDDLEWARE_METRICAS]
+        resultados = []
+        try:
+            for nombre, ruta in endpoints:
+                tiempos = {'con': [], 'sin': []}
+                for _ in range(options['rondas']):
+                    tiempos['con'].append(self.ronda(ruta, token.key, settings.MIDDLEWARE, options))
+                    tiempos['sin'].append(self.ronda(ruta, token.key, sin_metricas, options))
+                con = statistics.median(tiempos['con'])
+                sin = statistics.median(tiempos['sin'])
+                resultado = {
+                    'endpoint': nombre,
+                    'con_us': round(con * 1e6, 1),
+                    'sin_us': round(sin * 1e6, 1),
+                    'sobrecosto_pct': round((con - sin) / sin * 100, 2),
+                }
+                resultados.append(resultado)
+                self.stdout.write(
+                    f"{nombre:20} con {resultado['con_us']:8.1f} us  sin {resultado['sin_us']:8.1f} us  "
+                    f"sobrecosto {resultado['sobrecosto_pct']:+.2f} %"
+                )
+        finally:
+            usuario.delete()
+
+        if options['json']:
+            with open(options['json'], 'w') as archivo:
+                json.dump({'peticiones': options['peticiones'], 'rondas': options['rondas'], 'resultados': resultados}, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['json']}"))
+
+    def ronda(self, ruta, token, middleware, options):
+        """ Segundos por petición (media de la ronda) con esta lista de middleware """
+        con_metricas = MIDDLEWARE_METRICAS in middleware
+        wrappers = connection.execute_wrappers
+        if not con_metricas:
+            # Sin el execute_wrapper de metricas.py, para medir también su costo
+            connection.execute_wrappers = [w for w in wrappers if w is not registrar_consulta]
+        try:
+            with override_settings(MIDDLEWARE=middleware):
+                cliente = APIClient(HTTP_HOST='localhost')
+                cliente.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+                cliente.get(ruta)  # Calentar (carga del middleware, caché de catálogos y de tokens)
+                inicio = time.perf_counter()
+                for _ in range(options['peticiones']):
+                    cliente.get(ruta)
+                return (time.perf_counter() - inicio) / options['peticiones']
+        finally:
+            connection.execute_wrappers = wrappers
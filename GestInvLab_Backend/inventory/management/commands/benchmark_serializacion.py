@@ -0,0 +1,125 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from inventory import lectura_rapida
+from inventory.datos_sinteticos import sembrar
+from inventory.models import Insumo, Lote, Movimiento
+from inventory.pagination import MovimientoKeysetPagination
+from inventory.renderers import ORJSONRenderer
+from inventory.serializers import InsumoSerializer, LoteSerializer, ReporteMovimientoSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el camino de lectura con serializers de DRF y JSONRenderer con el camino rápido "
+        "(lectura_rapida.py y ORJSONRenderer) en el reporte de movimientos y los listados: "
+        "consultas, mediana de construir + renderizar y aceleración. Siembra datos sintéticos en una "
+        "base de datos de prueba (se crea y se destruye) y falla si los bytes de ambos caminos difieren."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--insumos', type=int, default=2000, help="Insumos a sembrar.")
+        parser.add_argument('--movimientos', type=int, default=5000, help="Movimientos a sembrar.")
+        parser.add_argument('--page-size', type=int, nargs='+', default=[100, 500], help="Tamaños de página del reporte.")
+        parser.add_argument('--repeticiones', type=int, default=20, help="Mediciones por caso.")
+        parser.add_argument('--json', help="Guardar los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            sembrar(insumos=options['insumos'], lotes_por_insumo=8, movimientos=options['movimientos'], semilla=0)
+            resultados = [self.medir(nombre, antes, ahora, options['repeticiones']) for nombre, antes, ahora in self.casos(options)]
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        for fila in resultados:
+            self.stdout.write(
+                f"{fila['caso']:22} antes {fila['antes_ms']:8.2f} ms ({fila['consultas_antes']} consultas)  "
+                f"ahora {fila['ahora_ms']:8.2f} ms ({fila['consultas_ahora']} consultas)  "
+                f"x{fila['aceleracion']:.1f}  {fila['bytes']} bytes"
+            )
+        if options['json']:
+            with open(options['json'], 'w') as archivo:
+                json.dump({'vendor': connection.vendor, 'resultados': resultados}, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['json']}"))
+
+    def casos(self, options):
+        """ (nombre, antes(), ahora()): cada función devuelve los bytes de la respuesta """
+        json_drf = JSONRenderer().render
+        json_rapido = ORJSONRenderer().render
+
+        def reporte(page_size):
+            request = RequestFactory().get('/', {'page_size': page_size})
+
+            def antes():
+                paginator = MovimientoKeysetPagination()
+                queryset = Movimiento.objects.all().prefetch_related('detalles__lote__insumo', 'usuario', 'servicio_destino')
+                page = paginator.paginate_queryset(queryset, request)
+                return json_drf({'next_cursor': paginator.next_cursor, 'results': ReporteMovimientoSerializer(page, many=True).data})
+
+            def ahora():
+                paginator = MovimientoKeysetPagination()
+                page = paginator.paginate_queryset(lectura_rapida.movimientos_reporte(Movimiento.objects.all()), request)
+                return json_rapido({'next_cursor': paginator.next_cursor, 'results': lectura_rapida.reporte(page)})
+
+            return antes, ahora
+
+        for page_size in options['page_size']:
+            yield (f"reporte (página {page_size})", *reporte(page_size))
+
+        # El insumo con más lotes con stock: el listado más largo
+        insumo_id = (
+            Lote.objects.filter(stock_por_lote__gt=0).values('insumo_id')
+            .annotate(n=Count('id')).order_by('-n').values_list('insumo_id', flat=True).first()
+        )
+        yield (
+            'lotes',
+            lambda: json_drf(LoteSerializer(
+                Lote.objects.filter(insumo_id=insumo_id, stock_por_lote__gt=0).select_related('insumo').order_by('fecha_caducidad'),
+                many=True,
+            ).data),
+            lambda: json_rapido(lectura_rapida.lotes(insumo_id)),
+        )
+        yield (
+            f"insumos ({Insumo.objects.count()})",
+            lambda: json_drf(InsumoSerializer(Insumo.objects.all().order_by('nombre'), many=True).data),
+            lambda: json_rapido(lectura_rapida.insumos()),
+        )
+
+    def medir(self, nombre, antes, ahora, repeticiones):
+        reset_queries()  # Con DEBUG la cola de consultas puede estar llena (y la cuenta daría 0)
+        with CaptureQueriesContext(connection) as consultas_antes:
+            esperado = antes()
+        with CaptureQueriesContext(connection) as consultas_ahora:
+            obtenido = ahora()
+        if obtenido != esperado:
+            raise CommandError(f"{nombre}: el camino rápido no produce los mismos bytes que los serializers.")
+
+        tiempos = {'antes': [], 'ahora': []}
+        for _ in range(repeticiones):
+            # Alternados, para que el ruido afecte igual a los dos
+            for variante, funcion in (('antes', antes), ('ahora', ahora)):
+                inicio = time.perf_counter()
+                funcion()
+                tiempos[variante].append(time.perf_counter() - inicio)
+        antes_s = statistics.median(tiempos['antes'])
+        ahora_s = statistics.median(tiempos['ahora'])
+        return {
+            'caso': nombre,
+            'bytes': len(esperado),
+            'consultas_antes': len(consultas_antes),
+            'consultas_ahora': len(consultas_ahora),
+            'antes_ms': antes_s * 1000,
+            'ahora_ms': ahora_s * 1000,
+            'aceleracion': antes_s / ahora_s,
+        }
@@ -0,0 +1,145 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+from inventory.archivo import detalles_ledger
+from inventory.cache import invalidar_catalogo
+from inventory.contadores import registrar_cambios
+from inventory.historico import neto_por_lote
+from inventory.models import Insumo, Lote
+from inventory.stock import bloquear_lotes, case_por_id, stock_lotes_subquery
+
+
+# Lotes por consulta al recorrer un tramo: PyMySQL no hace streaming y .iterator()
+# cargaría el tramo completo, así que se lee en páginas por id (keyset)
+PAGINA_LOTES = 1000
+
+
+def lotes_del_tramo(desde, hasta):
+    """ (id, insumo_id, stock_por_lote) de los lotes con desde <= id < hasta, en páginas de PAGINA_LOTES """
+    lotes = Lote.objects.filter(id__lt=hasta).order_by('id').values_list('id', 'insumo_id', 'stock_por_lote')
+    ultimo = desde - 1
+    while True:
+        pagina = list(lotes.filter(id__gt=ultimo)[:PAGINA_LOTES])
+        yield from pagina
+        if len(pagina) < PAGINA_LOTES:
+            return
+        ultimo = pagina[-1][0]
+
+
+def revisar_tramo(tramo):
+    """
+    Compara stock_por_lote con el ledger para los lotes con desde <= id < hasta.
+    Un GROUP BY de sus detalles (uno más por el historial archivado, si lo hay)
+    y los lotes en páginas, así la memoria depende del tamaño del tramo y no
+    del ledger. Devuelve (revisados, descuadres)
+    con descuadres = [(lote_id, insumo_id, stock_actual, stock_ledger)].
+    """
+    desde, hasta = tramo
+    neto = neto_por_lote(*detalles_ledger(lote_id__gte=desde, lote_id__lt=hasta))
+    revisados = 0
+    descuadres = []
+    for lote_id, insumo_id, actual in lotes_del_tramo(desde, hasta):
+        revisados += 1
+        esperado = neto.get(lote_id, (insumo_id, 0))[1]
+        if actual != esperado:
+            descuadres.append((lote_id, insumo_id, actual, esperado))
+    return revisados, descuadres
+
+
+def reparar(lote_ids):
+    """
+    Corrige los lotes indicados (y el stock_total de sus insumos). Recalcula el
+    ledger con los lotes bloqueados, para no pisar una salida o entrada concurrente.
+    """
+    with transaction.atomic():
+        lotes = bloquear_lotes(lote_ids)
+        neto = neto_por_lote(*detalles_ledger(lote_id__in=lote_ids))
+        diferencias = {}
+        for lote in lotes.values():
+            diferencia = neto.get(lote.id, (lote.insumo_id, 0))[1] - lote.stock_por_lote
+            if diferencia:
+                diferencias[lote.id] = diferencia
+        if diferencias:
+            ahora = timezone.now()
+            Lote.objects.filter(id__in=diferencias).update(
+                stock_por_lote=F('stock_por_lote') + case_por_id(diferencias), modificado_en=ahora, cambio=None
+            )
+            # stock_total se recalcula desde los lotes: también pudo estar descuadrado
+            insumo_ids = {lotes[lote_id].insumo_id for lote_id in diferencias}
+            Insumo.objects.filter(id__in=insumo_ids).update(
+                stock_total=stock_lotes_subquery(), modificado_en=ahora, cambio=None
+            )
+            registrar_cambios(Lote.objects.filter(id__in=list(diferencias)), Insumo.objects.filter(id__in=list(insumo_ids)))
+            invalidar_catalogo()
+    return len(diferencias)
+
+
+class Command(BaseCommand):
+    help = (
+        "Concilia Lote.stock_por_lote con el ledger (entradas - salidas de Detalle_Movimiento "
+        "y del historial archivado). "
+        "Recorre los lotes por tramos de id con consultas agrupadas, opcionalmente en varios "
+        "procesos, informa los descuadres y con --reparar los corrige (también Insumo.stock_total)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', type=int, default=5000, help="Lotes por tramo de id (por defecto 5000).")
+        parser.add_argument('--procesos', type=int, default=1, help="Procesos en paralelo (por defecto 1).")
+        parser.add_argument('--reparar', action='store_true', help="Corregir los descuadres encontrados.")
+
+    def handle(self, *args, **options):
+        rango = Lote.objects.aggregate(primero=Min('id'), ultimo=Max('id'))
+        if rango['primero'] is None:
+            self.stdout.write("No hay lotes que conciliar.")
+            return
+
+        paso = max(1, options['tamano'])
+        tramos = [(desde, desde + paso) for desde in range(rango['primero'], rango['ultimo'] + 1, paso)]
+        inicio = time.perf_counter()
+        totales = {'revisados': 0, 'descuadres': 0, 'corregidos': 0}
+
+        if options['procesos'] > 1:
+            if 'fork' not in multiprocessing.get_all_start_methods():
+                raise CommandError("--procesos requiere un sistema con fork; use --procesos 1.")
+            # Cada proceso abre su propia conexión; no heredar la del proceso padre.
+            # Por lo mismo, el padre no usa la base de datos mientras el pool está
+            # vivo: las reparaciones se hacen al terminar la revisión.
+            connections.close_all()
+            pendientes = []
+            with ProcessPoolExecutor(options['procesos'], mp_context=multiprocessing.get_context('fork')) as pool:
+                for resultado in pool.map(revisar_tramo, tramos):
+                    pendientes.extend(self.procesar(resultado, totales))
+            if options['reparar']:
+                for i in range(0, len(pendientes), paso):
+                    totales['corregidos'] += reparar(pendientes[i:i + paso])
+        else:
+            for tramo in tramos:
+                descuadrados = self.procesar(revisar_tramo(tramo), totales)
+                if descuadrados and options['reparar']:
+                    totales['corregidos'] += reparar(descuadrados)
+
+        duracion = time.perf_counter() - inicio
+        resumen = (
+            f"{totales['revisados']} lote(s) revisado(s) en {len(tramos)} tramo(s), {duracion:.1f}s. "
+            f"Descuadres: {totales['descuadres']}."
+        )
+        if not totales['descuadres']:
+            self.stdout.write(self.style.SUCCESS(resumen + " El stock de los lotes coincide con el ledger."))
+        elif options['reparar']:
+            self.stdout.write(self.style.SUCCESS(resumen + f" Corregidos: {totales['corregidos']}."))
+        else:
+            self.stdout.write(self.style.WARNING(resumen + " Sin cambios (use --reparar)."))
+
+    def procesar(self, resultado, totales):
+        """ Suma el resultado de un tramo e informa sus descuadres; devuelve los ids descuadrados """
+        revisados, descuadres = resultado
+        totales['revisados'] += revisados
+        totales['descuadres'] += len(descuadres)
+        for lote_id, insumo_id, actual, esperado in descuadres:
+            self.stdout.write(f"Lote {lote_id} (insumo {insumo_id}): stock_por_lote={actual}, ledger={esperado}")
+        return [lote_id for lote_id, *_ in descuadres]
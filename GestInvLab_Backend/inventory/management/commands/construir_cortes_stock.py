@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from inventory.historico import construir_corte, fechas_de_corte
+from inventory.models import CorteStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Construye los cortes mensuales de stock (día 1 de cada mes) usados por "
+        "/api/inventory/reportes/stock-historico/. Cada corte parte del anterior y "
+        "solo suma los movimientos del mes, así que basta con correrlo una vez al mes. "
+        "Por defecto solo crea los cortes que faltan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reconstruir', action='store_true', help="Rehacer también los cortes existentes.")
+
+    def handle(self, *args, **options):
+        existentes = set(CorteStock.objects.values_list('fecha', flat=True))
+        if options['reconstruir']:
+            CorteStock.objects.all().delete()
+            existentes = set()
+
+        creados = 0
+        for fecha in fechas_de_corte():
+            if fecha in existentes:
+                continue
+            _, lotes = construir_corte(fecha)
+            creados += 1
+            self.stdout.write(f"Corte {fecha}: {lotes} lote(s) con stock")
+
+        self.stdout.write(self.style.SUCCESS(f"{creados} corte(s) construido(s)."))
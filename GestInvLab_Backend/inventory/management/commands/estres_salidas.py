@@ -0,0 +1,142 @@
+import logging
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+from rest_framework.test import APIClient
+
+from inventory.contadores import sellar
+from inventory.models import Insumo, Lote, Movimiento, Servicio
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de estrés: varios hilos registran salidas en paralelo sobre los mismos lotes. "
+        "Verifica que el stock nunca quede negativo y mide el rendimiento bajo contención. "
+        "Crea sus propios datos de prueba y los elimina al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help="Clientes concurrentes.")
+        parser.add_argument('--salidas', type=int, default=50, help="Salidas que intenta registrar cada hilo.")
+        parser.add_argument('--lotes', type=int, default=3, help="Lotes compartidos por todos los hilos.")
+        parser.add_argument('--stock', type=int, default=100, help="Stock inicial de cada lote.")
+        parser.add_argument('--cantidad', type=int, default=1, help="Cantidad máxima por línea.")
+        parser.add_argument('--conservar', action='store_true', help="No eliminar los datos de prueba.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite no soporta SELECT ... FOR UPDATE ni escrituras concurrentes; "
+                "los resultados no son representativos."
+            ))
+
+        sufijo = get_random_string(8)
+        usuario = User.objects.create_user(username=f"estres-{sufijo}")
+        servicio = Servicio.objects.create(nombre=f"Estrés {sufijo}")
+        insumo = Insumo.objects.create(
+            nombre=f"Insumo estrés {sufijo}",
+            codigo_producto=f"ESTRES-{sufijo}",
+            stock_total=options['stock'] * options['lotes'],
+        )
+        Lote.objects.bulk_create([
+            Lote(insumo=insumo, numero_lote=f"L{i}", stock_por_lote=options['stock'])
+            for i in range(options['lotes'])
+        ])
+        # bulk_create no dispara post_save: número de cambio para la sincronización
+        sellar(Lote.objects.filter(insumo=insumo))
+        lote_ids = list(Lote.objects.filter(insumo=insumo).values_list('id', flat=True))
+
+        # Los 400 por stock insuficiente son esperados; no llenar la consola con ellos
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        try:
+            resultados = self.disparar(usuario, servicio, lote_ids, options)
+            self.verificar(insumo, lote_ids, options, resultados)
+        finally:
+            if not options['conservar']:
+                Movimiento.objects.filter(usuario=usuario).delete()
+                insumo.delete()
+                servicio.delete()
+                usuario.delete()
+
+    def disparar(self, usuario, servicio, lote_ids, options):
+        url = reverse('inventory:movimiento-create')
+        resultados = {'latencias': [], 'ok': 0, 'rechazadas': 0, 'errores': [], 'descontado': 0}
+        lock = threading.Lock()
+        barrera = threading.Barrier(options['hilos'])
+
+        def cliente():
+            client = APIClient(HTTP_HOST='localhost')
+            client.force_authenticate(usuario)
+            azar = random.Random()
+            try:
+                barrera.wait()
+                for _ in range(options['salidas']):
+                    # Lotes en orden aleatorio: el servidor debe ordenar los bloqueos
+                    elegidos = azar.sample(lote_ids, azar.randint(1, len(lote_ids)))
+                    detalles = [{'lote': lote_id, 'cantidad': azar.randint(1, options['cantidad'])} for lote_id in elegidos]
+                    inicio = time.perf_counter()
+                    try:
+                        response = client.post(url, {'servicio_destino': servicio.id, 'detalles': detalles}, format='json')
+                        status_code = response.status_code
+                    except Exception as e:
+                        status_code = type(e).__name__
+                    latencia = time.perf_counter() - inicio
+                    with lock:
+                        resultados['latencias'].append(latencia)
+                        if status_code == 201:
+                            resultados['ok'] += 1
+                            resultados['descontado'] += sum(d['cantidad'] for d in detalles)
+                        elif status_code == 400:
+                            resultados['rechazadas'] += 1
+                        else:
+                            resultados['errores'].append(status_code)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=cliente) for _ in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        resultados['duracion'] = time.perf_counter() - inicio
+        return resultados
+
+    def verificar(self, insumo, lote_ids, options, resultados):
+        latencias = sorted(resultados['latencias'])
+        total = len(latencias)
+        p99 = latencias[min(total - 1, int(total * 0.99))] if total else 0
+        self.stdout.write(
+            f"Solicitudes: {total} en {resultados['duracion']:.2f}s "
+            f"({total / resultados['duracion']:.1f} req/s, {resultados['ok'] / resultados['duracion']:.1f} salidas/s)\n"
+            f"Registradas: {resultados['ok']}  Rechazadas por stock: {resultados['rechazadas']}  "
+            f"Errores: {len(resultados['errores'])}\n"
+            f"Latencia p50: {statistics.median(latencias) * 1000 if total else 0:.1f} ms  p99: {p99 * 1000:.1f} ms"
+        )
+
+        stock_lotes = dict(Lote.objects.filter(id__in=lote_ids).values_list('id', 'stock_por_lote'))
+        insumo.refresh_from_db()
+        problemas = []
+        negativos = {lote_id: stock for lote_id, stock in stock_lotes.items() if stock < 0}
+        if negativos:
+            problemas.append(f"lotes con stock negativo: {negativos}")
+        esperado = options['stock'] * len(lote_ids) - resultados['descontado']
+        if sum(stock_lotes.values()) != esperado:
+            problemas.append(f"stock de lotes {sum(stock_lotes.values())} != esperado {esperado}")
+        suma_lotes = Lote.objects.filter(insumo=insumo).aggregate(total=Sum('stock_por_lote'))['total']
+        if insumo.stock_total != suma_lotes:
+            problemas.append(f"stock_total {insumo.stock_total} != suma de lotes {suma_lotes}")
+        if resultados['errores']:
+            problemas.append(f"respuestas inesperadas: {sorted(set(map(str, resultados['errores'])))}")
+
+        if problemas:
+            raise CommandError("Inconsistencias detectadas: " + "; ".join(problemas))
+        self.stdout.write(self.style.SUCCESS("Stock consistente: ningún lote quedó negativo."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from inventory.alertas import calcular_alertas, guardar_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula las alertas de stock crítico y de lotes por vencer y guarda la foto "
+        "en AlertaInventario (la que lee /api/inventory/alertas/). Pensado para cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30, help="Avisar lotes que vencen dentro de N días (por defecto 30).")
+
+    def handle(self, *args, **options):
+        resultado = calcular_alertas(options['dias'])
+        guardar_snapshot(resultado)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(resultado['stock_critico'])} insumo(s) en stock crítico, "
+            f"{len(resultado['por_vencer'])} lote(s) por vencer en {options['dias']} días."
+        ))
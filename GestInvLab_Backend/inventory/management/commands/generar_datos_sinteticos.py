@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.datos_sinteticos import sembrar
+from inventory.models import Insumo
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera servicios, insumos, lotes y un historial de movimientos sintéticos en la base de "
+        "datos configurada, para pruebas de capacidad (ver inventory/datos_sinteticos.py). Inserta "
+        "por bloques, sin señales y con memoria acotada, así que admite decenas de millones de "
+        "detalles. Deja el stock de lotes e insumos y ConsumoDiario coherentes con el historial."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servicios', type=int, default=20, help="Servicios a crear.")
+        parser.add_argument('--usuarios', type=int, default=10, help="Usuarios que registran los movimientos.")
+        parser.add_argument('--insumos', type=int, default=2000, help="Insumos a crear.")
+        parser.add_argument('--lotes-por-insumo', type=int, default=4, help="Lotes por insumo.")
+        parser.add_argument('--movimientos', type=int, default=100000, help="Movimientos a generar.")
+        parser.add_argument('--detalles-por-movimiento', type=int, default=3, help="Detalles promedio por movimiento.")
+        parser.add_argument('--dias', type=int, default=365, help="Días de historial, hasta hoy.")
+        parser.add_argument('--prefijo', default='SIN', help="Prefijo de códigos, lotes, documentos, servicios y usuarios.")
+        parser.add_argument('--semilla', type=int, help="Semilla del generador (resultados reproducibles).")
+        parser.add_argument('--tamano-lote', type=int, default=5000, help="Filas por INSERT y por transacción.")
+
+    def handle(self, *args, **options):
+        for opcion in ('servicios', 'usuarios', 'insumos', 'lotes_por_insumo', 'detalles_por_movimiento', 'dias', 'tamano_lote'):
+            if options[opcion] < 1:
+                raise CommandError(f"--{opcion.replace('_', '-')} debe ser al menos 1.")
+        if options['movimientos'] < 0:
+            raise CommandError("--movimientos no puede ser negativo.")
+        if Insumo.objects.filter(codigo_producto__startswith=f"{options['prefijo']}-").exists():
+            raise CommandError(f"Ya hay insumos con el prefijo '{options['prefijo']}'; use otro --prefijo.")
+
+        inicio = time.perf_counter()
+        ultimo_aviso = [inicio]
+
+        def progreso(dia, totales):
+            ahora = time.perf_counter()
+            if ahora - ultimo_aviso[0] >= 10:
+                ultimo_aviso[0] = ahora
+                self.stdout.write(
+                    f"  {dia}: {totales['movimientos']} movimientos, {totales['detalles']} detalles "
+                    f"({totales['detalles'] / (ahora - inicio):.0f} detalles/s)"
+                )
+
+        filas = sembrar(
+            insumos=options['insumos'],
+            lotes_por_insumo=options['lotes_por_insumo'],
+            movimientos=options['movimientos'],
+            detalles_por_movimiento=options['detalles_por_movimiento'],
+            servicios=options['servicios'],
+            usuarios=options['usuarios'],
+            dias=options['dias'],
+            prefijo=options['prefijo'],
+            semilla=options['semilla'],
+            tamano_lote=options['tamano_lote'],
+            progreso=progreso,
+        )
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas['insumos']} insumos, {filas['lotes']} lotes, {filas['movimientos']} movimientos, "
+            f"{filas['detalles']} detalles y {filas['consumos_diarios']} filas de ConsumoDiario "
+            f"en {duracion:.1f}s."
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.importacion import TAMANO_LOTE, importar_insumos
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa el catálogo de insumos desde un CSV (codigo_producto, nombre, umbral_critico). "
+        "Crea los códigos nuevos y actualiza los existentes, por lotes en transacciones "
+        "independientes; las filas inválidas se informan sin detener la importación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del CSV (UTF-8).")
+        parser.add_argument('--tamano', type=int, default=TAMANO_LOTE, help=f"Filas por transacción (por defecto {TAMANO_LOTE}).")
+        parser.add_argument('--solo-nuevos', action='store_true', help="No actualizar códigos existentes; informarlos como error.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                informe = importar_insumos(archivo, max(1, options['tamano']), options['solo_nuevos'])
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for error in informe['errores']:
+            self.stdout.write(f"Fila {error['fila']} ({error['codigo_producto']}): {' '.join(error['errores'])}")
+        resumen = (
+            f"{informe['procesadas']} fila(s): {informe['creados']} creado(s), "
+            f"{informe['actualizados']} actualizado(s), {len(informe['errores'])} con errores."
+        )
+        if informe['errores']:
+            self.stdout.write(self.style.WARNING(resumen))
+        else:
+            self.stdout.write(self.style.SUCCESS(resumen))
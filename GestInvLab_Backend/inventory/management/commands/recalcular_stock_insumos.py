@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from inventory.cache import invalidar_catalogo
+from inventory.contadores import registrar_cambios
+from inventory.models import Insumo
+from inventory.stock import stock_lotes_subquery
+
+
+class Command(BaseCommand):
+    help = "Reconstruye Insumo.stock_total a partir de la suma de stock_por_lote de sus lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Solo informa las diferencias, sin corregirlas."
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            descuadrados = list(
+                Insumo.objects.annotate(stock_lotes=stock_lotes_subquery())
+                .exclude(stock_total=F('stock_lotes'))
+                .values_list('id', 'codigo_producto', 'stock_total', 'stock_lotes')
+            )
+            for insumo_id, codigo, actual, esperado in descuadrados:
+                self.stdout.write(f"Insumo {insumo_id} ({codigo}): stock_total={actual}, lotes={esperado}")
+
+            if descuadrados and not options['dry_run']:
+                # Un único UPDATE para los descuadrados
+                ids = [fila[0] for fila in descuadrados]
+                Insumo.objects.filter(id__in=ids).update(
+                    stock_total=stock_lotes_subquery(), modificado_en=timezone.now(), cambio=None
+                )
+                registrar_cambios(Insumo.objects.filter(id__in=ids))
+                invalidar_catalogo()
+
+        if not descuadrados:
+            self.stdout.write(self.style.SUCCESS("Todos los stock_total coinciden con sus lotes."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(descuadrados)} insumo(s) descuadrado(s) (sin cambios)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(descuadrados)} insumo(s) corregido(s)."))
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from inventory.archivo import detalles_ledger
+from inventory.historico import inicio_del_dia
+from inventory.models import ConsumoDiario, Movimiento, MovimientoArchivado
+
+
+def agrupar_ledger(detalles):
+    """ Suma de cantidades del ledger agrupada por la clave de ConsumoDiario """
+    return (
+        detalles
+        .annotate(dia=TruncDate('movimiento__fecha_registro'))
+        .values('dia', 'lote__insumo_id', 'movimiento__servicio_destino_id', 'movimiento__tipo_movimiento')
+        .annotate(total=Sum('cantidad'))
+        .order_by()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye ConsumoDiario desde Detalle_Movimiento (y el historial archivado), por bloques de días. "
+        "Cada bloque se borra y se vuelve a calcular en su propia transacción, "
+        "así que el comando se puede interrumpir y retomar con --desde."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7, help="Días por bloque (por defecto 7).")
+        parser.add_argument('--desde', help="Primer día a reconstruir (AAAA-MM-DD). Por defecto, el primer movimiento.")
+        parser.add_argument('--hasta', help="Último día a reconstruir (AAAA-MM-DD). Por defecto, el último movimiento.")
+
+    def handle(self, *args, **options):
+        rangos = [
+            rango for rango in (
+                modelo.objects.aggregate(primero=Min('fecha_registro'), ultimo=Max('fecha_registro'))
+                for modelo in (MovimientoArchivado, Movimiento)
+            )
+            if rango['primero'] is not None
+        ]
+        if not rangos:
+            self.stdout.write("No hay movimientos que procesar.")
+            return
+
+        desde = self.fecha_opcion(options['desde']) or timezone.localdate(min(rango['primero'] for rango in rangos))
+        hasta = self.fecha_opcion(options['hasta']) or timezone.localdate(max(rango['ultimo'] for rango in rangos))
+        paso = timedelta(days=max(1, options['dias']))
+
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + paso, hasta + timedelta(days=1))
+            with transaction.atomic():
+                ConsumoDiario.objects.filter(fecha__gte=inicio, fecha__lt=fin).delete()
+                # Con un año a medio archivar, una misma clave puede venir de las dos tablas
+                totales = {}
+                for detalles in detalles_ledger(
+                    inicio_del_dia(inicio), movimiento__fecha_registro__lt=inicio_del_dia(fin)
+                ):
+                    for fila in agrupar_ledger(detalles):
+                        clave = (fila['dia'], fila['lote__insumo_id'], fila['movimiento__servicio_destino_id'], fila['movimiento__tipo_movimiento'])
+                        totales[clave] = totales.get(clave, 0) + fila['total']
+                filas = [
+                    ConsumoDiario(fecha=dia, insumo_id=insumo_id, servicio_id=servicio_id, tipo_movimiento=tipo, cantidad=total)
+                    for (dia, insumo_id, servicio_id, tipo), total in totales.items()
+                ]
+                ConsumoDiario.objects.bulk_create(filas, batch_size=1000)
+            self.stdout.write(f"{inicio} .. {fin - timedelta(days=1)}: {len(filas)} fila(s)")
+            inicio = fin
+
+        self.stdout.write(self.style.SUCCESS("ConsumoDiario reconstruido."))
+
+    def fecha_opcion(self, valor):
+        if not valor:
+            return None
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f"Fecha inválida: {valor}")
+        return fecha
@@ -0,0 +1,234 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from rest_framework.authtoken.models import Token
+
+from inventory.benchmark import percentil
+from inventory.datos_sinteticos import pesos_zipf
+
+OPERACIONES = ('salida', 'entrada', 'reporte')
+
+
+def leer_mezcla(texto):
+    """ 'salida=70,entrada=10,reporte=20' -> {'salida': 70, ...} """
+    mezcla = {}
+    for parte in texto.split(','):
+        operacion, _, peso = parte.partition('=')
+        operacion = operacion.strip()
+        if operacion not in OPERACIONES:
+            raise CommandError(f"Operación desconocida en --mezcla: '{operacion}'. Opciones: {', '.join(OPERACIONES)}.")
+        try:
+            mezcla[operacion] = float(peso)
+        except ValueError:
+            raise CommandError(f"Peso inválido en --mezcla para '{operacion}': '{peso}'.")
+    if not any(peso > 0 for peso in mezcla.values()):
+        raise CommandError("--mezcla debe tener al menos una operación con peso positivo.")
+    return mezcla
+
+
+class Command(BaseCommand):
+    help = (
+        "Generador de carga: N clientes concurrentes reproducen contra un servidor ya levantado "
+        "una mezcla de salidas, entradas y reportes (insumos y servicios con popularidad de Zipf, "
+        "como en generar_datos_sinteticos). Informa el rendimiento (req/s) y la latencia "
+        "p50/p95/p99 por operación. Las salidas rechazadas por falta de stock (400) se cuentan aparte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="URL base del servidor.")
+        parser.add_argument('--clientes', type=int, default=16, help="Clientes concurrentes.")
+        parser.add_argument('--peticiones', type=int, default=2000, help="Peticiones en total.")
+        parser.add_argument('--duracion', type=float, help="Segundos de carga (reemplaza a --peticiones).")
+        parser.add_argument('--mezcla', default='salida=70,entrada=10,reporte=20', help="Pesos de cada operación.")
+        parser.add_argument('--token', help="Token de API. Sin él se crea un usuario temporal en la base de datos configurada.")
+        parser.add_argument('--timeout', type=float, default=30, help="Segundos de espera por petición.")
+        parser.add_argument('--semilla', type=int, help="Semilla del generador.")
+        parser.add_argument('--json', help="Guardar los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        if options['clientes'] < 1:
+            raise CommandError("--clientes debe ser al menos 1.")
+        mezcla = leer_mezcla(options['mezcla'])
+        self.url = options['url'].rstrip('/')
+        self.timeout = options['timeout']
+
+        usuario = None
+        token = options['token']
+        if not token:
+            usuario = User.objects.create_user(username=f"carga-{get_random_string(8)}")
+            token = Token.objects.create(user=usuario).key
+        self.cabeceras = {'Authorization': f'Token {token}', 'Content-Type': 'application/json'}
+        try:
+            catalogos = self.catalogos()
+            resultados = self.disparar(catalogos, mezcla, options)
+        finally:
+            if usuario is not None:
+                # Los movimientos registrados quedan (PROTECT): se desactiva en vez de borrar
+                usuario.is_active = False
+                usuario.save(update_fields=['is_active'])
+                Token.objects.filter(user=usuario).delete()
+
+        self.informar(resultados, options)
+
+    def peticion(self, metodo, ruta, datos=None):
+        """ (código de estado, cuerpo) de una petición al servidor """
+        cuerpo = json.dumps(datos).encode() if datos is not None else None
+        solicitud = urllib.request.Request(self.url + ruta, data=cuerpo, method=metodo, headers=self.cabeceras)
+        try:
+            with urllib.request.urlopen(solicitud, timeout=self.timeout) as respuesta:
+                return respuesta.status, respuesta.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def catalogos(self):
+        try:
+            estado, cuerpo = self.peticion('GET', reverse('inventory:arranque'))
+        except OSError as e:
+            raise CommandError(f"No se pudo conectar con {self.url}: {e}")
+        if estado != 200:
+            raise CommandError(f"{reverse('inventory:arranque')} respondió {estado}; revise --url y --token.")
+        datos = json.loads(cuerpo)
+        # Los más abastecidos, primero: son los más populares de la distribución de Zipf
+        insumos = sorted(datos['insumos'], key=lambda insumo: -insumo['stock_total'])
+        servicios = [servicio['id'] for servicio in datos['servicios']]
+        if not insumos or not servicios:
+            raise CommandError("El servidor no tiene insumos o servicios; ejecute antes generar_datos_sinteticos.")
+        return {
+            'insumos': [insumo['id'] for insumo in insumos],
+            'pesos_insumos': pesos_zipf(len(insumos)),
+            'servicios': servicios,
+            'pesos_servicios': pesos_zipf(len(servicios)),
+        }
+
+    def preparar(self, operacion, azar, catalogos, n):
+        """ (método, ruta, datos) de la n-ésima petición """
+        def insumos(k):
+            return list(set(azar.choices(catalogos['insumos'], cum_weights=catalogos['pesos_insumos'], k=k)))
+
+        if operacion == 'salida':
+            return 'POST', reverse('inventory:movimiento-create'), {
+                'servicio_destino': azar.choices(catalogos['servicios'], cum_weights=catalogos['pesos_servicios'])[0],
+                'detalles': [{'insumo_id': insumo_id, 'cantidad': azar.randint(1, 5)} for insumo_id in insumos(azar.randint(1, 4))],
+            }
+        if operacion == 'entrada':
+            # Un lote por insumo y día, como una recepción real: no crece la tabla de lotes sin límite
+            numero_lote = f"CARGA-{timezone.localdate():%Y%m%d}"
+            return 'POST', reverse('inventory:entrada-create'), {
+                'detalles': [
+                    {'insumo_id': insumo_id, 'numero_lote': numero_lote, 'cantidad': azar.randint(50, 200)}
+                    for insumo_id in insumos(azar.randint(1, 3))
+                ],
+            }
+        desde = (timezone.localdate() - timedelta(days=azar.choice((7, 30, 90)))).isoformat()
+        filtros = azar.choice((
+            f"insumo_id={insumos(1)[0]}",
+            f"servicio_id={azar.choice(catalogos['servicios'])}",
+            "tipo_movimiento=Salida",
+        ))
+        if n % 2:
+            return 'GET', f"{reverse('inventory:reporte-movimientos')}?page_size=50&fecha_inicio={desde}&{filtros}", None
+        return 'GET', f"{reverse('inventory:reporte-consumo')}?periodo={azar.choice(('dia', 'mes'))}&fecha_inicio={desde}", None
+
+    def disparar(self, catalogos, mezcla, options):
+        operaciones = list(mezcla)
+        pesos = [mezcla[operacion] for operacion in operaciones]
+        resultados = {operacion: {'latencias': [], 'ok': 0, 'rechazadas': 0, 'errores': []} for operacion in operaciones}
+        lock = threading.Lock()
+        contador = iter(range(options['peticiones'] if options['duracion'] is None else 2 ** 62))
+        fin = None if options['duracion'] is None else time.perf_counter() + options['duracion']
+        semilla = options['semilla']
+
+        def cliente(numero):
+            azar = random.Random(None if semilla is None else semilla + numero)
+            while True:
+                with lock:
+                    n = next(contador, None)
+                if n is None or (fin is not None and time.perf_counter() >= fin):
+                    return
+                operacion = azar.choices(operaciones, weights=pesos)[0]
+                metodo, ruta, datos = self.preparar(operacion, azar, catalogos, n)
+                inicio = time.perf_counter()
+                try:
+                    estado, _ = self.peticion(metodo, ruta, datos)
+                except OSError as e:
+                    estado = type(e).__name__
+                latencia = time.perf_counter() - inicio
+                with lock:
+                    resultado = resultados[operacion]
+                    resultado['latencias'].append(latencia)
+                    if estado in (200, 201):
+                        resultado['ok'] += 1
+                    elif estado == 400 and operacion == 'salida':
+                        resultado['rechazadas'] += 1
+                    else:
+                        resultado['errores'].append(estado)
+
+        hilos = [threading.Thread(target=cliente, args=(numero,)) for numero in range(options['clientes'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        resumen = []
+        for operacion in operaciones:
+            resultado = resultados[operacion]
+            latencias = sorted(resultado['latencias'])
+            resumen.append({
+                'operacion': operacion,
+                'peticiones': len(latencias),
+                'ok': resultado['ok'],
+                'rechazadas': resultado['rechazadas'],
+                'errores': len(resultado['errores']),
+                'codigos_error': sorted(set(map(str, resultado['errores']))),
+                'req_s': len(latencias) / duracion if duracion else 0,
+                'p50_ms': percentil(latencias, 0.50) * 1000,
+                'p95_ms': percentil(latencias, 0.95) * 1000,
+                'p99_ms': percentil(latencias, 0.99) * 1000,
+            })
+        todas = sorted(latencia for resultado in resultados.values() for latencia in resultado['latencias'])
+        return {
+            'duracion_s': duracion,
+            'operaciones': resumen,
+            'total': {
+                'peticiones': len(todas),
+                'req_s': len(todas) / duracion if duracion else 0,
+                'p50_ms': percentil(todas, 0.50) * 1000,
+                'p95_ms': percentil(todas, 0.95) * 1000,
+                'p99_ms': percentil(todas, 0.99) * 1000,
+            },
+        }
+
+    def informar(self, resultados, options):
+        for fila in resultados['operaciones']:
+            self.stdout.write(
+                f"{fila['operacion']:8} {fila['peticiones']:7} peticiones {fila['req_s']:8.1f} req/s  "
+                f"p50 {fila['p50_ms']:7.1f} ms  p95 {fila['p95_ms']:7.1f} ms  p99 {fila['p99_ms']:7.1f} ms  "
+                f"rechazadas {fila['rechazadas']}  errores {fila['errores']}"
+            )
+        total = resultados['total']
+        self.stdout.write(
+            f"{'total':8} {total['peticiones']:7} peticiones {total['req_s']:8.1f} req/s  "
+            f"p50 {total['p50_ms']:7.1f} ms  p95 {total['p95_ms']:7.1f} ms  p99 {total['p99_ms']:7.1f} ms  "
+            f"en {resultados['duracion_s']:.1f}s con {options['clientes']} clientes"
+        )
+
+        if options['json']:
+            with open(options['json'], 'w') as archivo:
+                json.dump({'url': self.url, 'clientes': options['clientes'], 'mezcla': options['mezcla'], **resultados}, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['json']}"))
+
+        errores = sum(fila['errores'] for fila in resultados['operaciones'])
+        if errores:
+            self.stdout.write(self.style.WARNING(f"{errores} peticiones con errores inesperados."))
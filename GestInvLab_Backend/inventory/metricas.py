@@ -0,0 +1,149 @@
+"""
+Métricas de las peticiones HTTP, en memoria de cada proceso.
+
+MetricasMiddleware (middleware.py) mide cada petición: latencia, número de
+consultas SQL y su tiempo total, y tamaño de la respuesta, agrupados por ruta
+(el patrón de URL, no la URL concreta, para que los ids no creen una serie
+por fila). Las consultas se cuentan con un execute_wrapper que se instala en
+cada conexión al abrirse y que busca la medición de la petición actual en
+una ContextVar: así también cuenta las consultas de las vistas async, que el
+ORM ejecuta en otro hilo con sync_to_async (que copia el contexto).
+
+/metrics expone todo en el formato de texto de Prometheus. Con varios
+procesos (gunicorn), cada uno tiene sus propios contadores: Prometheus
+debe consultar cada proceso, o sumar las series con la etiqueta de instancia.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    """ Consultas y tiempo de base de datos de una petición """
+    __slots__ = ('consultas', 'tiempo_db')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+
+
+def iniciar_medicion():
+    medicion = Medicion()
+    return medicion, _medicion_actual.set(medicion)
+
+
+def terminar_medicion(token):
+    _medicion_actual.reset(token)
+
+
+def registrar_consulta(execute, sql, params, many, context):
+    """ execute_wrapper de todas las conexiones (ver instrumentar_conexion) """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.tiempo_db += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+def instrumentar_conexion(sender, connection, **kwargs):
+    """ Receptor de connection_created (conectado en InventoryConfig.ready) """
+    # Se dispara en cada reconexión del mismo DatabaseWrapper: instalarlo una sola vez
+    if registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_consulta)
+
+
+class _Serie:
+    __slots__ = ('buckets', 'suma', 'cuenta', 'consultas', 'tiempo_db', 'bytes', 'estados')
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.cuenta = 0
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.bytes = 0
+        self.estados = defaultdict(int)
+
+
+_series = defaultdict(_Serie)
+_lock = threading.Lock()
+
+
+def observar(ruta, metodo, estado, duracion, medicion, tamano):
+    with _lock:
+        serie = _series[(ruta, metodo)]
+        for i, limite in enumerate(BUCKETS):
+            if duracion <= limite:
+                serie.buckets[i] += 1
+                break
+        serie.suma += duracion
+        serie.cuenta += 1
+        serie.consultas += medicion.consultas
+        serie.tiempo_db += medicion.tiempo_db
+        serie.bytes += tamano
+        serie.estados[estado] += 1
+
+
+def reiniciar():
+    with _lock:
+        _series.clear()
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(**valores):
+    return "{" + ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in valores.items()) + "}"
+
+
+def exportar_prometheus():
+    """ Todas las series en el formato de texto de Prometheus (version 0.0.4) """
+    with _lock:
+        series = sorted(
+            (clave, serie.buckets[:], serie.suma, serie.cuenta, serie.consultas, serie.tiempo_db, serie.bytes, dict(serie.estados))
+            for clave, serie in _series.items()
+        )
+
+    lineas = [
+        "# HELP gestinvlab_http_request_duration_seconds Latencia de las peticiones por ruta.",
+        "# TYPE gestinvlab_http_request_duration_seconds histogram",
+    ]
+    for (ruta, metodo), buckets, suma, cuenta, *_ in series:
+        acumulado = 0
+        for limite, n in zip(BUCKETS, buckets):
+            acumulado += n
+            lineas.append(
+                f"gestinvlab_http_request_duration_seconds_bucket{_etiquetas(route=ruta, method=metodo, le=limite)} {acumulado}"
+            )
+        lineas.append(f"gestinvlab_http_request_duration_seconds_bucket{_etiquetas(route=ruta, method=metodo, le='+Inf')} {cuenta}")
+        lineas.append(f"gestinvlab_http_request_duration_seconds_sum{_etiquetas(route=ruta, method=metodo)} {suma}")
+        lineas.append(f"gestinvlab_http_request_duration_seconds_count{_etiquetas(route=ruta, method=metodo)} {cuenta}")
+
+    contadores = [
+        ('gestinvlab_http_requests_total', "Peticiones por ruta y código de estado.", None),
+        ('gestinvlab_db_queries_total', "Consultas SQL ejecutadas por las peticiones.", 4),
+        ('gestinvlab_db_query_duration_seconds_total', "Tiempo total en consultas SQL.", 5),
+        ('gestinvlab_http_response_size_bytes_total', "Bytes de respuesta (sin contar las respuestas en streaming).", 6),
+    ]
+    for nombre, ayuda, indice in contadores:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} counter")
+        for fila in series:
+            ruta, metodo = fila[0]
+            if indice is None:
+                for estado, n in sorted(fila[7].items()):
+                    lineas.append(f"{nombre}{_etiquetas(route=ruta, method=metodo, status=estado)} {n}")
+            else:
+                lineas.append(f"{nombre}{_etiquetas(route=ruta, method=metodo)} {fila[indice]}")
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,64 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metricas
+
+logger = logging.getLogger('inventory.lentas')
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición (ver metricas.py): latencia, consultas SQL y su tiempo,
+    y tamaño de la respuesta. Agrega la cabecera Server-Timing y registra en
+    el logger 'inventory.lentas' las peticiones que superan SOLICITUD_LENTA_MS.
+    Funciona con WSGI y con ASGI (vistas async) sin adaptar la cadena de middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        medicion, token = metricas.iniciar_medicion()
+        try:
+            response = self.get_response(request)
+        finally:
+            metricas.terminar_medicion(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        medicion, token = metricas.iniciar_medicion()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metricas.terminar_medicion(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def registrar(self, request, response, medicion, duracion):
+        match = request.resolver_match
+        ruta = f"/{match.route}" if match is not None else "<sin ruta>"
+        # En streaming el cuerpo aún no se generó: la latencia es hasta las cabeceras
+        tamano = 0 if response.streaming else len(response.content)
+        metricas.observar(ruta, request.method, response.status_code, duracion, medicion, tamano)
+
+        response['Server-Timing'] = (
+            f'app;dur={duracion * 1000:.1f}, '
+            f'db;dur={medicion.tiempo_db * 1000:.1f};desc="{medicion.consultas} consultas"'
+        )
+        if duracion * 1000 >= settings.SOLICITUD_LENTA_MS:
+            logger.warning(
+                "Petición lenta: %s %s -> %s en %.0f ms (%d consultas, %.0f ms en BD, %d bytes)",
+                request.method, request.get_full_path(), response.status_code, duracion * 1000,
+                medicion.consultas, medicion.tiempo_db * 1000, tamano,
+            )
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:00
+
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_stock_total(apps, schema_editor):
+    Insumo = apps.get_model('inventory', 'Insumo')
+    Lote = apps.get_model('inventory', 'Lote')
+    suma = (
+        Lote.objects.filter(insumo=OuterRef('pk'))
+        .order_by()
+        .values('insumo')
+        .annotate(total=Sum('stock_por_lote'))
+        .values('total')
+    )
+    Insumo.objects.update(
+        stock_total=Coalesce(Subquery(suma, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_remove_insumo_stock_actual_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insumo',
+            name='stock_total',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Stock Total'),
+        ),
+        migrations.RunPython(calcular_stock_total, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_insumo_stock_total'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['insumo', 'fecha_caducidad'], name='lote_insumo_caducidad_idx'),
+        ),
+    ]
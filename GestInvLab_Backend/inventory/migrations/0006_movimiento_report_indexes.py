@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_lote_insumo_caducidad_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['fecha_registro'], name='movimiento_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['tipo_movimiento', 'fecha_registro'], name='movimiento_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['servicio_destino', 'fecha_registro'], name='movimiento_servicio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['usuario', 'fecha_registro'], name='movimiento_usuario_fecha_idx'),
+        ),
+    ]
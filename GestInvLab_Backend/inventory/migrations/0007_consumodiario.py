@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:08
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_consumo_diario(apps, schema_editor):
+    ConsumoDiario = apps.get_model('inventory', 'ConsumoDiario')
+    Detalle_Movimiento = apps.get_model('inventory', 'Detalle_Movimiento')
+    filas = (
+        Detalle_Movimiento.objects
+        .annotate(dia=TruncDate('movimiento__fecha_registro'))
+        .values('dia', 'lote__insumo_id', 'movimiento__servicio_destino_id', 'movimiento__tipo_movimiento')
+        .annotate(total=Sum('cantidad'))
+        .order_by()
+    )
+    ConsumoDiario.objects.bulk_create(
+        (
+            ConsumoDiario(
+                fecha=fila['dia'],
+                insumo_id=fila['lote__insumo_id'],
+                servicio_id=fila['movimiento__servicio_destino_id'],
+                tipo_movimiento=fila['movimiento__tipo_movimiento'],
+                cantidad=fila['total'],
+            )
+            for fila in filas.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_movimiento_report_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('tipo_movimiento', models.CharField(choices=[('Entrada', 'Entrada'), ('Salida', 'Salida')], max_length=10, verbose_name='Tipo de Movimiento')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos_diarios', to='inventory.insumo')),
+                ('servicio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='consumos_diarios', to='inventory.servicio')),
+            ],
+            options={
+                'verbose_name': 'Consumo Diario',
+                'verbose_name_plural': 'Consumos Diarios',
+                'constraints': [models.UniqueConstraint(models.F('fecha'), models.F('insumo'), django.db.models.functions.comparison.Coalesce(models.F('servicio'), models.Value(0)), models.F('tipo_movimiento'), name='consumo_diario_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_consumo_diario, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_consumodiario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertaInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('stock_critico', 'Stock crítico'), ('por_vencer', 'Lote por vencer')], max_length=20, verbose_name='Tipo de Alerta')),
+                ('stock', models.IntegerField(verbose_name='Stock')),
+                ('umbral_critico', models.IntegerField(blank=True, null=True, verbose_name='Umbral de Stock Crítico')),
+                ('fecha_caducidad', models.DateField(blank=True, null=True, verbose_name='Fecha de Caducidad')),
+                ('dias_aviso', models.IntegerField(verbose_name='Días de Aviso')),
+                ('generado_en', models.DateTimeField(verbose_name='Generado en')),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='inventory.insumo')),
+                ('lote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='inventory.lote')),
+            ],
+            options={
+                'verbose_name': 'Alerta de Inventario',
+                'verbose_name_plural': 'Alertas de Inventario',
+            },
+        ),
+    ]
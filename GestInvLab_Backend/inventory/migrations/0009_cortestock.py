@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_alertainventario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorteStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True, verbose_name='Fecha de Corte')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Creado en')),
+            ],
+            options={
+                'verbose_name': 'Corte de Stock',
+                'verbose_name_plural': 'Cortes de Stock',
+            },
+        ),
+        migrations.CreateModel(
+            name='CorteStockLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField(verbose_name='Stock')),
+                ('corte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lotes', to='inventory.cortestock')),
+                ('insumo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cortes', to='inventory.insumo')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cortes', to='inventory.lote')),
+            ],
+            options={
+                'verbose_name': 'Stock de Lote en Corte',
+                'verbose_name_plural': 'Stock de Lotes en Cortes',
+                'unique_together': {('corte', 'lote')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:17
+
+import re
+
+from django.db import migrations, models
+
+
+def iniciar_secuencias(apps, schema_editor):
+    """ Continúa después del mayor número existente de cada prefijo y año (ENT-2025-00042) """
+    Movimiento = apps.get_model('inventory', 'Movimiento')
+    SecuenciaDocumento = apps.get_model('inventory', 'SecuenciaDocumento')
+    ultimos = {}
+    documentos = Movimiento.objects.exclude(numero_documento__isnull=True).values_list('numero_documento', flat=True)
+    for documento in documentos.iterator():
+        coincide = re.fullmatch(r'([A-Z]+)-(\d{4})-(\d+)', documento)
+        if coincide:
+            clave = (coincide.group(1), int(coincide.group(2)))
+            ultimos[clave] = max(ultimos.get(clave, 0), int(coincide.group(3)))
+    SecuenciaDocumento.objects.bulk_create([
+        SecuenciaDocumento(prefijo=prefijo, anio=anio, ultimo=ultimo)
+        for (prefijo, anio), ultimo in ultimos.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_cortestock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaDocumento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefijo', models.CharField(max_length=10, verbose_name='Prefijo')),
+                ('anio', models.IntegerField(verbose_name='Año')),
+                ('ultimo', models.IntegerField(default=0, verbose_name='Último Número')),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Documento',
+                'verbose_name_plural': 'Secuencias de Documentos',
+                'unique_together': {('prefijo', 'anio')},
+            },
+        ),
+        migrations.RunPython(iniciar_secuencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_secuenciadocumento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insumo',
+            name='modificado_en',
+            field=models.DateTimeField(auto_now=True, verbose_name='Modificado en'),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='modificado_en',
+            field=models.DateTimeField(auto_now=True, verbose_name='Modificado en'),
+        ),
+        migrations.AddIndex(
+            model_name='insumo',
+            index=models.Index(fields=['modificado_en'], name='insumo_modificado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['modificado_en'], name='lote_modificado_idx'),
+        ),
+    ]
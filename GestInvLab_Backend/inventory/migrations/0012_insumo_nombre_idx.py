@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_modificado_en'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='insumo',
+            index=models.Index(fields=['nombre'], name='insumo_nombre_idx'),
+        ),
+    ]
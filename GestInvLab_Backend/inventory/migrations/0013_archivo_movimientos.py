@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_insumo_nombre_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnioArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.IntegerField(unique=True, verbose_name='Año')),
+                ('movimientos', models.IntegerField(default=0, verbose_name='Movimientos Archivados')),
+                ('detalles', models.IntegerField(default=0, verbose_name='Detalles Archivados')),
+                ('completo', models.BooleanField(default=False, verbose_name='Completo')),
+                ('iniciado_en', models.DateTimeField(auto_now_add=True, verbose_name='Iniciado en')),
+                ('completado_en', models.DateTimeField(blank=True, null=True, verbose_name='Completado en')),
+            ],
+            options={
+                'verbose_name': 'Año Archivado',
+                'verbose_name_plural': 'Años Archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo_movimiento', models.CharField(choices=[('Entrada', 'Entrada'), ('Salida', 'Salida')], max_length=10, verbose_name='Tipo de Movimiento')),
+                ('fecha_registro', models.DateTimeField(verbose_name='Fecha de Registro')),
+                ('numero_documento', models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Número de Documento')),
+                ('servicio_destino', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_archivados', to='inventory.servicio', verbose_name='Servicio Destino')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos_archivados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Movimiento Archivado',
+                'verbose_name_plural': 'Movimientos Archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='DetalleMovimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='detalles_archivados', to='inventory.lote')),
+                ('movimiento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='inventory.movimientoarchivado')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Movimiento Archivado',
+                'verbose_name_plural': 'Detalles de Movimientos Archivados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoarchivado',
+            index=models.Index(fields=['fecha_registro'], name='mov_archivado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoarchivado',
+            index=models.Index(fields=['tipo_movimiento', 'fecha_registro'], name='mov_archivado_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoarchivado',
+            index=models.Index(fields=['servicio_destino', 'fecha_registro'], name='mov_archivado_serv_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoarchivado',
+            index=models.Index(fields=['usuario', 'fecha_registro'], name='mov_archivado_usu_fecha_idx'),
+        ),
+    ]
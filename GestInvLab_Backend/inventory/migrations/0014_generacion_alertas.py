@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_archivo_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneracionAlertas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generado_en', models.DateTimeField(verbose_name='Generado en')),
+                ('dias_aviso', models.IntegerField(verbose_name='Días de Aviso')),
+            ],
+            options={
+                'verbose_name': 'Generación de Alertas',
+                'verbose_name_plural': 'Generaciones de Alertas',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_generacion_alertas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorVersion',
+            fields=[
+                ('clave', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Clave')),
+                ('valor', models.BigIntegerField(default=0, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Contador de Versión',
+                'verbose_name_plural': 'Contadores de Versión',
+            },
+        ),
+    ]
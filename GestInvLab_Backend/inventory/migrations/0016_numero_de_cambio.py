@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:20
+
+from django.db import migrations, models
+
+
+def numerar_existentes(apps, schema_editor):
+    # Las filas existentes son el cambio 0: las recibe la sincronización completa
+    for modelo in ('Insumo', 'Lote'):
+        apps.get_model('inventory', modelo).objects.update(cambio=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_contador_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='insumo',
+            name='insumo_modificado_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lote',
+            name='lote_modificado_idx',
+        ),
+        migrations.AddField(
+            model_name='insumo',
+            name='cambio',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Número de Cambio'),
+        ),
+        migrations.AddField(
+            model_name='lote',
+            name='cambio',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Número de Cambio'),
+        ),
+        migrations.AddIndex(
+            model_name='insumo',
+            index=models.Index(fields=['cambio'], name='insumo_cambio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=models.Index(fields=['cambio'], name='lote_cambio_idx'),
+        ),
+        migrations.RunPython(numerar_existentes, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 class Servicio(models.Model):
@@ -16,11 +17,25 @@ class Insumo(models.Model):
     nombre = models.CharField(max_length=255, verbose_name="Nombre del Insumo")
     codigo_producto = models.CharField(max_length=100, unique=True, verbose_name="Código de Producto")
     umbral_critico = models.IntegerField(default=0, verbose_name="Umbral de Stock Crítico")
+    # Suma de stock_por_lote de sus lotes. Se mantiene con F() en las mismas
+    # transacciones que actualizan el Lote (ver recalcular_stock_insumos).
+    stock_total = models.IntegerField(default=0, editable=False, verbose_name="Stock Total")
+    # Última modificación. Los UPDATE masivos de stock la asignan explícitamente
+    # (auto_now solo actúa en save()).
+    modificado_en = models.DateTimeField(auto_now=True, verbose_name="Modificado en")
+    # Número de cambio para la sincronización incremental (ver sincronizacion.py);
+    # None mientras el cambio no tiene número asignado
+    cambio = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="Número de Cambio")
 
     def __str__(self):
         return f"{self.nombre} ({self.codigo_producto})"
 
     class Meta:
+        indexes = [
+            models.Index(fields=['cambio'], name='insumo_cambio_idx'),
+            # Búsqueda por prefijo del nombre (ver busqueda.py)
+            models.Index(fields=['nombre'], name='insumo_nombre_idx'),
+        ]
         verbose_name = "Insumo"
         verbose_name_plural = "Insumos"
 
@@ -31,6 +46,8 @@ class Lote(models.Model):
     fecha_caducidad = models.DateField(blank=True, null=True, verbose_name="Fecha de Caducidad")
     fecha_recepcion = models.DateField(auto_now_add=True, verbose_name="Fecha de Recepción")
     stock_por_lote = models.IntegerField(default=0, verbose_name="Stock del Lote")
+    modificado_en = models.DateTimeField(auto_now=True, verbose_name="Modificado en")
+    cambio = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="Número de Cambio")
 
     def __str__(self):
         return f"{self.insumo.nombre} - Lote: {self.numero_lote}"
@@ -38,6 +55,11 @@ class Lote(models.Model):
     class Meta:
         # Elimina lotes duplicados para el mismo insumo
         unique_together = ('insumo', 'numero_lote')
+        indexes = [
+            # Lotes de un insumo por orden de caducidad (salidas FEFO, lotes por vencer)
+            models.Index(fields=['insumo', 'fecha_caducidad'], name='lote_insumo_caducidad_idx'),
+            models.Index(fields=['cambio'], name='lote_cambio_idx'),
+        ]
         verbose_name = "Lote"
         verbose_name_plural = "Lotes"
 
@@ -63,6 +85,14 @@ class Movimiento(models.Model):
     class Meta:
         verbose_name = "Movimiento"
         verbose_name_plural = "Movimientos"
+        # Índices para los filtros de reportes: cada filtro de igualdad va
+        # primero y fecha_registro después, para el rango de fechas y el orden.
+        indexes = [
+            models.Index(fields=['fecha_registro'], name='movimiento_fecha_idx'),
+            models.Index(fields=['tipo_movimiento', 'fecha_registro'], name='movimiento_tipo_fecha_idx'),
+            models.Index(fields=['servicio_destino', 'fecha_registro'], name='movimiento_servicio_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_registro'], name='movimiento_usuario_fecha_idx'),
+        ]
 
 class Detalle_Movimiento(models.Model):
     #A qué movimiento pertenece este detalle
@@ -76,4 +106,212 @@ class Detalle_Movimiento(models.Model):
 
     class Meta:
         verbose_name = "Detalle de Movimiento"
-        verbose_name_plural = "Detalles de Movimientos"
\ No newline at end of file
+        verbose_name_plural = "Detalles de Movimientos"
+
+
+class MovimientoArchivado(models.Model):
+    """
+    Movimiento de un año cerrado, movido fuera de Movimiento por
+    'manage.py archivar_movimientos' (ver archivo.py). Conserva el id y los
+    nombres de campo de Movimiento, así que los mismos filtros sirven para ambos.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    usuario = models.ForeignKey(User, on_delete=models.PROTECT, related_name="movimientos_archivados")
+    tipo_movimiento = models.CharField(max_length=10, choices=Movimiento.TIPO_CHOICES, verbose_name="Tipo de Movimiento")
+    fecha_registro = models.DateTimeField(verbose_name="Fecha de Registro")
+    servicio_destino = models.ForeignKey(Servicio, on_delete=models.SET_NULL, blank=True, null=True, related_name="movimientos_archivados", verbose_name="Servicio Destino")
+    numero_documento = models.CharField(max_length=100, blank=True, null=True, unique=True, verbose_name="Número de Documento")
+
+    def __str__(self):
+        return f"{self.get_tipo_movimiento_display()} - {self.fecha_registro.strftime('%Y-%m-%d')} (archivado)"
+
+    class Meta:
+        verbose_name = "Movimiento Archivado"
+        verbose_name_plural = "Movimientos Archivados"
+        # Los mismos índices de reportes que Movimiento
+        indexes = [
+            models.Index(fields=['fecha_registro'], name='mov_archivado_fecha_idx'),
+            models.Index(fields=['tipo_movimiento', 'fecha_registro'], name='mov_archivado_tipo_fecha_idx'),
+            models.Index(fields=['servicio_destino', 'fecha_registro'], name='mov_archivado_serv_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_registro'], name='mov_archivado_usu_fecha_idx'),
+        ]
+
+
+class DetalleMovimientoArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    movimiento = models.ForeignKey(MovimientoArchivado, on_delete=models.CASCADE, related_name="detalles")
+    # PROTECT, como en Detalle_Movimiento: el lote sigue teniendo historia
+    lote = models.ForeignKey(Lote, on_delete=models.PROTECT, related_name="detalles_archivados")
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+
+    def __str__(self):
+        return f"Detalle archivado de {self.movimiento_id} - Lote: {self.lote_id} ({self.cantidad})"
+
+    class Meta:
+        verbose_name = "Detalle de Movimiento Archivado"
+        verbose_name_plural = "Detalles de Movimientos Archivados"
+
+
+class AnioArchivado(models.Model):
+    """
+    Año cuyo historial se está moviendo (completo=False) o ya se movió al
+    archivo. Se registra antes del primer lote, así los reportes consultan el
+    archivo desde que tiene filas de ese año aunque el comando no haya terminado.
+    """
+    anio = models.IntegerField(unique=True, verbose_name="Año")
+    movimientos = models.IntegerField(default=0, verbose_name="Movimientos Archivados")
+    detalles = models.IntegerField(default=0, verbose_name="Detalles Archivados")
+    completo = models.BooleanField(default=False, verbose_name="Completo")
+    iniciado_en = models.DateTimeField(auto_now_add=True, verbose_name="Iniciado en")
+    completado_en = models.DateTimeField(blank=True, null=True, verbose_name="Completado en")
+
+    def __str__(self):
+        return f"{self.anio}{'' if self.completo else ' (en curso)'}"
+
+    class Meta:
+        verbose_name = "Año Archivado"
+        verbose_name_plural = "Años Archivados"
+
+
+class ConsumoDiario(models.Model):
+    """
+    Acumulado diario de cantidades movidas por (fecha, insumo, servicio, tipo).
+    Se mantiene de forma incremental desde signals.py en la misma transacción
+    que crea los Detalle_Movimiento; se puede reconstruir con
+    'manage.py reconstruir_consumo_diario'.
+    """
+    fecha = models.DateField(verbose_name="Fecha")
+    insumo = models.ForeignKey(Insumo, on_delete=models.CASCADE, related_name="consumos_diarios")
+    # Nulo para las entradas (no tienen servicio destino)
+    servicio = models.ForeignKey(Servicio, on_delete=models.PROTECT, blank=True, null=True, related_name="consumos_diarios")
+    tipo_movimiento = models.CharField(max_length=10, choices=Movimiento.TIPO_CHOICES, verbose_name="Tipo de Movimiento")
+    cantidad = models.IntegerField(default=0, verbose_name="Cantidad")
+
+    def __str__(self):
+        return f"{self.fecha} - {self.insumo_id} - {self.tipo_movimiento}: {self.cantidad}"
+
+    class Meta:
+        verbose_name = "Consumo Diario"
+        verbose_name_plural = "Consumos Diarios"
+        constraints = [
+            # COALESCE para que las entradas (servicio nulo) también tengan una sola fila por clave
+            models.UniqueConstraint(
+                models.F('fecha'), models.F('insumo'), Coalesce(models.F('servicio'), models.Value(0)), models.F('tipo_movimiento'),
+                name='consumo_diario_unico',
+            ),
+        ]
+
+
+class AlertaInventario(models.Model):
+    """
+    Foto (snapshot) de las alertas de inventario calculadas por
+    'manage.py generar_alertas'. El dashboard lee estas filas en vez de
+    recalcular las agregaciones en cada carga. Cada ejecución reemplaza la anterior.
+    """
+    TIPO_CHOICES = [
+        ('stock_critico', 'Stock crítico'),
+        ('por_vencer', 'Lote por vencer'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo de Alerta")
+    insumo = models.ForeignKey(Insumo, on_delete=models.CASCADE, related_name="alertas")
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, blank=True, null=True, related_name="alertas")
+    # Stock vigente del insumo (stock_critico) o stock del lote (por_vencer)
+    stock = models.IntegerField(verbose_name="Stock")
+    umbral_critico = models.IntegerField(blank=True, null=True, verbose_name="Umbral de Stock Crítico")
+    fecha_caducidad = models.DateField(blank=True, null=True, verbose_name="Fecha de Caducidad")
+    dias_aviso = models.IntegerField(verbose_name="Días de Aviso")
+    generado_en = models.DateTimeField(verbose_name="Generado en")
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.insumo_id}"
+
+    class Meta:
+        verbose_name = "Alerta de Inventario"
+        verbose_name_plural = "Alertas de Inventario"
+
+
+class GeneracionAlertas(models.Model):
+    """
+    Cabecera de la foto de alertas: cuándo se generó y con qué ventana de
+    caducidad. Existe aunque la foto no tenga alertas, así una foto vacía
+    (inventario sano) también es una foto vigente.
+    """
+    generado_en = models.DateTimeField(verbose_name="Generado en")
+    dias_aviso = models.IntegerField(verbose_name="Días de Aviso")
+
+    def __str__(self):
+        return f"Alertas {self.generado_en:%Y-%m-%d %H:%M} ({self.dias_aviso} días)"
+
+    class Meta:
+        verbose_name = "Generación de Alertas"
+        verbose_name_plural = "Generaciones de Alertas"
+
+
+class CorteStock(models.Model):
+    """
+    Punto de control del ledger: stock de cada lote al inicio del día 'fecha'
+    (todos los movimientos anteriores a ese día). Se construyen con
+    'manage.py construir_cortes_stock'; la consulta de stock a una fecha
+    parte del corte más cercano y solo aplica los movimientos posteriores.
+    """
+    fecha = models.DateField(unique=True, verbose_name="Fecha de Corte")
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Creado en")
+
+    def __str__(self):
+        return f"Corte {self.fecha}"
+
+    class Meta:
+        verbose_name = "Corte de Stock"
+        verbose_name_plural = "Cortes de Stock"
+
+
+class CorteStockLote(models.Model):
+    # Solo se guardan los lotes con stock distinto de cero en el corte
+    corte = models.ForeignKey(CorteStock, on_delete=models.CASCADE, related_name="lotes")
+    lote = models.ForeignKey(Lote, on_delete=models.CASCADE, related_name="cortes")
+    insumo = models.ForeignKey(Insumo, on_delete=models.CASCADE, related_name="cortes")
+    stock = models.IntegerField(verbose_name="Stock")
+
+    def __str__(self):
+        return f"{self.corte} - Lote {self.lote_id}: {self.stock}"
+
+    class Meta:
+        unique_together = ('corte', 'lote')
+        verbose_name = "Stock de Lote en Corte"
+        verbose_name_plural = "Stock de Lotes en Cortes"
+
+
+class SecuenciaDocumento(models.Model):
+    """
+    Último número de documento entregado por (prefijo, año): ENT-2025-00001,
+    SAL-2025-00001, ... La numeración se reinicia cada año. Ver secuencias.py.
+    """
+    prefijo = models.CharField(max_length=10, verbose_name="Prefijo")
+    anio = models.IntegerField(verbose_name="Año")
+    ultimo = models.IntegerField(default=0, verbose_name="Último Número")
+
+    def __str__(self):
+        return f"{self.prefijo}-{self.anio}: {self.ultimo}"
+
+    class Meta:
+        unique_together = ('prefijo', 'anio')
+        verbose_name = "Secuencia de Documento"
+        verbose_name_plural = "Secuencias de Documentos"
+
+
+class ContadorVersion(models.Model):
+    """
+    Contador monótono en la base de datos, compartido por todos los procesos
+    (ver contadores.py). Numera los cambios de Insumo y Lote para la
+    sincronización incremental.
+    """
+    clave = models.CharField(max_length=50, primary_key=True, verbose_name="Clave")
+    valor = models.BigIntegerField(default=0, verbose_name="Valor")
+
+    def __str__(self):
+        return f"{self.clave}: {self.valor}"
+
+    class Meta:
+        verbose_name = "Contador de Versión"
+        verbose_name_plural = "Contadores de Versión"
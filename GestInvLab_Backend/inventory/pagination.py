@@ -0,0 +1,96 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class MovimientoKeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (fecha_registro, id) descendente.
+
+    Cada página filtra con "WHERE (fecha, id) < (cursor)" en vez de usar
+    OFFSET, así que la página 1000 cuesta lo mismo que la primera.
+    El cursor es opaco para el cliente: base64 de "fecha_iso|id".
+    Con varios querysets (movimientos vivos y archivados) se pide una página
+    a cada uno y se mezclan por la misma clave.
+    """
+    page_size = 100
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def clave(self, movimiento):
+        """ (fecha_registro, id) de una instancia de Movimiento o de una fila de .values() """
+        if isinstance(movimiento, dict):
+            return movimiento['fecha_registro'], movimiento['id']
+        return movimiento.fecha_registro, movimiento.id
+
+    def encode_cursor(self, movimiento):
+        fecha, movimiento_id = self.clave(movimiento)
+        raw = f"{fecha.isoformat()}|{movimiento_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, token):
+        try:
+            fecha_str, id_str = base64.urlsafe_b64decode(token.encode()).decode().split('|')
+            fecha = parse_datetime(fecha_str)
+            movimiento_id = int(id_str)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            fecha = None
+        if fecha is None:
+            raise ValidationError({'error': "Cursor inválido."})
+        return fecha, movimiento_id
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """ El queryset NO debe venir ordenado; aquí se fija el orden del keyset """
+        return self.cerrar_pagina(list(self.consulta_pagina(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """ Igual que paginate_queryset(), con el ORM async (ver views_async.py) """
+        return self.cerrar_pagina([movimiento async for movimiento in self.consulta_pagina(queryset, request)])
+
+    def paginate_querysets(self, querysets, request):
+        """ Una página sobre varios querysets, mezclados en el orden del keyset """
+        filas = [fila for queryset in querysets for fila in self.consulta_pagina(queryset, request)]
+        return self.cerrar_pagina(sorted(filas, key=self.clave, reverse=True))
+
+    async def apaginate_querysets(self, querysets, request):
+        filas = [fila for queryset in querysets async for fila in self.consulta_pagina(queryset, request)]
+        return self.cerrar_pagina(sorted(filas, key=self.clave, reverse=True))
+
+    def consulta_pagina(self, queryset, request):
+        self.tamano_pagina = self.get_page_size(request)
+        queryset = queryset.order_by('-fecha_registro', '-id')
+
+        token = request.GET.get(self.cursor_query_param)
+        if token:
+            fecha, movimiento_id = self.decode_cursor(token)
+            queryset = queryset.filter(
+                Q(fecha_registro__lt=fecha) | Q(fecha_registro=fecha, id__lt=movimiento_id)
+            )
+
+        # Se pide un elemento extra solo para saber si hay página siguiente
+        return queryset[:self.tamano_pagina + 1]
+
+    def cerrar_pagina(self, page):
+        self.has_next = len(page) > self.tamano_pagina
+        page = page[:self.tamano_pagina]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
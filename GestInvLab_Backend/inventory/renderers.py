@@ -0,0 +1,49 @@
+"""
+JSONRenderer de DRF con orjson, solo para las vistas del camino rápido de
+lectura (lectura_rapida.py): se asigna en esas vistas con
+renderer_classes = RENDERERS_LECTURA_RAPIDA. El resto de la API sigue con el
+JSONRenderer de DRF.
+
+Esos datos son textos, enteros, booleanos y null (las fechas ya vienen
+formateadas por los campos de DRF), que orjson escribe igual que json.dumps.
+Con el formato de JSONRenderer (compacto, UTF-8 sin escapar, U+2028/U+2029
+escapados), el JSON es el mismo. Los floats no entran en ese contrato
+(formato de exponentes, NaN como null): una vista que los devuelva no debe
+usar este renderer.
+
+Lo que orjson no serializa por sí mismo (fechas, Decimal, textos perezosos
+de los mensajes de error) pasa por el encoder de DRF. La indentación (API
+navegable, ?indent=), las claves que no son texto y los enteros de más de
+64 bits van directamente a DRF.
+"""
+import orjson
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Como JSONRenderer: JSON que también es JavaScript válido
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+RENDERERS_LECTURA_RAPIDA = [ORJSONRenderer, BrowsableAPIRenderer]
+
+
+def renderizar_json(data):
+    """ Bytes de la respuesta JSON del camino rápido (vistas que no pasan por DRF) """
+    return ORJSONRenderer().render(data)
@@ -0,0 +1,85 @@
+"""
+Numeración de documentos por (prefijo, año): ENT-2025-00001, SAL-2025-00001, ...
+
+El número se obtiene antes del INSERT del Movimiento, así que se guarda en la
+misma escritura. Las entradas y salidas lo piden antes de abrir su transacción:
+la reserva es una transacción corta propia y la fila de la secuencia no queda
+bloqueada hasta el commit del documento (eso pondría en fila todas las salidas).
+Las salidas validan el stock antes de pedir su número, así que una salida
+rechazada no lo gasta; solo deja un hueco la que pasa esa validación y falla
+después (otra salida se llevó el stock antes de que bloqueara los lotes, o un
+error). Asignar el número dentro de la transacción evitaría esos huecos a
+costa de poner en fila a todas las salidas.
+Con settings.DOCUMENTO_BLOQUE_SECUENCIA > 1 cada proceso reserva un bloque de
+números y entrega los siguientes sin tocar la base de datos.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SecuenciaDocumento
+
+# (prefijo, año) -> lista de [siguiente, ultimo] reservados por este proceso
+_bloques = {}
+_lock = threading.Lock()
+
+
+def formatear(prefijo, anio, numero):
+    return f"{prefijo}-{anio}-{numero:05d}"
+
+
+def siguiente_documento(prefijo, anio=None):
+    """
+    Siguiente número de documento, ya formateado. Mejor fuera de la transacción
+    del documento; dentro de una, la fila de la secuencia queda bloqueada hasta su fin.
+    """
+    anio = anio or timezone.localdate().year
+    clave = (prefijo, anio)
+    with _lock:
+        rangos = _bloques.get(clave)
+        if rangos:
+            numero, ultimo = rangos[0]
+            if numero == ultimo:
+                rangos.pop(0)
+            else:
+                rangos[0] = (numero + 1, ultimo)
+            return formatear(prefijo, anio, numero)
+
+    numero, ultimo = _reservar(prefijo, anio, max(1, settings.DOCUMENTO_BLOQUE_SECUENCIA))
+    if ultimo > numero:
+        # El resto del bloque solo es de este proceso si la reserva se confirma;
+        # si la transacción se revierte, otro proceso puede volver a reservarlo
+        transaction.on_commit(lambda: _guardar_bloque(clave, numero + 1, ultimo))
+    return formatear(prefijo, anio, numero)
+
+
+def _reservar(prefijo, anio, cantidad):
+    """
+    Reserva 'cantidad' números y devuelve (primero, ultimo). El UPDATE relativo
+    bloquea la fila de la secuencia hasta el fin de la transacción (la suya, si
+    no hay otra abierta), así que dos documentos nunca reciben el mismo número.
+    """
+    with transaction.atomic(savepoint=False):
+        secuencia = SecuenciaDocumento.objects.filter(prefijo=prefijo, anio=anio)
+        if not secuencia.update(ultimo=F('ultimo') + cantidad):
+            # Primer documento del año (una secuencia creada en paralelo se ignora)
+            SecuenciaDocumento.objects.bulk_create(
+                [SecuenciaDocumento(prefijo=prefijo, anio=anio)], ignore_conflicts=True
+            )
+            secuencia.update(ultimo=F('ultimo') + cantidad)
+        ultimo = secuencia.values_list('ultimo', flat=True).get()
+    return ultimo - cantidad + 1, ultimo
+
+
+def _guardar_bloque(clave, siguiente, ultimo):
+    with _lock:
+        _bloques.setdefault(clave, []).append((siguiente, ultimo))
+
+
+def descartar_bloques():
+    """ Olvida los números reservados por este proceso (quedan como huecos) """
+    with _lock:
+        _bloques.clear()
@@ -1,7 +1,12 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from .models import Insumo, Lote, Servicio, Movimiento, Detalle_Movimiento
+from .secuencias import siguiente_documento
+from .signals import detalles_registrados
+from .stock import aplicar_stock, asignar_fefo, bloquear_lotes, leer_lotes
 from django.contrib.auth.models import User
-from django.db.models import Sum, F
+from django.db import transaction
 from django.utils import timezone 
 
 # --- Serializadores para LECTURA (GET) ---
@@ -17,22 +22,19 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'first_name', 'last_name']
 
+class UserAdminSerializer(serializers.ModelSerializer):
+    """ Usuarios con su rol y estado, para la tabla del panel de admin """
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'is_staff', 'is_active', 'is_superuser']
+
 class InsumoSerializer(serializers.ModelSerializer):
-    # Campo calculado
-    stock_total = serializers.SerializerMethodField()
-    
+    # stock_total es un campo desnormalizado del modelo (no editable),
+    # así que listar insumos no hace una consulta SUM por cada uno.
     class Meta:
         model = Insumo
         fields = ['id', 'nombre', 'codigo_producto', 'stock_total', 'umbral_critico']
 
-    def get_stock_total(self, insumo_obj):
-        # Suma el stock de todos los lotes de este insumo
-        total = insumo_obj.lotes.aggregate(
-            total_stock=Sum('stock_por_lote')
-        )['total_stock']
-        
-        return total or 0 # Devuelve 0 si es None
-        
 
 class LoteSerializer(serializers.ModelSerializer):
     insumo_nombre = serializers.StringRelatedField(source='insumo.nombre')
@@ -45,10 +47,21 @@ class LoteSerializer(serializers.ModelSerializer):
 class DetalleMovimientoCreateSerializer(serializers.ModelSerializer):
     """
     Serializer para el detalle *dentro* de un movimiento de SALIDA.
+    Cada línea indica un 'lote' concreto, o solo el 'insumo_id' para que
+    el servidor reparta la cantidad entre sus lotes por FEFO.
     """
+    lote = serializers.PrimaryKeyRelatedField(queryset=Lote.objects.all(), required=False)
+    insumo_id = serializers.IntegerField(required=False)
+
     class Meta:
         model = Detalle_Movimiento
-        fields = ['lote', 'cantidad']
+        fields = ['lote', 'insumo_id', 'cantidad']
+        extra_kwargs = {'cantidad': {'min_value': 1}}
+
+    def validate(self, attrs):
+        if ('lote' in attrs) == ('insumo_id' in attrs):
+            raise serializers.ValidationError("Indique 'lote' o 'insumo_id' (uno de los dos).")
+        return attrs
 
 
 class MovimientoCreateSerializer(serializers.ModelSerializer):
@@ -69,44 +82,95 @@ class MovimientoCreateSerializer(serializers.ModelSerializer):
         model = Movimiento
         fields = ['servicio_destino', 'detalles']
 
+    def validate_detalles(self, value):
+        if not value:
+            raise serializers.ValidationError("La lista de 'detalles' no puede estar vacía.")
+
+        ids = {item['insumo_id'] for item in value if 'insumo_id' in item}
+        existentes = set(Insumo.objects.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+        if existentes != ids:
+            raise serializers.ValidationError([
+                {} if 'insumo_id' not in item or item['insumo_id'] in existentes
+                else {'insumo_id': ["No existe un Insumo con este ID."]}
+                for item in value
+            ])
+        return value
+
     def create(self, validated_data):
         detalles_data = validated_data.pop('detalles')
         usuario = self.context['request'].user
 
-        # --- Validación de Stock ---
+        # Cantidad total pedida por lote y por insumo FEFO (pueden repetirse en varias líneas)
+        solicitado = defaultdict(int)
+        solicitado_fefo = defaultdict(int)
         for item in detalles_data:
-            lote = item['lote']
-            cantidad_solicitada = item['cantidad']
+            if 'lote' in item:
+                solicitado[item['lote'].id] += item['cantidad']
+            else:
+                solicitado_fefo[item['insumo_id']] += item['cantidad']
+
+        # --- Validación de Stock ---
+        # Primero sin bloqueos: una salida sin stock se rechaza antes de reservar
+        # su número de documento. El número se reserva fuera de la transacción
+        # de la salida, así que la fila de la secuencia no queda bloqueada hasta
+        # su commit (ver secuencias.py).
+        self._repartir(leer_lotes(solicitado, solicitado_fefo), detalles_data, solicitado, solicitado_fefo)
+        numero_documento = siguiente_documento('SAL')
+        with transaction.atomic():
+            # Se bloquean los lotes (en orden de id, para evitar deadlocks) y se
+            # vuelve a validar contra el stock bloqueado: otra salida pudo
+            # llevarse el stock entre medio (su número queda como hueco).
+            lotes = bloquear_lotes(solicitado, solicitado_fefo)
+            lineas = self._repartir(lotes, detalles_data, solicitado, solicitado_fefo)
+
+            # --- Crear Movimiento (N° Documento Automático en el mismo INSERT) ---
+            movimiento = Movimiento.objects.create(
+                usuario=usuario, 
+                tipo_movimiento='Salida', 
+                numero_documento=numero_documento,
+                **validated_data
+            )
+
+            # 2. Crear los Detalles y Descontar Stock (lotes ya bloqueados)
+            detalles = Detalle_Movimiento.objects.bulk_create([
+                Detalle_Movimiento(movimiento=movimiento, lote=lotes[lote_id], cantidad=cantidad)
+                for lote_id, cantidad in lineas
+            ])
+            detalles_registrados.send(sender=Movimiento, movimiento=movimiento, detalles=detalles)
+            aplicar_stock(
+                ((lote_id, lotes[lote_id].insumo_id, cantidad) for lote_id, cantidad in lineas),
+                signo=-1
+            )
+            
+        return movimiento
+
+    def _repartir(self, lotes, detalles_data, solicitado, solicitado_fefo):
+        """
+        Valida el stock de 'lotes' ({lote_id: Lote}) y devuelve las líneas de la
+        salida [(lote_id, cantidad)]; lanza ValidationError si no alcanza.
+        """
+        for lote_id, cantidad_solicitada in solicitado.items():
+            lote = lotes[lote_id]
             if lote.stock_por_lote < cantidad_solicitada:
                 raise serializers.ValidationError(
                     f"Stock insuficiente para {lote.insumo.nombre} (Lote: {lote.numero_lote}). "
                     f"Stock: {lote.stock_por_lote}, Solicitado: {cantidad_solicitada}"
                 )
 
-        # --- Crear Movimiento ---
-        movimiento = Movimiento.objects.create(
-            usuario=usuario, 
-            tipo_movimiento='Salida', 
-            **validated_data
-        )
-        
-        # 2. Generar N° Documento Automático
-        current_year = timezone.now().year
-        movimiento.numero_documento = f"SAL-{current_year}-{movimiento.id:05d}"
-        movimiento.save()
-
-        # 3. Crear los Detalles y Actualizar Stock del Lote
-        for detalle_data in detalles_data:
-            Detalle_Movimiento.objects.create(movimiento=movimiento, **detalle_data)
-            
-            # Actualizar el Lote (Descontar stock)
-            lote = detalle_data['lote']
-            cantidad = detalle_data['cantidad']
-            Lote.objects.filter(id=lote.id).update(
-                stock_por_lote=F('stock_por_lote') - cantidad
-            )
-
-        return movimiento
+        # Las líneas FEFO se reparten sobre el stock que dejan las líneas con lote
+        disponible = {lote.id: lote.stock_por_lote - solicitado.get(lote.id, 0) for lote in lotes.values()}
+        lineas = [(item['lote'].id, item['cantidad']) for item in detalles_data if 'lote' in item]
+        hoy = timezone.localdate()
+        for insumo_id in sorted(solicitado_fefo):
+            asignado = asignar_fefo(lotes, insumo_id, solicitado_fefo[insumo_id], disponible, hoy)
+            if asignado is None:
+                insumo = Insumo.objects.get(id=insumo_id)
+                raise serializers.ValidationError(
+                    f"Stock insuficiente para {insumo.nombre} en lotes vigentes. "
+                    f"Solicitado: {solicitado_fefo[insumo_id]}"
+                )
+            lineas.extend(asignado)
+        return lineas
     
 # --- Serializadores para MÓDULO DE ENTRADA  ---
 
@@ -119,23 +183,96 @@ class DetalleEntradaCreateSerializer(serializers.Serializer):
     fecha_caducidad = serializers.DateField(required=False, allow_null=True)
     cantidad = serializers.IntegerField(min_value=1)
 
-    def validate_insumo_id(self, value):
-        if not Insumo.objects.filter(id=value).exists():
-            raise serializers.ValidationError("No existe un Insumo con este ID.")
-        return value
-
 
 class EntradaCreateSerializer(serializers.Serializer):
     """
     Serializer principal para el endpoint de ENTRADAS.
+    Registra todas las líneas con un número fijo de consultas:
+    los lotes se resuelven, crean y actualizan en bloque.
     """
     detalles = DetalleEntradaCreateSerializer(many=True)
 
     def validate_detalles(self, value):
         if not value or len(value) == 0:
             raise serializers.ValidationError("La lista de 'detalles' no puede estar vacía.")
+
+        # Una sola consulta para validar todos los insumo_id
+        ids = {item['insumo_id'] for item in value}
+        existentes = set(Insumo.objects.filter(id__in=ids).values_list('id', flat=True))
+        if existentes != ids:
+            raise serializers.ValidationError([
+                {} if item['insumo_id'] in existentes
+                else {'insumo_id': ["No existe un Insumo con este ID."]}
+                for item in value
+            ])
         return value
 
+    def create(self, validated_data):
+        detalles_data = validated_data['detalles']
+        usuario = self.context['request'].user
+
+        # Fecha de caducidad por lote: manda la última línea que la informe
+        claves = {}
+        for detalle in detalles_data:
+            clave = (detalle['insumo_id'], detalle['numero_lote'])
+            if detalle.get('fecha_caducidad') or clave not in claves:
+                claves[clave] = detalle.get('fecha_caducidad')
+
+        numero_documento = siguiente_documento('ENT')
+        with transaction.atomic():
+            movimiento = Movimiento.objects.create(
+                usuario=usuario,
+                tipo_movimiento='Entrada',
+                numero_documento=numero_documento,
+            )
+
+            # 1. Crear los lotes que no existen (los creados en paralelo se ignoran)
+            lotes = self._buscar_lotes(claves)
+            nuevos = [
+                Lote(insumo_id=insumo_id, numero_lote=numero_lote, fecha_caducidad=fecha)
+                for (insumo_id, numero_lote), fecha in claves.items()
+                if (insumo_id, numero_lote) not in lotes
+            ]
+            if nuevos:
+                Lote.objects.bulk_create(nuevos, ignore_conflicts=True)
+                lotes = self._buscar_lotes(claves)
+
+            # 2. Actualizar la caducidad de los lotes existentes que la informan
+            cambiados = []
+            for clave, fecha in claves.items():
+                lote = lotes[clave]
+                if fecha and lote.fecha_caducidad != fecha:
+                    lote.fecha_caducidad = fecha
+                    cambiados.append(lote)
+            if cambiados:
+                Lote.objects.bulk_update(cambiados, ['fecha_caducidad'])
+
+            # 3. Detalles y stock en bloque
+            detalles = [
+                Detalle_Movimiento(
+                    movimiento=movimiento,
+                    lote=lotes[(detalle['insumo_id'], detalle['numero_lote'])],
+                    cantidad=detalle['cantidad']
+                )
+                for detalle in detalles_data
+            ]
+            Detalle_Movimiento.objects.bulk_create(detalles)
+            detalles_registrados.send(sender=Movimiento, movimiento=movimiento, detalles=detalles)
+            aplicar_stock((d.lote_id, d.lote.insumo_id, d.cantidad) for d in detalles)
+
+        return movimiento
+
+    def _buscar_lotes(self, claves):
+        """ Un solo SELECT para todos los (insumo_id, numero_lote) del documento """
+        insumo_ids = {insumo_id for insumo_id, _ in claves}
+        numeros = {numero_lote for _, numero_lote in claves}
+        candidatos = Lote.objects.filter(insumo_id__in=insumo_ids, numero_lote__in=numeros)
+        return {
+            (lote.insumo_id, lote.numero_lote): lote
+            for lote in candidatos
+            if (lote.insumo_id, lote.numero_lote) in claves
+        }
+
 # --- Serializadores para REPORTES ---
 
 class ReporteDetalleMovimientoSerializer(serializers.ModelSerializer):
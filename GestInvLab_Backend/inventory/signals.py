@@ -1,9 +1,184 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.db.models import F
-from .models import Detalle_Movimiento, Lote
+from collections import defaultdict
 
-# Esta es la "señal" que se ejecutará después de guardar un Detalle_Movimiento
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.contrib.auth.models import User
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .authentication import invalidar_token, invalidar_usuario
+from .busqueda import invalidar_indice_codigos
+from .cache import invalidar_catalogo
+from .contadores import registrar_cambios
+from .historico import invalidar_cortes_desde
+from .models import ConsumoDiario, Detalle_Movimiento, Insumo, Lote, Servicio
+
+# Se envía desde los flujos de Entrada/Salida después del bulk_create de los
+# detalles (bulk_create no dispara post_save). Argumentos: movimiento, detalles.
+detalles_registrados = Signal()
+
+
+def acumular_consumo(filas):
+    """
+    Suma cantidades a ConsumoDiario con un número fijo de consultas.
+    filas: iterable de (fecha, insumo_id, servicio_id, tipo_movimiento, cantidad).
+    Debe llamarse dentro de la transacción que escribe el ledger.
+    """
+    incrementos = defaultdict(int)
+    for fecha, insumo_id, servicio_id, tipo, cantidad in filas:
+        incrementos[(fecha, insumo_id, servicio_id, tipo)] += cantidad
+    if not incrementos:
+        return
+
+    # 1. Asegurar que existe una fila por clave (las que ya existen se ignoran)
+    ConsumoDiario.objects.bulk_create(
+        [
+            ConsumoDiario(fecha=fecha, insumo_id=insumo_id, servicio_id=servicio_id, tipo_movimiento=tipo)
+            for fecha, insumo_id, servicio_id, tipo in incrementos
+        ],
+        ignore_conflicts=True,
+    )
+
+    # 2. Resolver sus ids en una consulta
+    filtro = Q()
+    for fecha, insumo_id, servicio_id, tipo in incrementos:
+        filtro |= Q(fecha=fecha, insumo_id=insumo_id, servicio_id=servicio_id, tipo_movimiento=tipo)
+    ids = {
+        (fila.fecha, fila.insumo_id, fila.servicio_id, fila.tipo_movimiento): fila.id
+        for fila in ConsumoDiario.objects.filter(filtro).only('id', 'fecha', 'insumo_id', 'servicio_id', 'tipo_movimiento')
+    }
+
+    # 3. Un UPDATE relativo (F() + CASE) para todas las claves
+    por_id = {ids[clave]: cantidad for clave, cantidad in incrementos.items()}
+    ConsumoDiario.objects.filter(id__in=por_id).update(
+        cantidad=F('cantidad') + Case(
+            *[When(id=pk, then=Value(cantidad)) for pk, cantidad in por_id.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def _filas_de_detalles(movimiento, detalles, signo=1):
+    fecha = timezone.localdate(movimiento.fecha_registro)
+    for detalle in detalles:
+        yield (
+            fecha,
+            detalle.lote.insumo_id,
+            movimiento.servicio_destino_id,
+            movimiento.tipo_movimiento,
+            signo * detalle.cantidad,
+        )
+
+
+@receiver(detalles_registrados)
+def acumular_detalles_registrados(sender, movimiento, detalles, **kwargs):
+    acumular_consumo(_filas_de_detalles(movimiento, detalles))
+
+
+# Detalles creados, editados o eliminados uno a uno (admin de Django, scripts).
+# Al editar se descuenta la versión guardada y se suma la nueva (cantidad, lote
+# o movimiento pueden haber cambiado).
+@receiver(pre_save, sender=Detalle_Movimiento)
+def recordar_detalle_anterior(sender, instance, raw=False, **kwargs):
+    instance._anterior = None
+    if not raw and not instance._state.adding:
+        instance._anterior = (
+            Detalle_Movimiento.objects.select_related('lote', 'movimiento').filter(pk=instance.pk).first()
+        )
+
+
+@receiver(post_save, sender=Detalle_Movimiento)
+def acumular_detalle_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    filas = list(_filas_de_detalles(instance.movimiento, [instance]))
+    anterior = getattr(instance, '_anterior', None)
+    if anterior is not None:
+        filas.extend(_filas_de_detalles(anterior.movimiento, [anterior], signo=-1))
+    elif not created:
+        return
+    acumular_consumo(filas)
+
+
+@receiver(post_delete, sender=Detalle_Movimiento)
+def descontar_detalle_eliminado(sender, instance, **kwargs):
+    acumular_consumo(_filas_de_detalles(instance.movimiento, [instance], signo=-1))
+
+
+# Un detalle agregado, editado o eliminado en un movimiento antiguo cambia el
+# stock histórico: los cortes posteriores a ese día se descartan (ver
+# historico.py). Al editar, desde el día más antiguo entre la versión
+# guardada y la nueva (el detalle puede haber cambiado de movimiento).
 @receiver(post_save, sender=Detalle_Movimiento)
-def update_stock_on_save(sender, instance, created, **kwargs):
-    pass 
\ No newline at end of file
+@receiver(post_delete, sender=Detalle_Movimiento)
+def invalidar_cortes_de_detalle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    fecha = instance.movimiento.fecha_registro
+    anterior = getattr(instance, '_anterior', None)
+    if anterior is not None:
+        fecha = min(fecha, anterior.movimiento.fecha_registro)
+    invalidar_cortes_desde(fecha)
+
+
+# Cambios en los catálogos: invalidan las respuestas en caché (ver cache.py).
+# Los cambios de stock (UPDATE masivos, sin señales) invalidan desde stock.py.
+@receiver(post_save, sender=Insumo)
+@receiver(post_save, sender=Servicio)
+@receiver(post_save, sender=User)
+def invalidar_catalogo_al_guardar(sender, update_fields=None, **kwargs):
+    # Iniciar sesión solo actualiza last_login; no cambia ningún catálogo
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidar_catalogo()
+
+
+@receiver(post_delete, sender=Insumo)
+@receiver(post_delete, sender=Servicio)
+@receiver(post_delete, sender=User)
+def invalidar_catalogo_al_eliminar(sender, **kwargs):
+    invalidar_catalogo()
+
+
+# Códigos de insumo en el índice de búsqueda de cada proceso (ver busqueda.py)
+@receiver(post_save, sender=Insumo)
+@receiver(post_delete, sender=Insumo)
+def invalidar_indice_de_insumo(sender, **kwargs):
+    invalidar_indice_codigos()
+
+
+# Número de cambio para la sincronización incremental (ver sincronizacion.py):
+# pendiente al guardar, asignado al confirmar
+@receiver(pre_save, sender=Insumo)
+@receiver(pre_save, sender=Lote)
+def marcar_cambio_pendiente(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.cambio = None
+
+
+@receiver(post_save, sender=Insumo)
+@receiver(post_save, sender=Lote)
+def registrar_cambio_guardado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        registrar_cambios(sender.objects.filter(pk=instance.pk))
+
+
+# Usuarios y tokens en la caché de autenticación (ver authentication.py):
+# desactivar un usuario o cambiar is_staff tiene efecto en la siguiente petición
+@receiver(post_save, sender=User)
+def invalidar_usuario_guardado(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidar_usuario_eliminado(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidar_token_eliminado(sender, instance, **kwargs):
+    invalidar_token(instance.key, instance.user_id)
+
@@ -0,0 +1,60 @@
+"""
+Sincronización incremental de insumos y lotes ("cambios desde").
+
+Cada escritura de Insumo o Lote recibe, al confirmarse, un número de cambio
+creciente (contadores.py): save() por signals.py, los UPDATE masivos de
+stock.py, la importación y los comandos de conciliación con
+registrar_cambios(). El cliente guarda el token de su última sincronización
+y pide solo las filas con un número mayor.
+
+El token es el último número confirmado, leído antes de las filas. Los
+números se confirman en orden, así que una transacción larga (importación
+de CSV, conciliar_stock_lotes) no hace perder filas: su número llega
+después de su commit y es mayor que cualquier token ya entregado. No depende
+de los relojes. Las filas con cambio=None (confirmadas y aún sin número) se
+envían siempre. Algunas filas llegan dos veces; el cliente las reemplaza por id.
+
+Las eliminaciones (solo posibles desde el admin de Django) no se informan:
+el catálogo completo de arranque/ sigue siendo la referencia.
+"""
+from django.db.models import Q
+
+from .contadores import CAMBIOS, leer
+from .models import Insumo, Lote
+from .serializers import InsumoSerializer, LoteSerializer
+
+# Máximo de BigIntegerField: un token mayor no es un número de cambio
+_MAXIMO = 2 ** 63 - 1
+
+
+def token_actual():
+    return str(leer(CAMBIOS))
+
+
+def leer_token(token):
+    """ Número de cambio del token; lanza ValueError si no es válido """
+    numero = int(token)
+    if not 0 <= numero <= _MAXIMO:
+        raise ValueError(token)
+    return numero
+
+
+def cambios_desde(token=None):
+    """
+    Insumos y lotes cambiados desde 'token' (todos si es None), con el token
+    para la siguiente llamada. Tres consultas: el contador y las filas, por
+    el índice de cambio.
+    """
+    desde = leer_token(token) if token is not None else None
+    nuevo_token = token_actual()
+    insumos = Insumo.objects.all()
+    lotes = Lote.objects.select_related('insumo')
+    if desde is not None:
+        filtro = Q(cambio__gt=desde) | Q(cambio__isnull=True)
+        insumos = insumos.filter(filtro)
+        lotes = lotes.filter(filtro)
+    return {
+        'token': nuevo_token,
+        'insumos': InsumoSerializer(insumos.order_by('id'), many=True).data,
+        'lotes': LoteSerializer(lotes.order_by('id'), many=True).data,
+    }
@@ -0,0 +1,113 @@
+"""
+Operaciones de stock por lotes de filas.
+
+Las entradas y salidas actualizan Lote.stock_por_lote e Insumo.stock_total
+con un solo UPDATE por tabla (CASE por id), sin importar cuántas líneas
+traiga el documento. Se deben llamar dentro de transaction.atomic().
+"""
+from collections import defaultdict
+
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidar_catalogo
+from .contadores import registrar_cambios
+from .models import Insumo, Lote
+
+
+def case_por_id(cantidades):
+    """ CASE id WHEN ... THEN cantidad: un valor distinto por fila en un solo UPDATE """
+    return Case(
+        *[When(id=pk, then=Value(cantidad)) for pk, cantidad in cantidades.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def stock_lotes_subquery():
+    """ Subconsulta con la suma de stock_por_lote de los lotes de cada insumo """
+    suma = (
+        Lote.objects.filter(insumo=OuterRef('pk'))
+        .order_by()
+        .values('insumo')
+        .annotate(total=Sum('stock_por_lote'))
+        .values('total')
+    )
+    return Coalesce(Subquery(suma, output_field=IntegerField()), Value(0))
+
+
+def aplicar_stock(lineas, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) cantidades al stock.
+    lineas: iterable de (lote_id, insumo_id, cantidad).
+    """
+    por_lote = defaultdict(int)
+    por_insumo = defaultdict(int)
+    for lote_id, insumo_id, cantidad in lineas:
+        por_lote[lote_id] += signo * cantidad
+        por_insumo[insumo_id] += signo * cantidad
+
+    if por_lote:
+        ahora = timezone.now()
+        Lote.objects.filter(id__in=por_lote).update(
+            stock_por_lote=F('stock_por_lote') + case_por_id(por_lote), modificado_en=ahora, cambio=None
+        )
+        Insumo.objects.filter(id__in=por_insumo).update(
+            stock_total=F('stock_total') + case_por_id(por_insumo), modificado_en=ahora, cambio=None
+        )
+        registrar_cambios(Lote.objects.filter(id__in=list(por_lote)), Insumo.objects.filter(id__in=list(por_insumo)))
+        # El listado de insumos muestra stock_total
+        invalidar_catalogo()
+
+
+def leer_lotes(lote_ids, insumo_ids=(), bloquear=False):
+    """
+    Lotes de una salida: los pedidos por id y, para los insumos que se
+    despachan por FEFO (insumo_ids), todos sus lotes con stock, en una consulta.
+    Devuelve {lote_id: Lote}.
+    """
+    filtro = Q(id__in=lote_ids)
+    if insumo_ids:
+        filtro |= Q(insumo_id__in=insumo_ids, stock_por_lote__gt=0)
+    lotes = Lote.objects.filter(filtro).order_by('id')
+    if bloquear:
+        lotes = lotes.select_for_update()
+    return {lote.id: lote for lote in lotes}
+
+
+def bloquear_lotes(lote_ids, insumo_ids=()):
+    """
+    leer_lotes() con SELECT ... FOR UPDATE, siempre en orden ascendente de id.
+    Dos salidas que tocan los mismos lotes los bloquean en el mismo orden,
+    así que una espera a la otra en vez de producir un deadlock.
+    """
+    return leer_lotes(lote_ids, insumo_ids, bloquear=True)
+
+
+def asignar_fefo(lotes, insumo_id, cantidad, disponible, hoy):
+    """
+    Reparte `cantidad` de un insumo entre sus lotes, primero el que caduca
+    antes (FEFO). Los lotes sin fecha de caducidad van al final y los ya
+    caducados no se despachan.
+    disponible: {lote_id: stock restante}; se descuenta lo asignado.
+    Devuelve [(lote_id, cantidad)] o None si no alcanza el stock.
+    """
+    candidatos = sorted(
+        (
+            lote for lote in lotes.values()
+            if lote.insumo_id == insumo_id
+            and (lote.fecha_caducidad is None or lote.fecha_caducidad >= hoy)
+        ),
+        key=lambda lote: (lote.fecha_caducidad is None, lote.fecha_caducidad or hoy, lote.id),
+    )
+    asignado = []
+    for lote in candidatos:
+        if cantidad == 0:
+            break
+        tomar = min(cantidad, disponible[lote.id])
+        if tomar > 0:
+            asignado.append((lote.id, tomar))
+            disponible[lote.id] -= tomar
+            cantidad -= tomar
+    return asignado if cantidad == 0 else None
@@ -1,3 +1,1666 @@
-from django.test import TestCase
+import csv
+import inspect
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Count, Sum
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from . import metricas
+from .alertas import calcular_alertas
+from .archivo import archivar_lote
+from .authentication import CachedTokenAuthentication, clave_usuario, limpiar as limpiar_tokens
+from .busqueda import VERSION_CODIGOS_KEY, buscar_por_codigo
+from .benchmark import ejecutar_benchmark, urls_sin_caso
+from .cache import invalidar_version
+from .checks import cache_compartida
+from .contadores import sellar_pendientes
+from .datos_sinteticos import sembrar
+from .historico import stock_a_fecha
+from .importacion import importar_insumos
+from .management.commands.conciliar_stock_lotes import revisar_tramo
+from .models import (
+    AlertaInventario, AnioArchivado, ConsumoDiario, CorteStock, Detalle_Movimiento, DetalleMovimientoArchivado, Insumo, Lote,
+    Movimiento, MovimientoArchivado, SecuenciaDocumento, Servicio,
+)
+from .renderers import ORJSONRenderer
+from . import secuencias
+from . import serializers as serializers_modulo
+from .secuencias import descartar_bloques, siguiente_documento
+from .serializers import (
+    InsumoSerializer, LoteSerializer, ReporteMovimientoSerializer, UserAdminSerializer, UserSerializer,
+)
+from .views import ExportarMovimientosView, filtrar_movimientos
+
+
+class InventoryAPITestCase(APITestCase):
+    """ Base con un usuario autenticado y datos mínimos de catálogo """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tecnologo', password='clave-segura-123')
+        cls.admin = User.objects.create_user(username='jefe', password='clave-segura-123', is_staff=True)
+        cls.servicio = Servicio.objects.create(nombre='Urgencias')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def crear_insumo(self, codigo, nombre=None, umbral=0):
+        return Insumo.objects.create(nombre=nombre or f"Insumo {codigo}", codigo_producto=codigo, umbral_critico=umbral)
+
+    def registrar_entrada(self, detalles):
+        response = self.client.post(reverse('inventory:entrada-create'), {'detalles': detalles}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data
+
+    def registrar_salida(self, detalles, servicio=None):
+        payload = {'servicio_destino': (servicio or self.servicio).id, 'detalles': detalles}
+        return self.client.post(reverse('inventory:movimiento-create'), payload, format='json')
+
+
+class StockTotalTests(InventoryAPITestCase):
+
+    def test_entrada_y_salida_mantienen_stock_total(self):
+        insumo = self.crear_insumo('A-1')
+        self.registrar_entrada([
+            {'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 10},
+            {'insumo_id': insumo.id, 'numero_lote': 'L2', 'cantidad': 5},
+        ])
+        lote = Lote.objects.get(insumo=insumo, numero_lote='L1')
+        response = self.registrar_salida([{'lote': lote.id, 'cantidad': 4}])
+        self.assertEqual(response.status_code, 201, response.content)
+
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_total, 11)
+
+    def test_listado_de_insumos_no_depende_del_numero_de_insumos(self):
+        for i in range(3):
+            self.crear_insumo(f"A-{i}")
+        url = reverse('inventory:insumo-list')
+        with CaptureQueriesContext(connection) as pocos:
+            self.client.get(url)
+        for i in range(3, 30):
+            self.crear_insumo(f"A-{i}")
+        with CaptureQueriesContext(connection) as muchos:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(len(pocos), len(muchos))
+
+    def test_recalcular_stock_insumos_corrige_descuadres(self):
+        insumo = self.crear_insumo('A-1')
+        Lote.objects.create(insumo=insumo, numero_lote='L1', stock_por_lote=7)
+        Lote.objects.create(insumo=insumo, numero_lote='L2', stock_por_lote=3)
+        vacio = self.crear_insumo('A-2')
+        Insumo.objects.filter(id=vacio.id).update(stock_total=99)
+
+        call_command('recalcular_stock_insumos', stdout=StringIO())
+
+        insumo.refresh_from_db()
+        vacio.refresh_from_db()
+        self.assertEqual(insumo.stock_total, 10)
+        self.assertEqual(vacio.stock_total, 0)
+
+    def test_conciliar_stock_lotes_contra_ledger(self):
+        insumo = self.crear_insumo('A-1')
+        self.registrar_entrada([
+            {'insumo_id': insumo.id, 'numero_lote': f'L{i}', 'cantidad': 10} for i in range(5)
+        ])
+        self.registrar_salida([{'insumo_id': insumo.id, 'cantidad': 12}])
+        esperado = dict(Lote.objects.values_list('id', 'stock_por_lote'))
+        primero, segundo = sorted(esperado)[:2]
+        Lote.objects.filter(id=primero).update(stock_por_lote=50)
+        Lote.objects.filter(id=segundo).update(stock_por_lote=-1)
+
+        salida = StringIO()
+        call_command('conciliar_stock_lotes', tamano=2, stdout=salida)
+        self.assertIn(f"Lote {primero} ", salida.getvalue())
+        self.assertIn("Descuadres: 2", salida.getvalue())
+        # Tramos de 5 lotes leídos en páginas de 2: mismo resultado, consultas con LIMIT
+        with mock.patch('inventory.management.commands.conciliar_stock_lotes.PAGINA_LOTES', 2):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(revisar_tramo((primero, primero + 5))[1], [
+                    (primero, insumo.id, 50, esperado[primero]), (segundo, insumo.id, -1, esperado[segundo]),
+                ])
+        tabla = connection.ops.quote_name(Lote._meta.db_table)
+        paginas = [consulta['sql'] for consulta in ctx.captured_queries if f'FROM {tabla}' in consulta['sql']]
+        self.assertEqual(len(paginas), 3)
+        self.assertTrue(all('LIMIT 2' in sql for sql in paginas), paginas)
+        self.assertEqual(Lote.objects.get(id=primero).stock_por_lote, 50)
+
+        call_command('conciliar_stock_lotes', tamano=2, reparar=True, stdout=StringIO())
+        self.assertEqual(dict(Lote.objects.values_list('id', 'stock_por_lote')), esperado)
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_total, 38)
+
+
+class ReporteMovimientosPaginacionTests(InventoryAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.insumo = Insumo.objects.create(nombre='Guantes', codigo_producto='G-1')
+        cls.lote = Lote.objects.create(insumo=cls.insumo, numero_lote='L1', stock_por_lote=100)
+        base = timezone.now()
+        for i in range(25):
+            mov = Movimiento.objects.create(
+                usuario=cls.user,
+                tipo_movimiento='Salida' if i % 2 else 'Entrada',
+                servicio_destino=cls.servicio if i % 2 else None,
+            )
+            # Pares de movimientos con la misma fecha para probar el desempate por id
+            Movimiento.objects.filter(id=mov.id).update(fecha_registro=base - timedelta(minutes=i // 2))
+            Detalle_Movimiento.objects.create(movimiento=mov, lote=cls.lote, cantidad=1)
+
+    def recorrer(self, params):
+        url = reverse('inventory:reporte-movimientos')
+        ids, consultas, cursor = [], [], None
+        while True:
+            query = dict(params, **({'cursor': cursor} if cursor else {}))
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200, response.content)
+            ids += [m['id'] for m in response.data['results']]
+            consultas.append(len(ctx))
+            cursor = response.data['next_cursor']
+            if not cursor:
+                return ids, consultas
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        ids, consultas = self.recorrer({'page_size': 4})
+        esperado = list(Movimiento.objects.order_by('-fecha_registro', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+        # Las páginas profundas cuestan lo mismo que la primera
+        self.assertEqual(len(set(consultas[:-1])), 1)
+
+    def test_mantiene_los_filtros_entre_paginas(self):
+        ids, _ = self.recorrer({'page_size': 3, 'tipo_movimiento': 'Salida', 'servicio_id': self.servicio.id})
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(set(Movimiento.objects.filter(id__in=ids).values_list('tipo_movimiento', flat=True)), {'Salida'})
+
+    def test_page_size_tiene_tope(self):
+        response = self.client.get(reverse('inventory:reporte-movimientos'), {'page_size': 100000})
+        self.assertEqual(len(response.data['results']), 25)
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_cursor_invalido(self):
+        response = self.client.get(reverse('inventory:reporte-movimientos'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportarMovimientosTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.insumo = self.crear_insumo('E-1', nombre='Tubos')
+        self.registrar_entrada([
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 10},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L2', 'cantidad': 6},
+        ])
+        lote = Lote.objects.get(numero_lote='L1')
+        self.registrar_salida([{'lote': lote.id, 'cantidad': 3}])
+        self.url = reverse('inventory:reporte-movimientos-exportar')
+
+    def descargar(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_una_fila_por_detalle(self):
+        filas = list(csv.reader(self.descargar({'formato': 'csv'}).splitlines()))
+        self.assertEqual(filas[0][:3], ["Fecha", "Documento", "Tipo"])
+        self.assertEqual(len(filas), 1 + 3)
+        salida = filas[1]
+        self.assertEqual((salida[2], salida[4], salida[5], salida[6], salida[7]), ('Salida', 'Tubos', 'L1', '3', 'Urgencias'))
+
+    def test_ndjson_respeta_filtros(self):
+        lineas = self.descargar({'formato': 'ndjson', 'tipo_movimiento': 'Entrada'}).splitlines()
+        filas = [json.loads(linea) for linea in lineas]
+        self.assertEqual(sorted(f['lote'] for f in filas), ['L1', 'L2'])
+        self.assertTrue(all(f['tipo'] == 'Entrada' and f['usuario'] == 'tecnologo' for f in filas))
+
+    def test_formato_invalido(self):
+        self.assertEqual(self.client.get(self.url, {'formato': 'xml'}).status_code, 400)
+
+    def test_consultas_acotadas_por_bloque(self):
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}, {'insumo_id': self.insumo.id, 'cantidad': 8}])
+        completo = self.descargar({'formato': 'csv'})
+        tabla = connection.ops.quote_name(Detalle_Movimiento._meta.db_table)
+        with mock.patch.object(ExportarMovimientosView, 'chunk_size', 2):
+            with CaptureQueriesContext(connection) as ctx:
+                por_bloques = self.descargar({'formato': 'csv'})
+        self.assertEqual(por_bloques, completo)
+        consultas = [consulta['sql'] for consulta in ctx.captured_queries if f'FROM {tabla}' in consulta['sql']]
+        # 5 detalles en bloques de 2: 3 consultas, todas con LIMIT
+        self.assertEqual(len(consultas), 3)
+        self.assertTrue(all('LIMIT 2' in sql for sql in consultas), consultas)
+
+
+class EntradaBulkTests(InventoryAPITestCase):
+    """ Benchmark de consultas: registrar una entrada cuesta lo mismo con 5 o 150 líneas """
+
+    def contar_consultas_entrada(self, n_lineas, prefijo):
+        insumos = [self.crear_insumo(f"{prefijo}-{i}") for i in range(n_lineas)]
+        # La mitad de los lotes ya existe y la otra mitad es nueva
+        for insumo in insumos[::2]:
+            Lote.objects.create(insumo=insumo, numero_lote='L1')
+        detalles = [
+            {'insumo_id': insumo.id, 'numero_lote': 'L1', 'fecha_caducidad': '2030-01-31', 'cantidad': 2}
+            for insumo in insumos
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            self.registrar_entrada(detalles)
+        return len(ctx)
+
+    def test_consultas_constantes_segun_numero_de_lineas(self):
+        # El primer documento del año crea su secuencia; no contarlo
+        SecuenciaDocumento.objects.create(prefijo='ENT', anio=timezone.localdate().year)
+        pocas = self.contar_consultas_entrada(5, 'P')
+        # Con más líneas SQLite (máx. 999 parámetros) parte los bulk_create en varios INSERT
+        muchas = self.contar_consultas_entrada(150, 'M')
+        self.assertEqual(pocas, muchas)
+
+    def test_lotes_repetidos_y_existentes(self):
+        insumo = self.crear_insumo('B-1')
+        Lote.objects.create(insumo=insumo, numero_lote='L1', stock_por_lote=5)
+        Insumo.objects.filter(id=insumo.id).update(stock_total=5)
+        data = self.registrar_entrada([
+            {'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 1},
+            {'insumo_id': insumo.id, 'numero_lote': 'L2', 'fecha_caducidad': '2031-05-01', 'cantidad': 4},
+            {'insumo_id': insumo.id, 'numero_lote': 'L1', 'fecha_caducidad': '2030-12-31', 'cantidad': 2},
+        ])
+        self.assertEqual(len(data['detalles']), 3)
+        l1 = Lote.objects.get(insumo=insumo, numero_lote='L1')
+        self.assertEqual((l1.stock_por_lote, str(l1.fecha_caducidad)), (8, '2030-12-31'))
+        self.assertEqual(Lote.objects.get(insumo=insumo, numero_lote='L2').stock_por_lote, 4)
+        insumo.refresh_from_db()
+        self.assertEqual(insumo.stock_total, 12)
+
+    def test_insumo_inexistente_marca_la_linea(self):
+        insumo = self.crear_insumo('B-2')
+        response = self.client.post(reverse('inventory:entrada-create'), {'detalles': [
+            {'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 1},
+            {'insumo_id': 999999, 'numero_lote': 'L1', 'cantidad': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detalles'][0], {})
+        self.assertIn('insumo_id', response.data['detalles'][1])
+
+
+class SalidaStockTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.insumo = self.crear_insumo('S-1')
+        self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 5}])
+        self.lote = Lote.objects.get(insumo=self.insumo)
+
+    def test_lote_repetido_se_valida_por_el_total(self):
+        response = self.registrar_salida([
+            {'lote': self.lote.id, 'cantidad': 3},
+            {'lote': self.lote.id, 'cantidad': 3},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.stock_por_lote, 5)
+        self.assertFalse(Movimiento.objects.filter(tipo_movimiento='Salida').exists())
+
+    def test_cantidad_debe_ser_positiva(self):
+        response = self.registrar_salida([{'lote': self.lote.id, 'cantidad': -10}])
+        self.assertEqual(response.status_code, 400)
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.stock_por_lote, 5)
+
+    def test_salida_descuenta_lote_e_insumo(self):
+        response = self.registrar_salida([{'lote': self.lote.id, 'cantidad': 5}])
+        self.assertEqual(response.status_code, 201)
+        self.lote.refresh_from_db()
+        self.insumo.refresh_from_db()
+        self.assertEqual((self.lote.stock_por_lote, self.insumo.stock_total), (0, 0))
+
+
+@skipUnless(connection.features.has_select_for_update, "Requiere SELECT ... FOR UPDATE (MySQL)")
+class SalidaConcurrenteTests(TransactionTestCase):
+    """ Salidas en paralelo sobre los mismos lotes nunca dejan stock negativo """
+
+    def test_estres_salidas(self):
+        salida = StringIO()
+        call_command('estres_salidas', hilos=6, salidas=15, lotes=3, stock=20, cantidad=3, stdout=salida)
+        self.assertIn("Stock consistente", salida.getvalue())
+
+
+class NumeroDocumentoTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        descartar_bloques()
+        self.insumo = self.crear_insumo('N-1')
+        self.anio = timezone.localdate().year
+
+    def tearDown(self):
+        descartar_bloques()
+
+    def test_correlativo_por_tipo_sin_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            primera = self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 5}])
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "inventory_movimiento"')])
+        segunda = self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 5}])
+        salida = self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}])
+        self.assertEqual(
+            [primera['numero_documento'], segunda['numero_documento'], salida.data['numero_documento']],
+            [f"ENT-{self.anio}-00001", f"ENT-{self.anio}-00002", f"SAL-{self.anio}-00001"]
+        )
+
+    def test_reserva_fuera_de_la_transaccion_del_documento(self):
+        self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 5}])
+        fuera = len(connection.atomic_blocks)
+        profundidades = []
+        reservar = secuencias._reservar
+
+        def espia(*args):
+            profundidades.append(len(connection.atomic_blocks))
+            return reservar(*args)
+
+        with mock.patch.object(secuencias, '_reservar', espia):
+            self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 5}])
+            self.assertEqual(self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}]).status_code, 201)
+            # Rechazada por stock antes de reservar: no gasta número
+            self.assertEqual(self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 99}]).status_code, 400)
+            salida = self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}])
+        # La reserva abre su propio atomic(), pero no dentro del de la entrada o salida
+        self.assertEqual(profundidades, [fuera] * 3)
+        self.assertEqual(salida.data['numero_documento'], f"SAL-{self.anio}-00002")
+
+    def test_stock_tomado_tras_la_validacion_deja_hueco(self):
+        self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 5}])
+        bloquear = serializers_modulo.bloquear_lotes
+
+        def otra_salida_primero(*args):
+            # Otra salida se lleva el stock entre la validación previa y el bloqueo
+            Lote.objects.filter(insumo=self.insumo).update(stock_por_lote=0)
+            return bloquear(*args)
+
+        with mock.patch.object(serializers_modulo, 'bloquear_lotes', otra_salida_primero):
+            self.assertEqual(self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 5}]).status_code, 400)
+        Lote.objects.filter(insumo=self.insumo).update(stock_por_lote=5)
+        salida = self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 5}])
+        self.assertEqual(salida.data['numero_documento'], f"SAL-{self.anio}-00002")
+
+    def test_reinicia_cada_anio(self):
+        with transaction.atomic():
+            self.assertEqual(siguiente_documento('ENT', anio=2020), "ENT-2020-00001")
+            self.assertEqual(siguiente_documento('ENT', anio=2021), "ENT-2021-00001")
+            self.assertEqual(siguiente_documento('ENT', anio=2020), "ENT-2020-00002")
+
+    @override_settings(DOCUMENTO_BLOQUE_SECUENCIA=5)
+    def test_bloque_preasignado_por_proceso(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.assertEqual(siguiente_documento('SAL', anio=2030), "SAL-2030-00001")
+        with self.assertNumQueries(0):
+            numeros = [siguiente_documento('SAL', anio=2030) for _ in range(4)]
+        self.assertEqual(numeros[-1], "SAL-2030-00005")
+        self.assertEqual(SecuenciaDocumento.objects.get(prefijo='SAL', anio=2030).ultimo, 5)
+        with transaction.atomic():
+            self.assertEqual(siguiente_documento('SAL', anio=2030), "SAL-2030-00006")
+
+    @override_settings(DOCUMENTO_BLOQUE_SECUENCIA=5)
+    def test_bloque_revertido_no_queda_en_el_proceso(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    siguiente_documento('SAL', anio=2030)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(SecuenciaDocumento.objects.filter(prefijo='SAL', anio=2030, ultimo__gt=0).exists())
+        with transaction.atomic():
+            self.assertEqual(siguiente_documento('SAL', anio=2030), "SAL-2030-00001")
+
+
+@skipUnless(connection.features.has_select_for_update, "Requiere escrituras concurrentes (MySQL)")
+class NumeroDocumentoConcurrenteTests(TransactionTestCase):
+    """ Inserciones en paralelo, con y sin bloques, nunca repiten un número """
+
+    def insertar_en_paralelo(self, hilos=8, documentos=25):
+        usuario = User.objects.create_user(username='concurrente')
+        errores = []
+
+        def cliente():
+            try:
+                for _ in range(documentos):
+                    with transaction.atomic():
+                        Movimiento.objects.create(
+                            usuario=usuario, tipo_movimiento='Entrada', numero_documento=siguiente_documento('ENT'),
+                        )
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=cliente) for _ in range(hilos)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errores, [])
+        numeros = list(Movimiento.objects.values_list('numero_documento', flat=True))
+        self.assertEqual(len(numeros), hilos * documentos)
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+    def test_sin_bloques(self):
+        descartar_bloques()
+        self.insertar_en_paralelo()
+        anio = timezone.localdate().year
+        self.assertEqual(SecuenciaDocumento.objects.get(prefijo='ENT', anio=anio).ultimo, 200)
+
+    @override_settings(DOCUMENTO_BLOQUE_SECUENCIA=7)
+    def test_con_bloques(self):
+        descartar_bloques()
+        self.insertar_en_paralelo()
+        descartar_bloques()
+
+
+class SalidaFefoTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.insumo = self.crear_insumo('F-1', nombre='Reactivo')
+        hoy = timezone.localdate()
+        self.registrar_entrada([
+            {'insumo_id': self.insumo.id, 'numero_lote': 'SIN-FECHA', 'cantidad': 10},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'TARDE', 'fecha_caducidad': str(hoy + timedelta(days=90)), 'cantidad': 10},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'PRONTO', 'fecha_caducidad': str(hoy + timedelta(days=5)), 'cantidad': 4},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'VENCIDO', 'fecha_caducidad': str(hoy - timedelta(days=1)), 'cantidad': 50},
+        ])
+
+    def stock(self):
+        return dict(Lote.objects.filter(insumo=self.insumo).values_list('numero_lote', 'stock_por_lote'))
+
+    def test_reparte_primero_lo_que_caduca_antes(self):
+        response = self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 7}])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([(d['lote_numero'], d['cantidad']) for d in response.data['detalles']], [('PRONTO', 4), ('TARDE', 3)])
+        self.assertEqual(self.stock(), {'SIN-FECHA': 10, 'TARDE': 7, 'PRONTO': 0, 'VENCIDO': 50})
+        self.insumo.refresh_from_db()
+        self.assertEqual(self.insumo.stock_total, 67)
+
+    def test_combina_lineas_con_lote_y_fefo(self):
+        pronto = Lote.objects.get(insumo=self.insumo, numero_lote='PRONTO')
+        response = self.registrar_salida([
+            {'lote': pronto.id, 'cantidad': 3},
+            {'insumo_id': self.insumo.id, 'cantidad': 12},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.stock(), {'SIN-FECHA': 9, 'TARDE': 0, 'PRONTO': 0, 'VENCIDO': 50})
+
+    def test_no_despacha_lotes_vencidos(self):
+        response = self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 25}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock()['VENCIDO'], 50)
+
+    def test_linea_sin_lote_ni_insumo(self):
+        response = self.registrar_salida([{'cantidad': 1}])
+        self.assertEqual(response.status_code, 400)
+
+
+def indices_del_plan(queryset):
+    """ Nombres de índices que el planificador usa para el queryset (no los que solo considera) """
+    if connection.vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        nombres = set()
+
+        def recorrer(nodo):
+            if isinstance(nodo, dict):
+                for clave, valor in nodo.items():
+                    if clave == 'key':
+                        nombres.add(valor)
+                    elif clave != 'possible_keys':
+                        recorrer(valor)
+            elif isinstance(nodo, list):
+                for item in nodo:
+                    recorrer(item)
+        recorrer(plan)
+        return nombres
+    if connection.vendor == 'sqlite':
+        return set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', queryset.explain()))
+    return None
+
+
+class ReporteConsultasTests(InventoryAPITestCase):
+    """ Regresiones de plan: filtros de fecha sargables, EXISTS e índices compuestos """
+
+    def filtrar(self, **params):
+        query = QueryDict(mutable=True)
+        query.update(params)
+        return filtrar_movimientos(Movimiento.objects.all(), query).order_by('-fecha_registro', '-id')
+
+    def assertUsaIndice(self, queryset, indice):
+        indices = indices_del_plan(queryset)
+        if indices is None:
+            self.skipTest(f"EXPLAIN no soportado en {connection.vendor}")
+        self.assertIn(indice, indices, queryset.explain())
+
+    def test_filtro_de_fechas_sin_funcion_sobre_la_columna(self):
+        sql = str(self.filtrar(fecha_inicio='2025-01-01', fecha_fin='2025-01-31').query)
+        self.assertNotIn('DATE(', sql.upper())
+        self.assertNotIn('django_datetime_cast_date', sql)
+
+    def test_filtro_de_fechas_es_semiabierto(self):
+        insumo = self.crear_insumo('Q-1')
+        self.registrar_entrada([{'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 1}])
+        mov = Movimiento.objects.get()
+        dia = timezone.localdate(mov.fecha_registro)
+        self.assertEqual(self.filtrar(fecha_inicio=str(dia), fecha_fin=str(dia)).count(), 1)
+        self.assertEqual(self.filtrar(fecha_fin=str(dia - timedelta(days=1))).count(), 0)
+        self.assertEqual(self.filtrar(fecha_inicio=str(dia + timedelta(days=1))).count(), 0)
+
+    def test_filtro_por_insumo_usa_exists_sin_distinct(self):
+        sql = str(self.filtrar(insumo_id='1').query).upper()
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_filtro_por_insumo_no_duplica_movimientos(self):
+        insumo = self.crear_insumo('Q-2')
+        self.registrar_entrada([
+            {'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 1},
+            {'insumo_id': insumo.id, 'numero_lote': 'L2', 'cantidad': 1},
+        ])
+        self.assertEqual(len(self.filtrar(insumo_id=str(insumo.id))), 1)
+
+    def test_planes_usan_indices_de_reportes(self):
+        self.assertUsaIndice(self.filtrar(fecha_inicio='2025-01-01'), 'movimiento_fecha_idx')
+        self.assertUsaIndice(self.filtrar(tipo_movimiento='Salida', fecha_inicio='2025-01-01'), 'movimiento_tipo_fecha_idx')
+        self.assertUsaIndice(self.filtrar(servicio_id=str(self.servicio.id)), 'movimiento_servicio_fecha_idx')
+        self.assertUsaIndice(self.filtrar(usuario_id=str(self.user.id)), 'movimiento_usuario_fecha_idx')
+
+    def test_consultas_del_reporte_no_crecen_con_los_filtros(self):
+        insumo = self.crear_insumo('Q-3')
+        for _ in range(5):
+            self.registrar_entrada([{'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 1}])
+        url = reverse('inventory:reporte-movimientos')
+        with CaptureQueriesContext(connection) as sin_filtros:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as con_filtros:
+            self.client.get(url, {'insumo_id': insumo.id, 'tipo_movimiento': 'Entrada', 'fecha_inicio': '2000-01-01'})
+        self.assertEqual(len(sin_filtros), len(con_filtros))
+
+
+class ConsumoDiarioTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.otro_servicio = Servicio.objects.create(nombre='Pabellón')
+        self.insumo = self.crear_insumo('C-1', nombre='Jeringas')
+        self.registrar_entrada([
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 30},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L2', 'cantidad': 10},
+        ])
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 12}])
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 5}])
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 2}], servicio=self.otro_servicio)
+
+    def acumulados(self):
+        return sorted(ConsumoDiario.objects.values_list('insumo_id', 'servicio_id', 'tipo_movimiento', 'cantidad'), key=str)
+
+    def test_acumulados_incrementales(self):
+        self.assertEqual(self.acumulados(), sorted([
+            (self.insumo.id, None, 'Entrada', 40),
+            (self.insumo.id, self.servicio.id, 'Salida', 17),
+            (self.insumo.id, self.otro_servicio.id, 'Salida', 2),
+        ], key=str))
+
+    def test_reconstruir_coincide_con_incremental(self):
+        incremental = self.acumulados()
+        ConsumoDiario.objects.update(cantidad=0)
+        call_command('reconstruir_consumo_diario', stdout=StringIO())
+        self.assertEqual(self.acumulados(), incremental)
+
+    def test_resumen_lee_solo_acumulados(self):
+        url = reverse('inventory:reporte-consumo')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'periodo': 'mes'})
+        self.assertEqual(response.status_code, 200)
+        sql = " ".join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('inventory_detalle_movimiento', sql)
+        self.assertEqual(
+            sorted((fila['servicio'], fila['cantidad']) for fila in response.data),
+            [('Pabellón', 2), ('Urgencias', 17)]
+        )
+        response = self.client.get(url, {'periodo': 'anio', 'tipo_movimiento': 'Entrada'})
+        self.assertEqual([fila['cantidad'] for fila in response.data], [40])
+
+    def test_editar_detalle_aplica_la_diferencia(self):
+        detalle = Detalle_Movimiento.objects.get(movimiento__servicio_destino=self.otro_servicio)
+        detalle.cantidad = 7
+        detalle.save()
+        self.assertEqual(ConsumoDiario.objects.get(servicio=self.otro_servicio).cantidad, 7)
+        detalle.movimiento = Movimiento.objects.filter(servicio_destino=self.servicio).first()
+        detalle.save()
+        self.assertEqual(ConsumoDiario.objects.get(servicio=self.otro_servicio).cantidad, 0)
+        self.assertEqual(ConsumoDiario.objects.get(servicio=self.servicio).cantidad, 17 + 7)
+        incremental = self.acumulados()
+        call_command('reconstruir_consumo_diario', stdout=StringIO())
+        self.assertEqual(
+            [fila for fila in self.acumulados() if fila[3]], [fila for fila in incremental if fila[3]]
+        )
+
+    def test_eliminar_detalle_descuenta(self):
+        Detalle_Movimiento.objects.filter(movimiento__servicio_destino=self.otro_servicio).delete()
+        self.assertFalse(
+            ConsumoDiario.objects.filter(servicio=self.otro_servicio).exclude(cantidad=0).exists()
+        )
+
+
+class ReporteAgrupadoTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.otro_servicio = Servicio.objects.create(nombre='Pabellón')
+        self.jeringas = self.crear_insumo('G-1', nombre='Jeringas')
+        self.gasas = self.crear_insumo('G-2', nombre='Gasas')
+        self.registrar_entrada([
+            {'insumo_id': self.jeringas.id, 'numero_lote': 'L1', 'cantidad': 30},
+            {'insumo_id': self.gasas.id, 'numero_lote': 'L1', 'cantidad': 20},
+        ])
+        self.registrar_salida([
+            {'insumo_id': self.jeringas.id, 'cantidad': 12},
+            {'insumo_id': self.gasas.id, 'cantidad': 3},
+        ])
+        self.registrar_salida([{'insumo_id': self.jeringas.id, 'cantidad': 4}], servicio=self.otro_servicio)
+        self.url = reverse('inventory:reporte-movimientos-agrupado')
+
+    def test_por_insumo(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'group_by': 'insumo'})
+        self.assertEqual(response.status_code, 200)
+        # Límite del archivo (sin fecha_inicio el rango llega a él) y el GROUP BY
+        self.assertEqual(len(ctx), 2)
+        self.assertIn('GROUP BY', ctx.captured_queries[-1]['sql'])
+        self.assertFalse(response.data['truncado'])
+        self.assertEqual(
+            [(f['insumo_nombre'], f['cantidad_entradas'], f['cantidad_salidas'], f['lineas']) for f in response.data['results']],
+            [('Jeringas', 30, 16, 3), ('Gasas', 20, 3, 2)],
+        )
+
+    def test_filtros_y_periodos(self):
+        response = self.client.get(self.url, {'group_by': 'servicio', 'tipo_movimiento': 'Salida', 'insumo_id': self.jeringas.id})
+        self.assertEqual(
+            [(f['servicio'], f['cantidad_salidas']) for f in response.data['results']],
+            [('Urgencias', 12), ('Pabellón', 4)],
+        )
+        hoy = timezone.localdate()
+        for group_by, periodo in (('day', hoy), ('week', hoy - timedelta(days=hoy.weekday())), ('month', hoy.replace(day=1))):
+            response = self.client.get(self.url, {'group_by': group_by})
+            self.assertEqual(
+                [(f['periodo'], f['cantidad_entradas'], f['cantidad_salidas']) for f in response.data['results']],
+                [(periodo, 50, 19)],
+            )
+        manana = (hoy + timedelta(days=1)).isoformat()
+        response = self.client.get(self.url, {'group_by': 'usuario', 'fecha_inicio': manana})
+        self.assertEqual(response.data['results'], [])
+
+    def test_limite_y_errores(self):
+        response = self.client.get(self.url, {'group_by': 'insumo', 'limite': 1})
+        self.assertTrue(response.data['truncado'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.client.get(self.url, {'group_by': 'anio'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'group_by': 'insumo', 'limite': 'x'}).status_code, 400)
+
+
+class AlertasTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        hoy = timezone.localdate()
+        self.critico = self.crear_insumo('AL-1', nombre='Gasas', umbral=10)
+        self.sano = self.crear_insumo('AL-2', nombre='Guantes', umbral=5)
+        self.registrar_entrada([
+            {'insumo_id': self.critico.id, 'numero_lote': 'V1', 'cantidad': 8, 'fecha_caducidad': str(hoy - timedelta(days=1))},
+            {'insumo_id': self.critico.id, 'numero_lote': 'V2', 'cantidad': 6, 'fecha_caducidad': str(hoy + timedelta(days=10))},
+            {'insumo_id': self.sano.id, 'numero_lote': 'S1', 'cantidad': 50, 'fecha_caducidad': str(hoy + timedelta(days=90))},
+        ])
+
+    def test_calculo_en_vivo(self):
+        response = self.client.get(reverse('inventory:alertas'), {'en_vivo': 1, 'dias': 30})
+        self.assertEqual(response.status_code, 200)
+        # El lote vencido no cuenta como stock vigente: 6 <= 10
+        self.assertEqual(
+            [(a['insumo_id'], a['stock_vigente'], a['stock_total']) for a in response.data['stock_critico']],
+            [(self.critico.id, 6, 14)]
+        )
+        self.assertEqual([a['lote_numero'] for a in response.data['por_vencer']], ['V1', 'V2'])
+        self.assertEqual([a['dias_restantes'] for a in response.data['por_vencer']], [-1, 10])
+
+    def test_umbral_incluido(self):
+        # Stock vigente igual al umbral: crítico; uno por encima: no
+        Insumo.objects.filter(pk=self.critico.pk).update(umbral_critico=6)
+        self.assertEqual([a['insumo_id'] for a in calcular_alertas(30)['stock_critico']], [self.critico.id])
+        Insumo.objects.filter(pk=self.critico.pk).update(umbral_critico=5)
+        self.assertEqual(calcular_alertas(30)['stock_critico'], [])
+
+    def test_sin_foto(self):
+        response = self.client.get(reverse('inventory:alertas'))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('generar_alertas', response.data['error'])
+        self.assertEqual(self.client.get(reverse('inventory:alertas'), {'dias': 30}).status_code, 404)
+
+    def test_consultas_constantes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            calcular_alertas(30)
+        antes = len(ctx.captured_queries)
+        for i in range(5):
+            insumo = self.crear_insumo(f'AL-X{i}', umbral=100)
+            Lote.objects.create(insumo=insumo, numero_lote='X', stock_por_lote=1,
+                                fecha_caducidad=timezone.localdate() + timedelta(days=3))
+        with self.assertNumQueries(antes):
+            resultado = calcular_alertas(30)
+        self.assertEqual(len(resultado['stock_critico']), 6)
+
+    def test_comando_guarda_snapshot(self):
+        call_command('generar_alertas', dias=5, stdout=StringIO())
+        self.assertEqual(AlertaInventario.objects.count(), 2)
+        # El endpoint lee la foto guardada aunque los datos cambien después
+        Lote.objects.filter(numero_lote='V2').update(fecha_caducidad=timezone.localdate() + timedelta(days=1))
+        response = self.client.get(reverse('inventory:alertas'))
+        self.assertEqual(response.data['dias'], 5)
+        self.assertEqual([a['lote_numero'] for a in response.data['por_vencer']], ['V1'])
+        self.assertEqual(len(response.data['stock_critico']), 1)
+        call_command('generar_alertas', dias=5, stdout=StringIO())
+        self.assertEqual(AlertaInventario.objects.filter(tipo='por_vencer').count(), 2)
+
+    def test_foto_sin_alertas_es_valida(self):
+        Insumo.objects.update(umbral_critico=0)
+        Lote.objects.update(fecha_caducidad=None)
+        call_command('generar_alertas', dias=5, stdout=StringIO())
+        self.assertFalse(AlertaInventario.objects.exists())
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('inventory:alertas'))
+        self.assertEqual((response.data['stock_critico'], response.data['por_vencer'], response.data['dias']), ([], [], 5))
+        # Cabecera y filas: no se recalcula en vivo
+        self.assertNotIn('SUM(', ' '.join(consulta['sql'] for consulta in ctx.captured_queries).upper())
+
+    def test_otra_ventana_se_calcula_en_vivo(self):
+        call_command('generar_alertas', dias=5, stdout=StringIO())
+        response = self.client.get(reverse('inventory:alertas'), {'dias': 30})
+        self.assertEqual(response.data['dias'], 30)
+        self.assertEqual([a['lote_numero'] for a in response.data['por_vencer']], ['V1', 'V2'])
+        self.assertEqual(self.client.get(reverse('inventory:alertas'), {'dias': 5}).data['dias'], 5)
+
+
+class StockHistoricoTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.insumo = self.crear_insumo('H-1', nombre='Suero')
+        self.otro = self.crear_insumo('H-2', nombre='Apósitos')
+        self.hoy = timezone.localdate()
+        # Movimientos repartidos en los últimos meses (fecha_registro es auto_now_add)
+        self.mover(100, self.registrar_entrada([
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 50},
+            {'insumo_id': self.otro.id, 'numero_lote': 'O1', 'cantidad': 20},
+        ]))
+        self.mover(70, self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 15}]).data)
+        self.mover(45, self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L2', 'cantidad': 30}]))
+        self.mover(20, self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 40}]).data)
+        self.mover(5, self.registrar_salida([{'insumo_id': self.otro.id, 'cantidad': 20}]).data)
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}])
+
+    def mover(self, dias, movimiento):
+        Movimiento.objects.filter(id=movimiento['id']).update(fecha_registro=timezone.now() - timedelta(days=dias))
+
+    def test_cortes_coinciden_con_ledger_completo(self):
+        call_command('construir_cortes_stock', stdout=StringIO())
+        self.assertGreaterEqual(CorteStock.objects.count(), 3)
+        for dias in range(110, -1, -1):
+            fecha = self.hoy - timedelta(days=dias)
+            corte, con_cortes = stock_a_fecha(fecha)
+            _, completo = stock_a_fecha(fecha, usar_cortes=False)
+            self.assertEqual(con_cortes, completo, fecha)
+            if dias < 60:
+                self.assertIsNotNone(corte)
+        # Al día de hoy, el ledger coincide con el stock de los lotes
+        self.assertEqual(
+            {lote_id: stock for lote_id, (_, stock) in stock_a_fecha(self.hoy)[1].items()},
+            dict(Lote.objects.exclude(stock_por_lote=0).values_list('id', 'stock_por_lote')),
+        )
+
+    def test_endpoint_por_insumo_y_lote(self):
+        call_command('construir_cortes_stock', stdout=StringIO())
+        url = reverse('inventory:reporte-stock-historico')
+        response = self.client.get(url, {'fecha': str(self.hoy - timedelta(days=50))})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['corte'])
+        self.assertEqual(
+            [(fila['insumo_codigo'], fila['stock']) for fila in response.data['insumos']],
+            [('H-2', 20), ('H-1', 35)]
+        )
+        completo = self.client.get(url, {'fecha': str(self.hoy - timedelta(days=50)), 'completo': 1})
+        self.assertIsNone(completo.data['corte'])
+        self.assertEqual(completo.data['lotes'], response.data['lotes'])
+
+        lote = Lote.objects.get(numero_lote='L2')
+        response = self.client.get(url, {'fecha': str(self.hoy - timedelta(days=30)), 'lote_id': lote.id})
+        self.assertEqual([(fila['numero_lote'], fila['stock']) for fila in response.data['lotes']], [('L2', 30)])
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_cambio_en_ledger_antiguo_invalida_cortes(self):
+        call_command('construir_cortes_stock', stdout=StringIO())
+        antiguo = Movimiento.objects.order_by('fecha_registro').filter(tipo_movimiento='Salida').first()
+        fecha = timezone.localdate(antiguo.fecha_registro)
+        Detalle_Movimiento.objects.filter(movimiento=antiguo).delete()
+        self.assertFalse(CorteStock.objects.filter(fecha__gt=fecha).exists())
+        call_command('construir_cortes_stock', stdout=StringIO())
+        self.assertEqual(stock_a_fecha(self.hoy)[1], stock_a_fecha(self.hoy, usar_cortes=False)[1])
+
+    def test_editar_detalle_invalida_una_vez(self):
+        # Detalle pasado de un movimiento reciente a uno antiguo: desde el día más antiguo
+        antiguo = Movimiento.objects.order_by('fecha_registro').filter(tipo_movimiento='Salida').first()
+        detalle = Detalle_Movimiento.objects.filter(movimiento__tipo_movimiento='Salida').latest('movimiento__fecha_registro')
+        detalle.movimiento = antiguo
+        with mock.patch('inventory.signals.invalidar_cortes_desde') as invalidar:
+            detalle.save()
+        invalidar.assert_called_once_with(antiguo.fecha_registro)
+
+        # y de vuelta: la versión guardada es la más antigua
+        detalle = Detalle_Movimiento.objects.get(pk=detalle.pk)
+        detalle.movimiento = Movimiento.objects.latest('fecha_registro')
+        with mock.patch('inventory.signals.invalidar_cortes_desde') as invalidar:
+            detalle.save()
+        invalidar.assert_called_once_with(antiguo.fecha_registro)
+
+
+class ArchivoMovimientosTests(InventoryAPITestCase):
+    """ Archivar años cerrados no cambia reportes, exportación, stock ni ConsumoDiario """
+
+    def setUp(self):
+        super().setUp()
+        self.anio = timezone.localdate().year
+        self.insumo = self.crear_insumo('AR-1', nombre='Catéteres')
+        self.otro = self.crear_insumo('AR-2', nombre='Vendas')
+        # (fecha_registro, movimiento): dos años archivables, el último cerrado (vivo) y hoy
+        fechas = [
+            datetime(self.anio - 3, 6, 15, 10), datetime(self.anio - 2, 3, 1, 9), datetime(self.anio - 2, 3, 1, 9),
+            datetime(self.anio - 2, 12, 31, 23, 30), datetime(self.anio - 1, 8, 20, 12),
+        ]
+        movimientos = [
+            self.registrar_entrada([
+                {'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 50},
+                {'insumo_id': self.otro.id, 'numero_lote': 'V1', 'cantidad': 30},
+            ]),
+            self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 5}, {'insumo_id': self.otro.id, 'cantidad': 2}]).data,
+            self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 7}]).data,
+            self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L2', 'cantidad': 20}]),
+            self.registrar_salida([{'insumo_id': self.otro.id, 'cantidad': 4}]).data,
+        ]
+        for fecha, movimiento in zip(fechas, movimientos):
+            Movimiento.objects.filter(id=movimiento['id']).update(fecha_registro=timezone.make_aware(fecha))
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}])
+        # ConsumoDiario según las fechas movidas
+        call_command('reconstruir_consumo_diario', stdout=StringIO())
+
+    def archivar(self, **opciones):
+        call_command('archivar_movimientos', hasta_anio=self.anio - 2, stdout=StringIO(), **opciones)
+
+    def foto(self):
+        """ Lo que no debe cambiar al archivar """
+        url = reverse('inventory:reporte-movimientos')
+        paginas, params = [], {'page_size': 2}
+        while True:
+            datos = json.loads(self.client.get(url, params).content)
+            paginas.append(datos['results'])
+            if not datos['next_cursor']:
+                break
+            params['cursor'] = datos['next_cursor']
+        agrupado = reverse('inventory:reporte-movimientos-agrupado')
+        return {
+            'reporte': paginas,
+            'reporte_insumo': self.client.get(url, {'insumo_id': self.otro.id, 'fecha_inicio': f'{self.anio - 2}-01-01'}).content,
+            'exportar': b''.join(self.client.get(reverse('inventory:reporte-movimientos-exportar')).streaming_content),
+            'agrupado': [self.client.get(agrupado, {'group_by': group_by}).content for group_by in ('insumo', 'servicio', 'month')],
+            'stock': [stock_a_fecha(date(anio, 12, 31), usar_cortes=False)[1] for anio in range(self.anio - 3, self.anio + 1)],
+            'lotes': list(Lote.objects.order_by('id').values_list('id', 'stock_por_lote')),
+            'consumo': sorted(ConsumoDiario.objects.values_list('fecha', 'insumo_id', 'servicio_id', 'tipo_movimiento', 'cantidad')),
+        }
+
+    def test_archivar_no_cambia_reportes_ni_stock(self):
+        antes = self.foto()
+        self.archivar(tamano=1)
+        self.assertEqual(MovimientoArchivado.objects.count(), 4)
+        self.assertEqual(DetalleMovimientoArchivado.objects.count(), 6)
+        self.assertFalse(Movimiento.objects.filter(fecha_registro__lt=timezone.make_aware(datetime(self.anio - 1, 1, 1))).exists())
+        self.assertEqual(
+            list(AnioArchivado.objects.order_by('anio').values_list('anio', 'movimientos', 'detalles', 'completo')),
+            [(self.anio - 3, 1, 2, True), (self.anio - 2, 3, 4, True)],
+        )
+        self.assertEqual(self.foto(), antes)
+
+        salida = StringIO()
+        call_command('conciliar_stock_lotes', stdout=salida)
+        self.assertIn('coincide con el ledger', salida.getvalue())
+        call_command('reconstruir_consumo_diario', stdout=StringIO())
+        call_command('construir_cortes_stock', stdout=StringIO())
+        self.assertEqual(self.foto(), antes)
+        self.assertEqual(stock_a_fecha(timezone.localdate())[1], stock_a_fecha(timezone.localdate(), usar_cortes=False)[1])
+
+    def test_se_retoma_un_anio_a_medio_archivar(self):
+        antes = self.foto()
+        AnioArchivado.objects.create(anio=self.anio - 2)
+        self.assertEqual(archivar_lote(self.anio - 2, tamano=1), (1, 2))
+        # Año repartido entre las dos tablas: los reportes lo siguen viendo completo
+        self.assertEqual(self.foto(), antes)
+        self.archivar()
+        self.assertEqual(AnioArchivado.objects.get(anio=self.anio - 2).movimientos, 3)
+        self.assertEqual(self.foto(), antes)
+        # Nada pendiente: volver a ejecutarlo no mueve nada
+        self.archivar()
+        self.assertEqual(MovimientoArchivado.objects.count(), 4)
+
+    def test_el_archivo_solo_se_consulta_si_el_rango_llega_a_el(self):
+        url = reverse('inventory:reporte-movimientos')
+        tabla = MovimientoArchivado._meta.db_table
+        self.archivar()
+        casos = [
+            ({'fecha_inicio': f'{self.anio}-01-01'}, False),
+            ({'fecha_inicio': f'{self.anio - 1}-01-01'}, False),
+            ({'fecha_inicio': f'{self.anio - 2}-06-01'}, True),
+            ({}, True),
+        ]
+        for params, con_archivo in casos:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params)
+            self.assertEqual(any(tabla in consulta['sql'] for consulta in ctx.captured_queries), con_archivo, params)
+            self.assertEqual(any(fila['fecha_registro'] < f'{self.anio - 1}' for fila in response.data['results']), con_archivo, params)
+
+    def test_reporte_async_con_archivo(self):
+        token = Token.objects.create(user=self.user)
+        self.archivar()
+        for params in ({'page_size': 3}, {'fecha_inicio': f'{self.anio - 3}-01-01', 'tipo_movimiento': 'Salida'}):
+            sync = self.client.get(reverse('inventory:reporte-movimientos'), params)
+            with override_settings(ROOT_URLCONF='gestinvlab_project.urls_asgi'):
+                asincrona = async_to_sync(self.async_client.get)(
+                    reverse('inventory:reporte-movimientos'), params, headers={'authorization': f'Token {token.key}'}
+                )
+            self.assertEqual(asincrona.content, sync.content)
+
+    def test_solo_anios_cerrados(self):
+        with self.assertRaises(CommandError):
+            call_command('archivar_movimientos', hasta_anio=self.anio, stdout=StringIO())
+        self.assertFalse(MovimientoArchivado.objects.exists())
+
+    def test_admin_solo_lectura(self):
+        call_command('archivar_movimientos', hasta_anio=self.anio - 2, stdout=StringIO())
+        self.client.force_login(User.objects.create_superuser(username='raiz', password='clave-segura-123'))
+        archivado = MovimientoArchivado.objects.first()
+        self.assertEqual(self.client.get(reverse('admin:inventory_movimientoarchivado_changelist')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('admin:inventory_movimientoarchivado_add')).status_code, 403)
+        self.assertEqual(
+            self.client.post(reverse('admin:inventory_movimientoarchivado_delete', args=[archivado.pk]), {'post': 'yes'}).status_code,
+            403,
+        )
+        self.assertTrue(MovimientoArchivado.objects.filter(pk=archivado.pk).exists())
+
+
+class LecturaAsyncTests(InventoryAPITestCase):
+    """ Las vistas async (ASGI) responden lo mismo que las sync, byte a byte """
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        self.insumo = self.crear_insumo('AS-1', nombre='Tubos')
+        self.crear_insumo('AS-2', nombre='Agujas')
+        self.registrar_entrada([
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 10, 'fecha_caducidad': '2030-01-31'},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L2', 'cantidad': 5},
+        ])
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 3}])
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 1}])
+
+    def get_async(self, nombre, params=None, headers=None):
+        headers = {'authorization': f'Token {self.token.key}'} if headers is None else headers
+        with override_settings(ROOT_URLCONF='gestinvlab_project.urls_asgi'):
+            response = async_to_sync(self.async_client.get)(reverse(nombre), params or {}, headers=headers)
+            # resolver_match es perezoso: resolverlo con el URLconf de ASGI
+            response.vista = response.resolver_match.func
+        return response
+
+    def test_respuestas_identicas(self):
+        casos = [
+            ('inventory:insumo-list', {}),
+            ('inventory:servicio-list', {}),
+            ('inventory:lote-list', {'insumo_id': self.insumo.id}),
+            ('inventory:lote-list', {}),
+            ('inventory:reporte-movimientos', {'tipo_movimiento': 'Salida'}),
+            ('inventory:reporte-movimientos', {'page_size': 1}),
+            ('inventory:reporte-movimientos', {'cursor': 'no-es-un-cursor'}),
+        ]
+        for nombre, params in casos:
+            cache.clear()
+            sync = self.client.get(reverse(nombre), params)
+            cache.clear()
+            asincrona = self.get_async(nombre, params)
+            self.assertTrue(inspect.iscoroutinefunction(asincrona.vista), nombre)
+            self.assertEqual((asincrona.status_code, asincrona.content), (sync.status_code, sync.content), (nombre, params))
+
+    def test_paginas_siguientes(self):
+        primera = self.get_async('inventory:reporte-movimientos', {'page_size': 2})
+        cursor = json.loads(primera.content)['next_cursor']
+        segunda = self.get_async('inventory:reporte-movimientos', {'page_size': 2, 'cursor': cursor})
+        sync = self.client.get(reverse('inventory:reporte-movimientos'), {'page_size': 2, 'cursor': cursor})
+        self.assertEqual(segunda.content, sync.content)
+        self.assertEqual(len(json.loads(segunda.content)['results']), 1)
+
+    def test_requiere_autenticacion(self):
+        self.assertEqual(self.get_async('inventory:insumo-list', headers={}).status_code, 401)
+        self.assertEqual(self.get_async('inventory:insumo-list', headers={'authorization': 'Token malo'}).status_code, 401)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_async('inventory:insumo-list').status_code, 401)
+
+    def test_otros_metodos_y_sesion_como_drf(self):
+        headers = {'authorization': f'Token {self.token.key}'}
+        url = reverse('inventory:insumo-list')
+        with override_settings(ROOT_URLCONF='gestinvlab_project.urls_asgi'):
+            head = async_to_sync(self.async_client.head)(url, headers=headers)
+            asincronas = [async_to_sync(getattr(self.async_client, metodo))(url, headers=headers)
+                          for metodo in ('options', 'post', 'delete')]
+        self.assertEqual(head.status_code, 200)
+        for asincrona, metodo in zip(asincronas, ('options', 'post', 'delete')):
+            sync = getattr(self.client, metodo)(url, headers=headers)
+            self.assertEqual((asincrona.status_code, asincrona.content), (sync.status_code, sync.content), metodo)
+
+        self.async_client.force_login(self.user)
+        self.assertEqual(self.get_async('inventory:insumo-list', headers={}).status_code, 200)
+
+    def test_etag_no_modificado(self):
+        etag = self.get_async('inventory:insumo-list')['ETag']
+        response = self.get_async(
+            'inventory:insumo-list', headers={'authorization': f'Token {self.token.key}', 'if-none-match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(etag, self.client.get(reverse('inventory:insumo-list'))['ETag'])
+
+
+class LecturaRapidaTests(InventoryAPITestCase):
+    """ El camino rápido (lectura_rapida.py + ORJSONRenderer) responde lo mismo que los serializers """
+
+    def setUp(self):
+        super().setUp()
+        self.insumo = self.crear_insumo('LR-1', nombre='Catéter "doble"\u2028lumen')
+        self.registrar_entrada([
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 10, 'fecha_caducidad': '2030-01-31'},
+            {'insumo_id': self.insumo.id, 'numero_lote': 'L2', 'cantidad': 5},
+        ])
+        self.registrar_salida([{'insumo_id': self.insumo.id, 'cantidad': 12}])
+        User.objects.create_user(username='inactivo', is_active=False)
+
+    def test_reporte_identico_a_serializers(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('inventory:reporte-movimientos'), {'page_size': 1})
+        self.assertEqual(len(ctx), 3)
+        movimiento = Movimiento.objects.order_by('-fecha_registro', '-id').prefetch_related('detalles__lote__insumo')[0]
+        esperado = JSONRenderer().render({
+            'next_cursor': response.data['next_cursor'],
+            'results': ReporteMovimientoSerializer([movimiento], many=True).data,
+        })
+        self.assertEqual(response.content, esperado)
+        self.assertIn(b'\\u2028', response.content)
+
+        siguiente = self.client.get(reverse('inventory:reporte-movimientos'), {'page_size': 1, 'cursor': response.data['next_cursor']})
+        entrada = Movimiento.objects.get(tipo_movimiento='Entrada')
+        self.assertEqual(siguiente.content, JSONRenderer().render({
+            'next_cursor': None, 'results': ReporteMovimientoSerializer([entrada], many=True).data,
+        }))
+
+    def test_listados_identicos_a_serializers(self):
+        drf = JSONRenderer().render
+        lotes = Lote.objects.filter(insumo=self.insumo, stock_por_lote__gt=0).order_by('fecha_caducidad')
+        casos = [
+            (reverse('inventory:lote-list'), {'insumo_id': self.insumo.id}, LoteSerializer(lotes, many=True).data),
+            (reverse('inventory:insumo-list'), {}, InsumoSerializer(Insumo.objects.order_by('nombre'), many=True).data),
+            (reverse('inventory:user-list'), {}, UserSerializer(User.objects.filter(is_active=True).order_by('username'), many=True).data),
+        ]
+        for url, params, data in casos:
+            self.assertEqual(self.client.get(url, params).content, drf(data), url)
+
+        self.client.force_authenticate(self.admin)
+        usuarios = User.objects.order_by('username')
+        arranque = self.client.get(reverse('inventory:arranque')).data
+        self.assertEqual(drf(arranque['admin_usuarios']), drf(UserAdminSerializer(usuarios, many=True).data))
+        self.assertEqual(drf(arranque['usuarios']), drf(UserSerializer(usuarios.filter(is_active=True), many=True).data))
+        self.assertEqual(
+            self.client.get(reverse('inventory:admin-usuarios')).content,
+            drf(UserAdminSerializer(usuarios, many=True).data),
+        )
+
+    def test_renderer_igual_a_drf(self):
+        # Los valores del camino rápido: textos, enteros, booleanos, null y fechas
+        casos = [
+            {'a': 1, 'b': [True, False, -7], 'c': None},
+            {'fecha': timezone.now(), 'dia': timezone.localdate(), 'texto': 'línea\u2028párrafo\u2029fin'},
+            [{'perezoso': gettext_lazy('Invalid token.')}, 2 ** 70, {1: 'clave entera'}],
+            [],
+        ]
+        for data in casos:
+            self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(casos[0], 'application/json; indent=4'),
+            JSONRenderer().render(casos[0], 'application/json; indent=4'),
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_renderer_solo_en_el_camino_rapido(self):
+        response = self.client.get(reverse('inventory:insumo-list'))
+        self.assertIs(type(response.accepted_renderer), ORJSONRenderer)
+        response = self.client.get(reverse('inventory:reporte-consumo'))
+        self.assertIs(type(response.accepted_renderer), JSONRenderer)
+
+
+class TokenCacheTests(InventoryAPITestCase):
+    """ Autenticación por token con caché: cero consultas con la caché caliente """
+
+    def setUp(self):
+        super().setUp()
+        limpiar_tokens()
+        self.client.force_authenticate(None)
+        self.token = Token.objects.create(user=self.user)
+        self.token_admin = Token.objects.create(user=self.admin)
+
+    def get(self, nombre, token=None):
+        return self.client.get(reverse(nombre), HTTP_AUTHORIZATION=f'Token {(token or self.token).key}')
+
+    def consultas_de_autenticacion(self, nombre='inventory:insumo-list', token=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get(nombre, token)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'authtoken_token' in q['sql'] or 'auth_user' in q['sql']]
+
+    def test_cache_caliente_sin_consultas(self):
+        self.assertEqual(len(self.consultas_de_autenticacion()), 1)
+        for _ in range(3):
+            # Catálogo y token en caché: ninguna consulta, tampoco de versiones
+            with self.assertNumQueries(0):
+                self.assertEqual(self.get('inventory:insumo-list').status_code, 200)
+
+    def test_cambios_de_otro_usuario_no_vacian_la_cache(self):
+        self.consultas_de_autenticacion()
+        self.admin.first_name = 'Otro'
+        self.admin.save()
+        self.assertEqual(self.consultas_de_autenticacion(), [])
+
+    def test_cache_caliente_sin_consultas_async(self):
+        self.get('inventory:insumo-list')
+        with override_settings(ROOT_URLCONF='gestinvlab_project.urls_asgi'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = async_to_sync(self.async_client.get)(
+                    reverse('inventory:insumo-list'), headers={'authorization': f'Token {self.token.key}'}
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'authtoken_token' in q['sql']])
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_ttl_vencido_vuelve_a_consultar(self):
+        self.consultas_de_autenticacion()
+        self.assertEqual(len(self.consultas_de_autenticacion()), 1)
+
+    @override_settings(TOKEN_CACHE_MAX=1)
+    def test_lru_acotado(self):
+        self.consultas_de_autenticacion()
+        self.consultas_de_autenticacion(token=self.token_admin)
+        self.assertEqual(len(self.consultas_de_autenticacion()), 1)
+
+    def desactivar(self, datos):
+        response = self.client.patch(
+            reverse('inventory:admin-usuario-detail', args=[self.user.id]), datos, format='json',
+            HTTP_AUTHORIZATION=f'Token {self.token_admin.key}',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_desactivar_usuario_invalida(self):
+        self.assertEqual(self.get('inventory:insumo-list').status_code, 200)
+        self.desactivar({'is_active': False})
+        self.assertEqual(self.get('inventory:insumo-list').status_code, 401)
+
+    def test_cambiar_is_staff_invalida(self):
+        self.assertEqual(self.get('inventory:admin-usuarios').status_code, 403)
+        self.desactivar({'is_staff': True})
+        self.assertEqual(self.get('inventory:admin-usuarios').status_code, 200)
+        self.desactivar({'is_staff': False})
+        self.assertEqual(self.get('inventory:admin-usuarios').status_code, 403)
+
+    def test_eliminar_token_invalida(self):
+        self.assertEqual(self.get('inventory:insumo-list').status_code, 200)
+        self.token.delete()
+        self.assertEqual(self.get('inventory:insumo-list').status_code, 401)
+
+    def test_revocacion_desde_otro_proceso(self):
+        self.assertEqual(self.get('inventory:insumo-list').status_code, 200)
+        # Otro proceso desactiva al usuario: este no recibe la señal, solo ve su versión nueva en la caché
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        invalidar_version(clave_usuario(self.user.pk))
+        self.assertEqual(self.get('inventory:insumo-list').status_code, 401)
+
+    def test_cada_peticion_recibe_su_copia(self):
+        autenticacion = CachedTokenAuthentication()
+        primero, _ = autenticacion.authenticate_credentials(self.token.key)
+        primero.is_staff = True
+        segundo, _ = autenticacion.authenticate_credentials(self.token.key)
+        self.assertIsNot(primero, segundo)
+        self.assertFalse(segundo.is_staff)
+
+
+class ImportarInsumosTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+        self.existente = self.crear_insumo('IMP-1', nombre='Nombre viejo', umbral=1)
+        Insumo.objects.filter(id=self.existente.id).update(stock_total=40)
+        self.url = reverse('inventory:admin-insumos-importar')
+
+    def importar(self, contenido, **params):
+        url = self.url + ('?' + '&'.join(f'{k}={v}' for k, v in params.items()) if params else '')
+        return self.client.generic('POST', url, contenido.encode('utf-8'), content_type='text/csv')
+
+    def test_upsert_con_informe_por_fila(self):
+        response = self.importar(
+            "codigo_producto;nombre;umbral_critico\n"
+            "IMP-1;Nombre nuevo;5\n"
+            "IMP-2;Guantes;\n"
+            ";Sin código;1\n"
+            "IMP-3;Umbral malo;-2\n"
+            "IMP-2;Repetido;1\n"
+            "IMP-4;\"Gasas; estériles\";3\n"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            (response.data['procesadas'], response.data['creados'], response.data['actualizados']), (6, 2, 1)
+        )
+        self.assertEqual([error['fila'] for error in response.data['errores']], [4, 5, 6])
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.nombre, self.existente.umbral_critico, self.existente.stock_total), ('Nombre nuevo', 5, 40))
+        self.assertEqual(Insumo.objects.get(codigo_producto='IMP-4').nombre, 'Gasas; estériles')
+
+    def test_solo_nuevos_informa_existentes(self):
+        response = self.importar("codigo_producto,nombre\nIMP-1,Otro\nIMP-9,Nuevo\n", solo_nuevos=1)
+        self.assertEqual((response.data['creados'], response.data['actualizados']), (1, 0))
+        self.assertEqual([error['fila'] for error in response.data['errores']], [2])
+        self.existente.refresh_from_db()
+        self.assertEqual(self.existente.nombre, 'Nombre viejo')
+
+    def test_multipart_y_columnas_faltantes(self):
+        archivo = SimpleUploadedFile('catalogo.csv', "codigo_producto,nombre\nIMP-5,Jeringas\n".encode('utf-8-sig'))
+        response = self.client.post(self.url, {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual(self.importar("codigo,nombre\nX,Y\n").status_code, 400)
+
+    def test_solo_admin(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.importar("codigo_producto,nombre\nIMP-6,X\n").status_code, 403)
+
+    def test_comando_por_lotes(self):
+        filas = "".join(f"CMD-{i},Insumo {i},{i}\n" for i in range(7))
+        ruta = os.path.join(self.directorio_temporal(), 'catalogo.csv')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write("codigo_producto,nombre,umbral_critico\n" + filas)
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('importar_insumos', ruta, tamano=3, stdout=StringIO())
+        self.assertEqual(Insumo.objects.filter(codigo_producto__startswith='CMD-').count(), 7)
+        # Una consulta de existentes y un INSERT por lote de 3 filas
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "inventory_insumo"')]), 3)
+
+    def directorio_temporal(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        return directorio.name
+
+
+class ArranqueTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:arranque')
+        self.crear_insumo('B-1', nombre='Matraz')
+        User.objects.create_user(username='inactivo', is_active=False)
+
+    def test_consultas_fijas_segun_tamano_de_catalogos(self):
+        for usuario in (self.user, self.admin):
+            self.client.force_authenticate(usuario)
+            cache.clear()
+            with CaptureQueriesContext(connection) as pocos:
+                self.client.get(self.url)
+            for i in range(20):
+                self.crear_insumo(f'B-{usuario.username}-{i}')
+                Servicio.objects.create(nombre=f'Servicio {usuario.username} {i}')
+            cache.clear()
+            with CaptureQueriesContext(connection) as muchos:
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(pocos), len(muchos))
+            # Insumos, servicios, usuarios y el token de sincronización
+            self.assertLessEqual(len(muchos), 4)
+
+    def test_segun_rol(self):
+        response = self.client.get(self.url)
+        self.assertEqual(set(response.data), {'insumos', 'servicios', 'usuarios', 'token'})
+        self.assertNotIn('inactivo', [usuario['username'] for usuario in response.data['usuarios']])
+        self.assertEqual(response.data['insumos'], self.client.get(reverse('inventory:insumo-list')).data)
+
+        # La respuesta de staff se guarda en caché aparte de la de un usuario normal
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url)
+        admin_usuarios = {usuario['username']: usuario for usuario in response.data['admin_usuarios']}
+        self.assertFalse(admin_usuarios['inactivo']['is_active'])
+        self.assertTrue(admin_usuarios['jefe']['is_staff'])
+        self.client.force_authenticate(self.user)
+        self.assertNotIn('admin_usuarios', self.client.get(self.url).data)
+
+    def test_invalida_con_los_catalogos(self):
+        self.client.get(self.url)
+        Servicio.objects.create(nombre='Pabellón')
+        self.assertIn('Pabellón', [servicio['nombre'] for servicio in self.client.get(self.url).data['servicios']])
+
+
+class CambiosTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:cambios')
+        # Los números de cambio se asignan al confirmar (on_commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.insumos = [self.crear_insumo(f'S-{i}') for i in range(5)]
+            self.registrar_entrada([{'insumo_id': insumo.id, 'numero_lote': 'L1', 'cantidad': 10} for insumo in self.insumos])
+
+    def test_solo_filas_modificadas(self):
+        completo = self.client.get(self.url).data
+        self.assertEqual(len(completo['insumos']), 5)
+        self.assertEqual(len(completo['lotes']), 5)
+
+        vacio = self.client.get(self.url, {'since': completo['token']}).data
+        self.assertEqual((vacio['insumos'], vacio['lotes']), ([], []))
+
+        # Una salida (UPDATE masivo de stock) marca solo su lote y su insumo
+        lote = Lote.objects.get(insumo=self.insumos[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.registrar_salida([{'lote': lote.id, 'cantidad': 4}]).status_code, 201)
+        with self.assertNumQueries(3):
+            cambios = self.client.get(self.url, {'since': vacio['token']}).data
+        self.assertEqual([(insumo['id'], insumo['stock_total']) for insumo in cambios['insumos']], [(self.insumos[2].id, 6)])
+        self.assertEqual([(lote['id'], lote['stock_por_lote']) for lote in cambios['lotes']], [(lote.id, 6)])
+
+    def test_token_de_arranque_y_edicion_admin(self):
+        token = self.client.get(reverse('inventory:arranque')).data['token']
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('inventory:admin-insumo-detail', args=[self.insumos[0].id]), {'umbral_critico': 3}, format='json')
+        cambios = self.client.get(self.url, {'since': token}).data
+        self.assertEqual([(insumo['id'], insumo['umbral_critico']) for insumo in cambios['insumos']], [(self.insumos[0].id, 3)])
+        self.assertEqual(cambios['lotes'], [])
+
+    def test_sello_posterior_al_token(self):
+        # Una importación larga: el cliente sincroniza antes de que se confirme
+        with self.captureOnCommitCallbacks() as sellos:
+            importar_insumos(['codigo_producto,nombre,umbral_critico', 'TARDE-1,Confirmado tarde,0'])
+        token = self.client.get(self.url).data['token']
+        for sello in sellos:
+            sello()
+        cambios = self.client.get(self.url, {'since': token}).data
+        self.assertEqual([insumo['codigo_producto'] for insumo in cambios['insumos']], ['TARDE-1'])
+
+    def test_pendientes_se_envian_siempre(self):
+        token = self.client.get(self.url).data['token']
+        # Confirmada sin número (p. ej. el proceso terminó antes del on_commit)
+        Lote.objects.filter(insumo=self.insumos[1]).update(cambio=None)
+        cambios = self.client.get(self.url, {'since': token}).data
+        self.assertEqual([lote['insumo'] for lote in cambios['lotes']], [self.insumos[1].id])
+        sellar_pendientes()
+        self.assertFalse(Lote.objects.filter(cambio__isnull=True).exists())
+        token = self.client.get(self.url).data['token']
+        self.assertEqual(self.client.get(self.url, {'since': token}).data['lotes'], [])
+
+    def test_token_invalido(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'ayer'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': '-1'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': str(10 ** 400)}).status_code, 400)
+
+
+class BusquedaInsumosTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('inventory:insumo-buscar')
+        self.crear_insumo('GU-100', nombre='Guantes de nitrilo')
+        self.crear_insumo('PI-200', nombre='Pipetas Pasteur')
+        self.crear_insumo('XX-1', nombre='Caja de puntas para pipetas')
+        self.crear_insumo('PIP-1', nombre='Bulbo')
+
+    def buscar(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [fila['codigo_producto'] for fila in response.data]
+
+    def test_codigo_luego_nombre_luego_subcadena(self):
+        # Código por prefijo (sin distinguir mayúsculas), luego nombre por prefijo, luego subcadena
+        self.assertEqual(self.buscar('pi'), ['PI-200', 'PIP-1', 'XX-1'])
+        self.assertEqual(self.buscar('pipeta'), ['PI-200', 'XX-1'])
+        self.assertEqual(self.buscar('nitrilo'), ['GU-100'])
+        self.assertEqual(set(self.client.get(self.url, {'q': 'gu'}).data[0]), {'id', 'nombre', 'codigo_producto'})
+        self.assertEqual(self.buscar(''), [])
+
+    def test_limite_y_codigos_en_memoria(self):
+        self.assertEqual(len(self.buscar('pi', limite=2)), 2)
+        self.buscar('pi')
+        # El índice de códigos ya está construido: si llena el límite no hay consultas
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buscar('pi', limite=2), ['PI-200', 'PIP-1'])
+        self.assertEqual(self.client.get(self.url, {'q': 'pi', 'limite': 'x'}).status_code, 400)
+
+    def test_indice_se_reconstruye_con_el_catalogo(self):
+        self.assertEqual(self.buscar('ZZ'), [])
+        self.crear_insumo('ZZ-9', nombre='Parafilm')
+        self.assertEqual(self.buscar('zz'), ['ZZ-9'])
+        importar_insumos(['codigo_producto,nombre,umbral_critico', 'ZZ-1,Gradilla,0'])
+        self.assertEqual(self.buscar('ZZ', limite=2), ['ZZ-1', 'ZZ-9'])
+
+    def test_indice_obsoleto_en_otro_proceso(self):
+        self.assertEqual(self.buscar('ZZ'), [])
+        # Otro proceso agrega el insumo: aquí no corre la señal, solo cambia la versión
+        Insumo.objects.bulk_create([Insumo(nombre='Parafilm', codigo_producto='ZZ-9', umbral_critico=0)])
+        invalidar_version(VERSION_CODIGOS_KEY)
+        self.assertEqual([fila['codigo_producto'] for fila in buscar_por_codigo('zz', 5)], ['ZZ-9'])
+
+
+class BenchmarkTests(APITestCase):
+
+    def test_todas_las_urls_dentro_de_su_presupuesto(self):
+        self.assertEqual(urls_sin_caso(), [])
+        volumen = {'insumos': 10, 'lotes_por_insumo': 2, 'movimientos': 40, 'detalles_por_movimiento': 2}
+        informe = ejecutar_benchmark(volumen, factor=3, repeticiones=0)
+        self.assertEqual(informe['infracciones'], [])
+        self.assertGreaterEqual(informe['volumenes'][1]['insumos'], 30)
+        self.assertEqual(
+            {(fila['metodo'], fila['endpoint']) for fila in informe['mediciones'][0]},
+            {(fila['metodo'], fila['endpoint']) for fila in informe['mediciones'][1]},
+        )
+
+    def test_datos_sinteticos_coherentes_con_el_ledger(self):
+        filas = sembrar(insumos=5, lotes_por_insumo=2, movimientos=60, semilla=1)
+        self.assertEqual(Lote.objects.count(), 10)
+        self.assertEqual(Detalle_Movimiento.objects.count(), filas['detalles'])
+        for lote in Lote.objects.all():
+            self.assertGreaterEqual(lote.stock_por_lote, 0)
+            self.assertEqual(stock_a_fecha(timezone.localdate(), lote_id=lote.id, usar_cortes=False)[1].get(lote.id, (None, 0))[1], lote.stock_por_lote)
+        self.assertEqual(
+            sum(Insumo.objects.values_list('stock_total', flat=True)),
+            sum(Lote.objects.values_list('stock_por_lote', flat=True)),
+        )
+        self.assertEqual(
+            ConsumoDiario.objects.aggregate(total=Sum('cantidad'))['total'],
+            Detalle_Movimiento.objects.aggregate(total=Sum('cantidad'))['total'],
+        )
+
+    def test_generar_datos_sinteticos_por_bloques(self):
+        salida = StringIO()
+        call_command(
+            'generar_datos_sinteticos', insumos=40, lotes_por_insumo=2, movimientos=400, servicios=8,
+            dias=30, semilla=3, tamano_lote=25, stdout=salida,
+        )
+        self.assertIn('400 movimientos', salida.getvalue())
+        self.assertEqual(Movimiento.objects.count(), 400)
+        self.assertEqual(Movimiento.objects.values('numero_documento').distinct().count(), 400)
+        self.assertFalse(Lote.objects.filter(stock_por_lote__lt=0).exists())
+        self.assertTrue(Movimiento.objects.filter(tipo_movimiento='Entrada').exists())
+        # Consumo sesgado: el servicio más activo recibe más que la media de los demás
+        por_servicio = sorted(
+            Movimiento.objects.filter(tipo_movimiento='Salida').values('servicio_destino')
+            .annotate(n=Count('id')).values_list('n', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(por_servicio[0], 2 * sum(por_servicio[1:]) / len(por_servicio[1:]))
+
+        with self.assertRaises(CommandError):
+            call_command('generar_datos_sinteticos', insumos=1, movimientos=1, stdout=StringIO())
+
+
+class MetricasTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        metricas.reiniciar()
+        self.insumo = self.crear_insumo('ME-1')
+
+    def serie(self, texto, nombre, ruta, metodo='GET'):
+        patron = rf'^{re.escape(nombre)}\{{route="{re.escape(ruta)}",method="{metodo}"(,status="\d+")?\}} (\S+)$'
+        return [float(valor) for _, valor in re.findall(patron, texto, re.MULTILINE)]
+
+    def test_metricas_por_ruta(self):
+        self.client.get(reverse('inventory:lote-list'), {'insumo_id': self.insumo.id})
+        response = self.client.get(reverse('inventory:lote-list'), {'insumo_id': self.insumo.id})
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="1 consultas"$')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        ruta = '/api/inventory/lotes/'
+        self.assertEqual(self.serie(texto, 'gestinvlab_http_request_duration_seconds_count', ruta), [2])
+        self.assertEqual(self.serie(texto, 'gestinvlab_http_requests_total', ruta), [2])
+        self.assertEqual(self.serie(texto, 'gestinvlab_db_queries_total', ruta), [2])
+        self.assertEqual(self.serie(texto, 'gestinvlab_http_response_size_bytes_total', ruta), [4])
+        self.assertIn(f'gestinvlab_http_request_duration_seconds_bucket{{route="{ruta}",method="GET",le="+Inf"}} 2', texto)
+
+        # Rutas con parámetros: una serie por patrón, no por id
+        self.client.force_authenticate(self.admin)
+        for umbral in (1, 2):
+            self.client.patch(reverse('inventory:admin-insumo-detail', args=[self.insumo.id]), {'umbral_critico': umbral}, format='json')
+        texto = self.client.get('/metrics').content.decode()
+        self.assertEqual(self.serie(texto, 'gestinvlab_http_requests_total', '/api/inventory/admin/insumos/<int:pk>/', 'PATCH'), [2])
+
+    def test_consultas_de_vistas_async(self):
+        with override_settings(ROOT_URLCONF='gestinvlab_project.urls_asgi'):
+            async_to_sync(self.async_client.get)(
+                reverse('inventory:lote-list'), {'insumo_id': self.insumo.id},
+                headers={'authorization': f'Token {Token.objects.create(user=self.user).key}'},
+            )
+        texto = metricas.exportar_prometheus()
+        # Autenticación por token (1) + lotes (1), ejecutadas con sync_to_async
+        self.assertEqual(self.serie(texto, 'gestinvlab_db_queries_total', '/api/inventory/lotes/'), [2])
+
+    @override_settings(SOLICITUD_LENTA_MS=0)
+    def test_registro_de_peticiones_lentas(self):
+        with self.assertLogs('inventory.lentas', level='WARNING') as registro:
+            self.client.get(reverse('inventory:insumo-list'))
+        self.assertIn('GET /api/inventory/insumos/ -> 200', registro.output[0])
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token_de_metricas(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+
+class CatalogoCacheTests(InventoryAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.insumo = self.crear_insumo('K-1', nombre='Pipetas')
+
+    def get(self, nombre_url, usuario=None, **headers):
+        self.client.force_authenticate(usuario or self.user)
+        return self.client.get(reverse(nombre_url), headers=headers)
+
+    def assertInvalida(self, nombre_url, accion, usuario=None):
+        """ La acción debe cambiar el ETag y la respuesta cacheada de nombre_url """
+        antes = self.get(nombre_url, usuario)
+        with self.assertNumQueries(0):
+            self.get(nombre_url, usuario)
+        self.client.force_authenticate(self.admin)
+        accion()
+        despues = self.get(nombre_url, usuario)
+        self.assertNotEqual(antes['ETag'], despues['ETag'])
+        self.assertNotEqual(antes.data, despues.data)
+
+    def test_respuesta_cacheada_y_304(self):
+        primera = self.get('inventory:insumo-list')
+        with self.assertNumQueries(0):
+            segunda = self.get('inventory:insumo-list', If_None_Match=primera['ETag'])
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+
+    def test_admin_crear_insumo(self):
+        self.assertInvalida('inventory:insumo-list', lambda: self.client.post(
+            reverse('inventory:admin-insumos'), {'nombre': 'Nuevo', 'codigo_producto': 'K-2', 'umbral_critico': 1}, format='json'))
+
+    def test_admin_actualizar_umbral(self):
+        self.assertInvalida('inventory:admin-insumos', lambda: self.client.patch(
+            reverse('inventory:admin-insumo-detail', args=[self.insumo.id]), {'umbral_critico': 9}, format='json'),
+            usuario=self.admin)
+
+    def test_admin_crear_servicio(self):
+        self.assertInvalida('inventory:servicio-list', lambda: self.client.post(
+            reverse('inventory:admin-servicios'), {'nombre': 'Pediatría'}, format='json'))
+
+    def test_admin_crear_usuario(self):
+        self.assertInvalida('inventory:user-list', lambda: self.client.post(
+            reverse('inventory:admin-usuarios'), {'username': 'nuevo', 'password': 'clave-segura-123'}, format='json'))
+
+    def test_admin_desactivar_usuario(self):
+        self.assertInvalida('inventory:user-list', lambda: self.client.patch(
+            reverse('inventory:admin-usuario-detail', args=[self.user.id]), {'is_active': False}, format='json'))
+
+    def test_entrada(self):
+        self.assertInvalida('inventory:insumo-list', lambda: self.registrar_entrada(
+            [{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 3}]))
+
+    def test_salida(self):
+        self.registrar_entrada([{'insumo_id': self.insumo.id, 'numero_lote': 'L1', 'cantidad': 3}])
+        self.assertInvalida('inventory:insumo-list', lambda: self.registrar_salida(
+            [{'insumo_id': self.insumo.id, 'cantidad': 1}]))
+
+    def test_varios_procesos_exigen_cache_compartida(self):
+        with override_settings(WEB_CONCURRENCY=4):
+            self.assertEqual([error.id for error in cache_compartida(None)], ['inventory.E001'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+                self.assertEqual(cache_compartida(None), [])
+        self.assertEqual(cache_compartida(None), [])
@@ -6,9 +6,12 @@ app_name = 'inventory'
 urlpatterns = [
     # --- Endpoints de LECTURA (GET) ---
     path('insumos/', views.InsumoListView.as_view(), name='insumo-list'),
+    path('insumos/buscar/', views.InsumoBusquedaView.as_view(), name='insumo-buscar'),
     path('servicios/', views.ServicioListView.as_view(), name='servicio-list'),
     path('lotes/', views.LoteListView.as_view(), name='lote-list'),
     path('usuarios/', views.UserListView.as_view(), name='user-list'),
+    path('arranque/', views.ArranqueView.as_view(), name='arranque'),
+    path('changes/', views.CambiosView.as_view(), name='cambios'),
     
     # --- Endpoints de ESCRITURA (POST) ---
     path('movimientos/', views.MovimientoCreateView.as_view(), name='movimiento-create'), # Para Salidas
@@ -16,10 +19,16 @@ urlpatterns = [
     
     # --- Endpoint de REPORTES ---
     path('reportes/movimientos/', views.ReporteMovimientosView.as_view(), name='reporte-movimientos'),
+    path('reportes/movimientos/agrupado/', views.ReporteAgrupadoView.as_view(), name='reporte-movimientos-agrupado'),
+    path('reportes/movimientos/exportar/', views.ExportarMovimientosView.as_view(), name='reporte-movimientos-exportar'),
+    path('reportes/consumo/', views.ConsumoResumenView.as_view(), name='reporte-consumo'),
+    path('reportes/stock-historico/', views.StockHistoricoView.as_view(), name='reporte-stock-historico'),
+    path('alertas/', views.AlertasView.as_view(), name='alertas'),
 
     # --- ¡NUEVAS RUTAS DE ADMIN! ---
     path('admin/insumos/', views.AdminInsumoView.as_view(), name='admin-insumos'),
     path('admin/servicios/', views.AdminServicioView.as_view(), name='admin-servicios'),
+    path('admin/insumos/importar/', views.AdminInsumoImportarView.as_view(), name='admin-insumos-importar'),
     path('admin/insumos/<int:pk>/', views.AdminInsumoDetailView.as_view(), name='admin-insumo-detail'),
     path('admin/servicios/', views.AdminServicioView.as_view(), name='admin-servicios'),
     path('admin/usuarios/', views.AdminUserView.as_view(), name='admin-usuarios'),
@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views_async
+
+# Rutas que bajo ASGI atienden las vistas async (ver gestinvlab_project/urls_asgi.py).
+# Mismas URLs y nombres que en urls.py.
+app_name = 'inventory'
+
+urlpatterns = [
+    path('insumos/', views_async.insumo_list, name='insumo-list'),
+    path('servicios/', views_async.servicio_list, name='servicio-list'),
+    path('lotes/', views_async.lote_list, name='lote-list'),
+    path('reportes/movimientos/', views_async.reporte_movimientos, name='reporte-movimientos'),
+]
@@ -1,30 +1,61 @@
-from django.db import transaction
-from django.db.models import F
+import codecs
+import csv
+import heapq
+import json
+from datetime import timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, DateField, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek, TruncYear
 from django.utils.dateparse import parse_date 
-from django.utils import timezone
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated, IsAdminUser 
-import traceback 
+import logging
 from django.contrib.auth.models import User 
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from .models import User, Insumo, Servicio, Lote, Movimiento, Detalle_Movimiento
+from . import lectura_rapida
+from .archivo import tablas_para
+from .alertas import calcular_alertas, leer_snapshot, ultima_generacion
+from .busqueda import buscar_insumos
+from .cache import respuesta_catalogo
+from .historico import inicio_del_dia, stock_a_fecha
+from .importacion import importar_insumos
+from .metricas import exportar_prometheus
+from .models import User, Insumo, Lote, Movimiento, ConsumoDiario
+from .pagination import MovimientoKeysetPagination
+from .renderers import RENDERERS_LECTURA_RAPIDA
+from .sincronizacion import cambios_desde, token_actual
 from .serializers import (
     InsumoSerializer, 
     ServicioSerializer, 
-    LoteSerializer, 
     MovimientoCreateSerializer,
     ReporteMovimientoSerializer,
     EntradaCreateSerializer,
     UserSerializer,
+    UserAdminSerializer,
     InsumoCreateAdminSerializer,
     InsumoUpdateAdminSerializer,
     UserCreateAdminSerializer,
     UserUpdateAdminSerializer
 )
 
+logger = logging.getLogger(__name__)
+
+
+def movimiento_para_respuesta(movimiento):
+    """ Recarga el movimiento con sus relaciones para serializarlo sin N+1 """
+    return (
+        Movimiento.objects
+        .select_related('usuario', 'servicio_destino')
+        .prefetch_related('detalles__lote__insumo')
+        .get(id=movimiento.id)
+    )
+
 # =============================================
 # Vista para crear Movimientos (SALIDA)
 # =============================================
@@ -36,7 +67,7 @@ class MovimientoCreateView(APIView):
         
         if serializer.is_valid():
             movimiento = serializer.save()
-            serializer_respuesta = ReporteMovimientoSerializer(movimiento)
+            serializer_respuesta = ReporteMovimientoSerializer(movimiento_para_respuesta(movimiento))
             return Response(serializer_respuesta.data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -47,20 +78,39 @@ class MovimientoCreateView(APIView):
 
 class InsumoListView(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
+    def get(self, request, *args, **kwargs):
+        return respuesta_catalogo(request, lectura_rapida.insumos)
+
+class InsumoBusquedaView(APIView):
+    """
+    Autocompletado de insumos por nombre o código (prefijo y subcadena).
+    Endpoint: /api/inventory/insumos/buscar/?q=<texto>&limite=20
+    Devuelve solo id, nombre y codigo_producto (sin stock), como máximo 'limite' (hasta 50).
+    """
+    permission_classes = [IsAuthenticated]
+    LIMITE = 20
+    LIMITE_MAXIMO = 50
+
     def get(self, request, *args, **kwargs):
-        insumos = Insumo.objects.all().order_by('nombre')
-        serializer = InsumoSerializer(insumos, many=True)
-        return Response(serializer.data)
+        texto = request.query_params.get('q', '').strip()
+        try:
+            limite = min(int(request.query_params.get('limite', self.LIMITE)), self.LIMITE_MAXIMO)
+        except ValueError:
+            return Response({"error": "'limite' debe ser un número."}, status=status.HTTP_400_BAD_REQUEST)
+        if not texto or limite < 1:
+            return Response([])
+        return Response(buscar_insumos(texto, limite))
 
 class ServicioListView(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
     def get(self, request, *args, **kwargs):
-        servicios = Servicio.objects.all().order_by('nombre')
-        serializer = ServicioSerializer(servicios, many=True)
-        return Response(serializer.data)
+        return respuesta_catalogo(request, lectura_rapida.servicios)
 
 class LoteListView(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
     def get(self, request, *args, **kwargs):
         insumo_id = request.query_params.get('insumo_id', None)
         if not insumo_id:
@@ -68,9 +118,7 @@ class LoteListView(APIView):
                 {"error": "Se requiere el parámetro 'insumo_id'."}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        lotes = Lote.objects.filter(insumo_id=insumo_id, stock_por_lote__gt=0).order_by('fecha_caducidad')
-        serializer = LoteSerializer(lotes, many=True)
-        return Response(serializer.data)
+        return Response(lectura_rapida.lotes(insumo_id))
 
 # =============================================
 # Vistas para Filtros de Reportes
@@ -79,43 +127,483 @@ class UserListView(generics.ListAPIView):
     queryset = User.objects.filter(is_active=True).order_by('username')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
+
+    def list(self, request, *args, **kwargs):
+        return respuesta_catalogo(request, lambda: lectura_rapida.usuarios(self.get_queryset()))
+
+
+class ArranqueView(APIView):
+    """
+    Todos los catálogos que la interfaz necesita al iniciar, en una sola respuesta.
+    Endpoint: /api/inventory/arranque/
+    Devuelve insumos, servicios y usuarios activos (para los selects y la tabla de stock);
+    a los usuarios staff además admin_usuarios (todos, con rol y estado).
+    Tres consultas en total, sin importar el tamaño de los catálogos.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
+
+    def get(self, request, *args, **kwargs):
+        es_staff = request.user.is_staff
+
+        def construir():
+            # Punto de partida para changes/?since=: leído antes que los datos,
+            # un cambio confirmado mientras tanto llega en la siguiente sincronización
+            token = token_actual()
+            if es_staff:
+                admin_usuarios = lectura_rapida.usuarios(User.objects.all(), lectura_rapida.CAMPOS_USUARIO_ADMIN)
+                usuarios = [
+                    {campo: usuario[campo] for campo in lectura_rapida.CAMPOS_USUARIO}
+                    for usuario in admin_usuarios if usuario['is_active']
+                ]
+            else:
+                usuarios = lectura_rapida.usuarios()
+            data = {
+                'insumos': lectura_rapida.insumos(),
+                'servicios': lectura_rapida.servicios(),
+                'usuarios': usuarios,
+                'token': token,
+            }
+            if es_staff:
+                data['admin_usuarios'] = admin_usuarios
+            return data
+        return respuesta_catalogo(request, construir, variante='staff' if es_staff else 'usuario')
+
+
+class CambiosView(APIView):
+    """
+    Insumos y lotes modificados desde la última sincronización del cliente.
+    Endpoint: /api/inventory/changes/?since=<token>
+    Sin 'since' devuelve todo. El 'token' de la respuesta es el 'since' de la siguiente llamada.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return Response(cambios_desde(request.query_params.get('since') or None))
+        except ValueError:
+            return Response(
+                {"error": "El parámetro 'since' no es un token válido."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+def _filtros_de_reporte(query_params, prefijo=''):
+    """
+    Q con los filtros de reportes sobre los campos de Movimiento (fecha_inicio,
+    fecha_fin, tipo_movimiento, servicio_id, usuario_id). 'prefijo' es el
+    camino hasta Movimiento cuando se filtra otro modelo (p. ej. 'movimiento__').
+    """
+    fecha_inicio = query_params.get('fecha_inicio', None)
+    fecha_fin = query_params.get('fecha_fin', None)
+    tipo_mov = query_params.get('tipo_movimiento', None)
+    servicio_id = query_params.get('servicio_id', None)
+    usuario_id = query_params.get('usuario_id', None)
+
+    filtros = Q()
+    # Rangos semiabiertos [inicio 00:00, fin+1 00:00) sobre la columna sin DATE(),
+    # para que la base de datos pueda usar los índices de fecha_registro
+    if fecha_inicio:
+        fecha_inicio_obj = parse_date(fecha_inicio)
+        if fecha_inicio_obj:
+            filtros &= Q(**{f'{prefijo}fecha_registro__gte': inicio_del_dia(fecha_inicio_obj)})
+    if fecha_fin:
+        fecha_fin_obj = parse_date(fecha_fin)
+        if fecha_fin_obj:
+            filtros &= Q(**{f'{prefijo}fecha_registro__lt': inicio_del_dia(fecha_fin_obj + timedelta(days=1))})
+    if tipo_mov in ['Entrada', 'Salida']:
+        filtros &= Q(**{f'{prefijo}tipo_movimiento': tipo_mov})
+    if servicio_id:
+        filtros &= Q(**{f'{prefijo}servicio_destino_id': servicio_id})
+    if usuario_id:
+        filtros &= Q(**{f'{prefijo}usuario_id': usuario_id})
+    return filtros
+
+
+def inicio_de_reporte(query_params):
+    """ Comienzo del rango de un reporte (None sin fecha_inicio válida) """
+    fecha_inicio = parse_date(query_params.get('fecha_inicio', '') or '')
+    return inicio_del_dia(fecha_inicio) if fecha_inicio else None
+
+
+def tablas_de_reporte(query_params):
+    """
+    Tablas (vivas y, si fecha_inicio cae antes del límite del archivo o no se
+    indica, archivadas) donde buscar los movimientos del reporte. Ver archivo.py.
+    """
+    return tablas_para(inicio_de_reporte(query_params))
+
+
+def filtrar_movimientos(queryset, query_params):
+    """
+    Aplica los filtros de reportes (fecha_inicio, fecha_fin, tipo_movimiento,
+    insumo_id, servicio_id, usuario_id) a un queryset de Movimiento (o de MovimientoArchivado).
+    """
+    queryset = queryset.filter(_filtros_de_reporte(query_params))
+    insumo_id = query_params.get('insumo_id', None)
+    if insumo_id:
+        # EXISTS en vez de JOIN + DISTINCT: no duplica filas ni obliga a ordenarlas
+        detalles = queryset.model._meta.get_field('detalles').related_model
+        queryset = queryset.filter(Exists(
+            detalles.objects.filter(movimiento=OuterRef('pk'), lote__insumo_id=insumo_id)
+        ))
+    return queryset
+
+
+def filtrar_detalles(queryset, query_params):
+    """
+    Los mismos filtros sobre un queryset de Detalle_Movimiento (o de DetalleMovimientoArchivado). Aquí insumo_id
+    deja solo las líneas de ese insumo, no los movimientos completos que lo incluyen.
+    """
+    queryset = queryset.filter(_filtros_de_reporte(query_params, prefijo='movimiento__'))
+    insumo_id = query_params.get('insumo_id', None)
+    if insumo_id:
+        queryset = queryset.filter(lote__insumo_id=insumo_id)
+    return queryset
+
 
 class ReporteMovimientosView(APIView):
+    """
+    Reporte de movimientos paginado por cursor.
+    Devuelve {"next_cursor": <token o null>, "results": [...]};
+    para la página siguiente se repiten los filtros con ?cursor=<token>.
+    Incluye los movimientos archivados cuando el rango de fechas llega a ellos.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
+    pagination_class = MovimientoKeysetPagination
+
     def get(self, request, *args, **kwargs):
-        queryset = Movimiento.objects.all().prefetch_related(
-            'detalles__lote__insumo', 
-            'usuario', 
-            'servicio_destino'
-        ).order_by('-fecha_registro')
-        
-        
-        fecha_inicio = request.query_params.get('fecha_inicio', None)
-        fecha_fin = request.query_params.get('fecha_fin', None)
-        tipo_mov = request.query_params.get('tipo_movimiento', None)
-        insumo_id = request.query_params.get('insumo_id', None)
-        servicio_id = request.query_params.get('servicio_id', None)
-        usuario_id = request.query_params.get('usuario_id', None)
-        
+        # Filas planas en vez de ReporteMovimientoSerializer: mismo JSON (ver lectura_rapida.py)
+        querysets = [
+            lectura_rapida.movimientos_reporte(filtrar_movimientos(movimientos.objects.all(), request.query_params))
+            for movimientos, _ in tablas_de_reporte(request.query_params)
+        ]
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_querysets(querysets, request)
+        return paginator.get_paginated_response(lectura_rapida.reporte(page))
+
+class ConsumoResumenView(APIView):
+    """
+    Resumen de consumo por periodo, insumo y servicio, leído solo de ConsumoDiario.
+    Endpoint: /api/inventory/reportes/consumo/
+    Filtros: fecha_inicio, fecha_fin, insumo_id, servicio_id,
+    tipo_movimiento (por defecto 'Salida') y periodo = dia | mes | anio (por defecto 'mes').
+    """
+    permission_classes = [IsAuthenticated]
+    periodos = {'dia': TruncDay, 'mes': TruncMonth, 'anio': TruncYear}
+
+    def get(self, request, *args, **kwargs):
+        periodo = request.query_params.get('periodo', 'mes')
+        if periodo not in self.periodos:
+            return Response(
+                {"error": "El parámetro 'periodo' debe ser 'dia', 'mes' o 'anio'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = ConsumoDiario.objects.filter(
+            tipo_movimiento=request.query_params.get('tipo_movimiento', 'Salida')
+        )
+        fecha_inicio = parse_date(request.query_params.get('fecha_inicio', '') or '')
+        fecha_fin = parse_date(request.query_params.get('fecha_fin', '') or '')
         if fecha_inicio:
-            fecha_inicio_obj = parse_date(fecha_inicio)
-            if fecha_inicio_obj:
-                queryset = queryset.filter(fecha_registro__date__gte=fecha_inicio_obj)
+            queryset = queryset.filter(fecha__gte=fecha_inicio)
         if fecha_fin:
-            fecha_fin_obj = parse_date(fecha_fin)
-            if fecha_fin_obj:
-                queryset = queryset.filter(fecha_registro__date__lte=fecha_fin_obj)
-        if tipo_mov in ['Entrada', 'Salida']:
-            queryset = queryset.filter(tipo_movimiento=tipo_mov)
-        if insumo_id:
-            queryset = queryset.filter(detalles__lote__insumo_id=insumo_id).distinct()
-        if servicio_id:
-            queryset = queryset.filter(servicio_destino_id=servicio_id)
-        if usuario_id:
-            queryset = queryset.filter(usuario_id=usuario_id)
-        
-        serializer = ReporteMovimientoSerializer(queryset, many=True)
-        return Response(serializer.data)
+            queryset = queryset.filter(fecha__lte=fecha_fin)
+        if request.query_params.get('insumo_id'):
+            queryset = queryset.filter(insumo_id=request.query_params['insumo_id'])
+        if request.query_params.get('servicio_id'):
+            queryset = queryset.filter(servicio_id=request.query_params['servicio_id'])
+
+        filas = (
+            queryset
+            .annotate(periodo=self.periodos[periodo]('fecha'))
+            .values('periodo', 'insumo_id', 'servicio_id', 'tipo_movimiento')
+            .annotate(
+                insumo_nombre=F('insumo__nombre'),
+                insumo_codigo=F('insumo__codigo_producto'),
+                servicio=F('servicio__nombre'),
+                cantidad=Sum('cantidad'),
+            )
+            .order_by('periodo', 'insumo_nombre', 'servicio')
+        )
+        return Response(list(filas))
+
+
+class ReporteAgrupadoView(APIView):
+    """
+    Cantidades de los movimientos sumadas en la base de datos (GROUP BY), en vez
+    de descargar los movimientos y sumarlos a mano.
+    Endpoint: /api/inventory/reportes/movimientos/agrupado/?group_by=insumo
+    group_by = insumo | servicio | usuario | day | week | month. Acepta los mismos
+    filtros que el reporte de movimientos; insumo_id suma solo las líneas de ese insumo.
+    Devuelve por grupo las unidades que entraron y salieron y el número de líneas,
+    hasta 'limite' grupos (por defecto 500): los periodos en orden cronológico y
+    los demás de mayor a menor salida. 'truncado' indica si quedaron grupos fuera.
+    Si el rango llega al historial archivado, cada tabla se agrupa por su lado y
+    los grupos se suman y ordenan aquí.
+    """
+    permission_classes = [IsAuthenticated]
+    LIMITE = 500
+    LIMITE_MAXIMO = 5000
+    # group_by -> (columnas del grupo, orden)
+    agrupaciones = {
+        'insumo': (
+            {'insumo_id': F('lote__insumo_id'), 'insumo_nombre': F('lote__insumo__nombre'),
+             'insumo_codigo': F('lote__insumo__codigo_producto')},
+            ('-cantidad_salidas', '-cantidad_entradas', 'insumo_nombre'),
+        ),
+        'servicio': (
+            {'servicio_id': F('movimiento__servicio_destino_id'), 'servicio': F('movimiento__servicio_destino__nombre')},
+            ('-cantidad_salidas', '-cantidad_entradas', 'servicio'),
+        ),
+        'usuario': (
+            {'usuario_id': F('movimiento__usuario_id'), 'usuario': F('movimiento__usuario__username')},
+            ('-cantidad_salidas', '-cantidad_entradas', 'usuario'),
+        ),
+        'day': ({'periodo': TruncDay('movimiento__fecha_registro', output_field=DateField())}, ('periodo',)),
+        'week': ({'periodo': TruncWeek('movimiento__fecha_registro', output_field=DateField())}, ('periodo',)),
+        'month': ({'periodo': TruncMonth('movimiento__fecha_registro', output_field=DateField())}, ('periodo',)),
+    }
+
+    def get(self, request, *args, **kwargs):
+        group_by = request.query_params.get('group_by', '')
+        if group_by not in self.agrupaciones:
+            return Response(
+                {"error": f"El parámetro 'group_by' debe ser uno de: {', '.join(self.agrupaciones)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limite = int(request.query_params.get('limite', self.LIMITE))
+        except ValueError:
+            limite = 0
+        if not 1 <= limite <= self.LIMITE_MAXIMO:
+            return Response(
+                {"error": f"El parámetro 'limite' debe ser un entero entre 1 y {self.LIMITE_MAXIMO}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        columnas, orden = self.agrupaciones[group_by]
+        consultas = [
+            filtrar_detalles(detalles.objects.all(), request.query_params)
+            .values(**columnas)
+            .annotate(
+                cantidad_entradas=Coalesce(Sum('cantidad', filter=Q(movimiento__tipo_movimiento='Entrada')), 0),
+                cantidad_salidas=Coalesce(Sum('cantidad', filter=Q(movimiento__tipo_movimiento='Salida')), 0),
+                lineas=Count('id'),
+            )
+            for _, detalles in tablas_de_reporte(request.query_params)
+        ]
+        if len(consultas) == 1:
+            filas = list(consultas[0].order_by(*orden)[:limite + 1])
+        else:
+            filas = self.ordenar(self.sumar(consultas, columnas), orden)[:limite + 1]
+        return Response({
+            'group_by': group_by,
+            'truncado': len(filas) > limite,
+            'results': filas[:limite],
+        })
+
+    def sumar(self, consultas, columnas):
+        """ Suma los grupos con la misma clave que aparecen en más de una consulta """
+        grupos = {}
+        for consulta in consultas:
+            for fila in consulta.order_by():
+                clave = tuple(fila[columna] for columna in columnas)
+                if clave in grupos:
+                    for campo in ('cantidad_entradas', 'cantidad_salidas', 'lineas'):
+                        grupos[clave][campo] += fila[campo]
+                else:
+                    grupos[clave] = fila
+        return list(grupos.values())
+
+    def ordenar(self, filas, orden):
+        """ order_by(*orden) en Python; los nulos primero en orden ascendente, como en la base de datos """
+        for campo in reversed(orden):
+            descendente = campo.startswith('-')
+            campo = campo.lstrip('-')
+            filas.sort(key=lambda fila: (fila[campo] is not None, fila[campo]), reverse=descendente)
+        return filas
+
+
+class StockHistoricoView(APIView):
+    """
+    Stock por lote y por insumo al cierre de un día pasado, reconstruido desde el ledger.
+    Endpoint: /api/inventory/reportes/stock-historico/?fecha=AAAA-MM-DD
+    Filtros opcionales: insumo_id, lote_id. Parte del corte mensual más cercano
+    (ver construir_cortes_stock); con ?completo=1 reproduce el ledger completo.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        fecha = parse_date(request.query_params.get('fecha', '') or '')
+        if fecha is None:
+            return Response({"error": "El parámetro 'fecha' (AAAA-MM-DD) es obligatorio."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            insumo_id = int(request.query_params['insumo_id']) if request.query_params.get('insumo_id') else None
+            lote_id = int(request.query_params['lote_id']) if request.query_params.get('lote_id') else None
+        except ValueError:
+            return Response({"error": "insumo_id y lote_id deben ser enteros."}, status=status.HTTP_400_BAD_REQUEST)
+
+        corte, stock = stock_a_fecha(
+            fecha, insumo_id=insumo_id, lote_id=lote_id,
+            usar_cortes=request.query_params.get('completo') not in ('1', 'true'),
+        )
+
+        lotes = {
+            lote['id']: lote
+            for lote in Lote.objects.filter(id__in=stock).values('id', 'numero_lote', 'insumo__nombre', 'insumo__codigo_producto')
+        }
+        por_insumo = {}
+        for lote_id, (insumo_id, cantidad) in stock.items():
+            lote = lotes[lote_id]
+            fila = por_insumo.setdefault(insumo_id, {
+                'insumo_id': insumo_id,
+                'insumo_nombre': lote['insumo__nombre'],
+                'insumo_codigo': lote['insumo__codigo_producto'],
+                'stock': 0,
+            })
+            fila['stock'] += cantidad
+
+        return Response({
+            'fecha': fecha,
+            'corte': corte.fecha if corte else None,
+            'insumos': sorted(por_insumo.values(), key=lambda fila: (fila['insumo_nombre'], fila['insumo_id'])),
+            'lotes': sorted(
+                (
+                    {
+                        'lote_id': lote_id,
+                        'numero_lote': lotes[lote_id]['numero_lote'],
+                        'insumo_id': insumo_id,
+                        'stock': cantidad,
+                    }
+                    for lote_id, (insumo_id, cantidad) in stock.items()
+                ),
+                key=lambda fila: (fila['insumo_id'], fila['lote_id']),
+            ),
+        })
+
+class AlertasView(APIView):
+    """
+    Alertas de stock crítico y lotes por vencer.
+    Endpoint: /api/inventory/alertas/
+    Devuelve la última foto guardada por 'manage.py generar_alertas' (404 si aún
+    no se generó ninguna). Con ?en_vivo=1, o si ?dias= pide otra ventana de
+    caducidad que la de la foto, las calcula al momento ('dias' por defecto 30).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            dias = int(request.query_params.get('dias', 30))
+        except ValueError:
+            return Response({"error": "El parámetro 'dias' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('en_vivo') in ('1', 'true'):
+            return Response(calcular_alertas(dias))
+        generacion = ultima_generacion()
+        if generacion is None:
+            return Response(
+                {"error": "Aún no hay alertas generadas: ejecute 'manage.py generar_alertas' o use ?en_vivo=1."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        if 'dias' in request.query_params and dias != generacion.dias_aviso:
+            return Response(calcular_alertas(dias))
+        return Response(leer_snapshot(generacion))
+
+
+class _Echo:
+    """ Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla """
+    def write(self, value):
+        return value
+
+
+class ExportarMovimientosView(APIView):
+    """
+    Exporta el reporte de movimientos en streaming, una fila por Detalle_Movimiento.
+    Endpoint: /api/inventory/reportes/movimientos/exportar/?formato=csv|ndjson
+    Acepta los mismos filtros que ReporteMovimientosView; si el rango llega al
+    historial archivado, mezcla en orden las filas de las dos tablas.
+    """
+    permission_classes = [IsAuthenticated]
+    chunk_size = 2000
+    columnas = [
+        ('fecha', 'movimiento__fecha_registro', "Fecha"),
+        ('documento', 'movimiento__numero_documento', "Documento"),
+        ('tipo', 'movimiento__tipo_movimiento', "Tipo"),
+        ('insumo_codigo', 'lote__insumo__codigo_producto', "Código"),
+        ('insumo', 'lote__insumo__nombre', "Insumo"),
+        ('lote', 'lote__numero_lote', "Lote"),
+        ('cantidad', 'cantidad', "Cantidad"),
+        ('destino', 'movimiento__servicio_destino__nombre', "Destino"),
+        ('usuario', 'movimiento__usuario__username', "Usuario"),
+    ]
+
+    def get(self, request, *args, **kwargs):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'ndjson'):
+            return Response(
+                {"error": "El parámetro 'formato' debe ser 'csv' o 'ndjson'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        campos = [campo for _, campo, _ in self.columnas]
+        consultas = [
+            self.por_bloques(
+                detalles.objects
+                .filter(movimiento__in=filtrar_movimientos(movimientos.objects.all(), request.query_params).order_by().values('id'))
+                .values_list(*campos, 'movimiento_id', 'id')
+            )
+            for movimientos, detalles in tablas_de_reporte(request.query_params)
+        ]
+        if len(consultas) > 1:
+            # Mismo orden que el ORDER BY de cada consulta: (fecha, movimiento) descendente, detalle ascendente
+            consultas = [heapq.merge(*consultas, key=lambda fila: (fila[0], fila[-2], -fila[-1]), reverse=True)]
+        filas = (fila[:len(campos)] for fila in consultas[0])
+
+        if formato == 'csv':
+            contenido, content_type = self.filas_csv(filas), 'text/csv; charset=utf-8'
+        else:
+            contenido, content_type = self.filas_ndjson(filas), 'application/x-ndjson'
+
+        response = StreamingHttpResponse(contenido, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="reporte_inventario.{formato}"'
+        return response
+
+    def por_bloques(self, queryset):
+        """
+        Filas (fecha, ..., movimiento_id, detalle_id) en orden de exportación, en
+        consultas de chunk_size filas con keyset sobre (fecha, movimiento, detalle).
+        No se usa .iterator(): con PyMySQL no hay streaming y el driver cargaría
+        el resultado completo; así la memoria no depende del número de filas.
+        """
+        queryset = queryset.order_by('-movimiento__fecha_registro', '-movimiento_id', 'id')
+        bloque = queryset
+        while True:
+            filas = list(bloque[:self.chunk_size])
+            yield from filas
+            if len(filas) < self.chunk_size:
+                return
+            fecha, *_, movimiento_id, detalle_id = filas[-1]
+            bloque = queryset.filter(
+                Q(movimiento__fecha_registro__lt=fecha)
+                | Q(movimiento__fecha_registro=fecha, movimiento_id__lt=movimiento_id)
+                | Q(movimiento_id=movimiento_id, id__gt=detalle_id)
+            )
+
+    def filas_csv(self, filas):
+        writer = csv.writer(_Echo())
+        yield writer.writerow([titulo for _, _, titulo in self.columnas])
+        for fila in filas:
+            fecha, *resto = fila
+            yield writer.writerow([fecha.isoformat(), *resto])
+
+    def filas_ndjson(self, filas):
+        claves = [clave for clave, _, _ in self.columnas]
+        for fila in filas:
+            yield json.dumps(dict(zip(claves, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
 
 # =============================================
 # Vista para MÓDULO DE ENTRADA
@@ -123,56 +611,21 @@ class ReporteMovimientosView(APIView):
 class EntradaCreateView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request, *args, **kwargs):
-        serializer = EntradaCreateSerializer(data=request.data)
+        serializer = EntradaCreateSerializer(data=request.data, context={'request': request})
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        validated_data = serializer.validated_data
-        detalles_data = validated_data.pop('detalles')
-        
         try:
-            with transaction.atomic():
-                movimiento = Movimiento.objects.create(
-                    usuario=request.user,
-                    tipo_movimiento='Entrada'
-                )
-                current_year = timezone.now().year
-                movimiento.numero_documento = f"ENT-{current_year}-{movimiento.id:05d}"
-                movimiento.save(update_fields=['numero_documento'])
-
-                for detalle in detalles_data:
-                    insumo_id = detalle['insumo_id']
-                    numero_lote = detalle['numero_lote']
-                    
-                    lote_obj, created = Lote.objects.get_or_create(
-                        insumo_id=insumo_id,
-                        numero_lote=numero_lote,
-                        defaults={'fecha_caducidad': detalle.get('fecha_caducidad')}
-                    )
-                    
-                    if not created and detalle.get('fecha_caducidad'):
-                        lote_obj.fecha_caducidad = detalle.get('fecha_caducidad')
-                        lote_obj.save()
-
-                    Detalle_Movimiento.objects.create(
-                        movimiento=movimiento,
-                        lote=lote_obj,
-                        cantidad=detalle['cantidad']
-                    )
-                    
-                    Lote.objects.filter(id=lote_obj.id).update(
-                        stock_por_lote=F('stock_por_lote') + detalle['cantidad']
-                    )
+            movimiento = serializer.save()
             
         except Exception as e:
-            print("¡¡¡ERROR INTERNO EN ENTRADACREATEVIEW!!!")
-            traceback.print_exc() 
+            logger.exception("Error interno al registrar una entrada")
             return Response(
                 {"error": f"Error interno del servidor (views.py): {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        serializer_respuesta = ReporteMovimientoSerializer(movimiento)
+        serializer_respuesta = ReporteMovimientoSerializer(movimiento_para_respuesta(movimiento))
         return Response(serializer_respuesta.data, status=status.HTTP_201_CREATED)
 
 # =============================================
@@ -185,12 +638,11 @@ class AdminInsumoView(APIView):
     Endpoint: /api/inventory/admin/insumos/
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
 
     def get(self, request, *args, **kwargs):
         """ Devuelve la lista de insumos (para la tabla de admin) """
-        insumos = Insumo.objects.all().order_by('nombre')
-        serializer = InsumoSerializer(insumos, many=True)
-        return Response(serializer.data)
+        return respuesta_catalogo(request, lectura_rapida.insumos)
 
     def post(self, request, *args, **kwargs):
         """ Crea un nuevo Insumo """
@@ -201,18 +653,48 @@ class AdminInsumoView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AdminInsumoImportarView(APIView):
+    """
+    Importación masiva de insumos desde CSV (codigo_producto, nombre, umbral_critico).
+    Endpoint: /api/inventory/admin/insumos/importar/
+    Acepta el CSV como cuerpo (Content-Type: text/csv) o como campo 'archivo'
+    de un multipart/form-data, y lo procesa en streaming (ver importacion.py).
+    ?solo_nuevos=1 informa los códigos existentes como error en vez de actualizarlos.
+    Devuelve el informe por fila; las filas inválidas no detienen la importación.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        if request.content_type.startswith('multipart/form-data'):
+            archivo = request.FILES.get('archivo')
+        else:
+            archivo = request.stream
+        if archivo is None:
+            return Response({"error": "Se requiere un archivo CSV."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            informe = importar_insumos(
+                codecs.iterdecode(archivo, 'utf-8-sig'),
+                solo_nuevos=request.query_params.get('solo_nuevos') in ('1', 'true'),
+            )
+        except UnicodeDecodeError:
+            return Response({"error": "El archivo debe estar codificado en UTF-8."}, status=status.HTTP_400_BAD_REQUEST)
+        except (ValueError, csv.Error) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(informe)
+
+
 class AdminServicioView(APIView):
     """
     API para que el Admin gestione Servicios (Crear y Listar)
     Endpoint: /api/inventory/admin/servicios/
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
 
     def get(self, request, *args, **kwargs):
         """ Devuelve la lista de servicios (para la tabla de admin) """
-        servicios = Servicio.objects.all().order_by('nombre')
-        serializer = ServicioSerializer(servicios, many=True)
-        return Response(serializer.data)
+        return respuesta_catalogo(request, lectura_rapida.servicios)
 
     def post(self, request, *args, **kwargs):
         """ Crea un nuevo Servicio """
@@ -223,6 +705,20 @@ class AdminServicioView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# =============================================
+# MÉTRICAS (Prometheus)
+# =============================================
+def metricas_prometheus(request):
+    """
+    Métricas de este proceso en el formato de texto de Prometheus (ver metricas.py).
+    Endpoint: /metrics
+    """
+    if settings.METRICAS_TOKEN and not constant_time_compare(
+        request.headers.get('Authorization', ''), f"Bearer {settings.METRICAS_TOKEN}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # =============================================
 # ¡VISTA DE LOGIN PERSONALIZADA!
 # =============================================
@@ -257,12 +753,18 @@ class AdminUserView(generics.ListCreateAPIView):
     API para que el Admin LISTE y CREE usuarios.
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
+    renderer_classes = RENDERERS_LECTURA_RAPIDA
     queryset = User.objects.all().order_by('username')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return UserCreateAdminSerializer
-        return UserSerializer
+        return UserAdminSerializer
+
+    def list(self, request, *args, **kwargs):
+        return respuesta_catalogo(
+            request, lambda: lectura_rapida.usuarios(self.get_queryset(), lectura_rapida.CAMPOS_USUARIO_ADMIN)
+        )
 
 class AdminUserDetailView(generics.UpdateAPIView):
     """
@@ -0,0 +1,111 @@
+"""
+Versiones async de los endpoints de lectura más usados (insumos, servicios,
+lotes y reporte de movimientos), con el ORM async de Django.
+
+Solo se enrutan bajo ASGI (gestinvlab_project/asgi.py usa urls_asgi.py):
+ahí la vista no pasa entera por sync_to_async como las de DRF. Las consultas
+del ORM async siguen corriendo en el pool de hilos de asgiref (Django no tiene
+drivers async), pero cada una ocupa un hilo solo mientras dura. Bajo WSGI se
+siguen usando las vistas de views.py. Las respuestas son idénticas byte a byte.
+
+La autenticación, los permisos y los throttles no se reimplementan: son los de
+la vista equivalente de views.py, corridos por DRF (ver acceso()). Los métodos
+que no son GET ni HEAD los atiende esa vista completa (OPTIONS, 405).
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import ValidationError
+
+from . import lectura_rapida
+from .archivo import atablas_para
+from .cache import arespuesta_catalogo
+from .models import Insumo, Servicio
+from .pagination import MovimientoKeysetPagination
+from .renderers import renderizar_json
+from .views import (
+    InsumoListView, LoteListView, ReporteMovimientosView, ServicioListView, filtrar_movimientos, inicio_de_reporte,
+)
+
+
+def respuesta_json(data, status=200, headers=None):
+    return HttpResponse(renderizar_json(data), content_type='application/json', status=status, headers=headers)
+
+
+def acceso(clase, request, *args, **kwargs):
+    """
+    Lo que APIView.dispatch() hace antes de llamar a get() en la vista DRF
+    'clase': autenticación, permisos, throttles y negociación de contenido.
+    Devuelve (usuario, None) si la vista async puede atender la petición, o
+    (None, respuesta ya renderizada) con el error de DRF. Los métodos que no
+    son GET ni HEAD se despachan a la vista DRF completa.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None, clase.as_view()(request, *args, **kwargs).render()
+
+    vista = clase()
+    vista.setup(request, *args, **kwargs)
+    vista.headers = vista.default_response_headers
+    drf_request = vista.request = vista.initialize_request(request, *args, **kwargs)
+    try:
+        vista.initial(drf_request, *args, **kwargs)
+        return drf_request.user, None
+    except Exception as exc:
+        respuesta = vista.handle_exception(exc)
+    return None, vista.finalize_response(drf_request, respuesta, *args, **kwargs).render()
+
+
+def requiere_autenticacion(clase):
+    """ La vista async atiende lo que 'clase' (su equivalente en views.py) atendería con get() """
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            usuario, respuesta = await sync_to_async(acceso)(clase, request, *args, **kwargs)
+            if usuario is None:
+                return respuesta
+            request.user = usuario
+            return await vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+@requiere_autenticacion(InsumoListView)
+async def insumo_list(request):
+    async def construir():
+        return [fila async for fila in Insumo.objects.order_by('nombre').values(*lectura_rapida.CAMPOS_INSUMO)]
+    return await arespuesta_catalogo(request, construir)
+
+
+@requiere_autenticacion(ServicioListView)
+async def servicio_list(request):
+    async def construir():
+        return [fila async for fila in Servicio.objects.order_by('nombre').values(*lectura_rapida.CAMPOS_SERVICIO)]
+    return await arespuesta_catalogo(request, construir)
+
+
+@requiere_autenticacion(LoteListView)
+async def lote_list(request):
+    insumo_id = request.GET.get('insumo_id', None)
+    if not insumo_id:
+        return respuesta_json({"error": "Se requiere el parámetro 'insumo_id'."}, status=400)
+    filas = [fila async for fila in lectura_rapida.consulta_lotes(insumo_id)]
+    return respuesta_json(lectura_rapida.armar_lotes(filas))
+
+
+@requiere_autenticacion(ReporteMovimientosView)
+async def reporte_movimientos(request):
+    querysets = [
+        lectura_rapida.movimientos_reporte(filtrar_movimientos(movimientos.objects.all(), request.GET))
+        for movimientos, _ in await atablas_para(inicio_de_reporte(request.GET))
+    ]
+
+    paginator = MovimientoKeysetPagination()
+    try:
+        page = await paginator.apaginate_querysets(querysets, request)
+    except ValidationError as e:
+        return respuesta_json(e.detail, status=400)
+    return respuesta_json({
+        'next_cursor': paginator.next_cursor,
+        'results': await lectura_rapida.areporte(page),
+    })
@@ -2,7 +2,11 @@
 const API_URL = "http://127.0.0.1:8000";
 
 let currentMovementItems = [];
-let currentReportData = []; // Para exportar CSV
+let currentReportData = []; // Movimientos cargados del reporte actual
+let currentReportQuery = "";  // Filtros del reporte actual
+let currentReportCursor = null; // Cursor de la página siguiente (null = no hay más)
+let stockInsumos = new Map(); // Insumos de la tabla de stock, por id
+let stockToken = null; // Token de la última sincronización (changes/?since=)
 
 // =============================================
 // HELPERS (Funciones de Ayuda)
@@ -150,6 +154,9 @@ function initIndexPage() {
     loadSalidaModule();
     loadReportesModule();
     loadAdministrarModule(); 
+
+    // 7. Todos los catálogos de la página (stock, selects y tablas de admin) en una sola llamada
+    loadCatalogos();
 }
 
 function showModule(moduleIdToShow) {
@@ -170,16 +177,41 @@ function showModule(moduleIdToShow) {
         document.getElementById("entrada-fecha-display").value = fechaFormateada;
         renderEntradaTable();
     } else if (moduleIdToShow === 'stock-module') {
-        fetchInsumos();
+        sincronizarInsumos();
     } else if (moduleIdToShow === 'salida-module') {
         document.getElementById("salida-fecha-display").value = fechaFormateada;
         document.getElementById("salida-servicio-display").value = ""; 
         renderSalidaTable();
-        fetchServiciosForSelect("salida-servicio-select");
-    } else if (moduleIdToShow === 'reportes-module') {
-        loadReportFilters();
-    } else if (moduleIdToShow === 'administrar-module') {
-        loadAdminTables();
+    } else if (moduleIdToShow === 'reportes-module' || moduleIdToShow === 'administrar-module') {
+        loadCatalogos();
+    }
+}
+
+// =============================================
+// CATÁLOGOS (una sola llamada: /api/inventory/arranque/)
+// =============================================
+
+// Carga insumos, servicios y usuarios (y la vista de admin si es staff) y llena
+// la tabla de stock, todos los selects y las tablas de administración.
+async function loadCatalogos() {
+    try {
+        const response = await apiFetch("/api/inventory/arranque/");
+        if (!response.ok) { throw new Error("No se pudieron cargar los catálogos."); }
+        const catalogos = await response.json();
+
+        guardarStockInsumos(catalogos.insumos, catalogos.token);
+        ["entrada-insumo-select", "salida-insumo-select", "report-insumo"].forEach(selectId => {
+            fillInsumosSelect(selectId, catalogos.insumos);
+        });
+        ["salida-servicio-select", "report-servicio"].forEach(selectId => {
+            fillServiciosSelect(selectId, catalogos.servicios);
+        });
+        fillUsersSelect("report-usuario", catalogos.usuarios);
+        if (catalogos.admin_usuarios) {
+            renderAdminTables(catalogos);
+        }
+    } catch (error) {
+        console.error(error);
     }
 }
 
@@ -189,7 +221,6 @@ function showModule(moduleIdToShow) {
 
 function loadStockModule() {
     document.getElementById("refresh-stock-btn").addEventListener("click", fetchInsumos);
-    fetchInsumos();
 }
 
 async function fetchInsumos() {
@@ -199,13 +230,46 @@ async function fetchInsumos() {
         const response = await apiFetch("/api/inventory/insumos/");
         if (!response.ok) { throw new Error("No se pudieron cargar los insumos."); }
         const insumos = await response.json();
-        renderInsumosTable(insumos);
+        guardarStockInsumos(insumos, stockToken);
     } catch (error) {
         console.error(error);
         tableBody.innerHTML = `<tr><td colspan="4" class="text-center text-danger">${error.message}</td></tr>`;
     }
 }
 
+// Reemplaza los insumos en memoria y dibuja la tabla de stock
+function guardarStockInsumos(insumos, token) {
+    stockInsumos = new Map(insumos.map(insumo => [insumo.id, insumo]));
+    stockToken = token;
+    renderStockInsumos();
+}
+
+function renderStockInsumos() {
+    const insumos = [...stockInsumos.values()].sort((a, b) => a.nombre.localeCompare(b.nombre));
+    renderInsumosTable(insumos);
+}
+
+// Trae solo los insumos modificados desde la última sincronización y los
+// combina con los que ya están en memoria (en vez de descargar todo el catálogo)
+async function sincronizarInsumos() {
+    if (stockToken === null) {
+        return fetchInsumos();
+    }
+    try {
+        const response = await apiFetch(`/api/inventory/changes/?since=${encodeURIComponent(stockToken)}`);
+        if (!response.ok) { throw new Error("No se pudieron sincronizar los insumos."); }
+        const cambios = await response.json();
+        cambios.insumos.forEach(insumo => stockInsumos.set(insumo.id, insumo));
+        stockToken = cambios.token;
+        if (cambios.insumos.length > 0) {
+            renderStockInsumos();
+        }
+    } catch (error) {
+        console.error(error);
+        fetchInsumos();
+    }
+}
+
 function renderInsumosTable(insumos) {
     const tableBody = document.getElementById("stock-table-body");
     tableBody.innerHTML = ""; 
@@ -300,31 +364,56 @@ function renderLotesTable(lotes) {
 // =============================================
 
 function loadEntradaModule() {
-    fetchInsumosForSelect("entrada-insumo-select");
     document.getElementById("entrada-add-item-form").addEventListener("submit", (e) => {
         e.preventDefault();
         handleEntradaAddItem();
     });
     document.getElementById("registrar-entrada-btn").addEventListener("click", handleRegistrarEntrada);
+    initInsumoSearch("entrada-insumo-buscar", "entrada-insumo-select");
+}
+
+// Filtra un select de insumos con la búsqueda del servidor (/insumos/buscar/) mientras se escribe.
+// Con el campo vacío vuelve a la lista completa que ya está en memoria.
+function initInsumoSearch(inputId, selectId) {
+    const input = document.getElementById(inputId);
+    let timer = null;
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+            const texto = input.value.trim();
+            if (!texto) {
+                fillInsumosSelect(selectId, [...stockInsumos.values()].sort((a, b) => a.nombre.localeCompare(b.nombre)));
+                return;
+            }
+            try {
+                const response = await apiFetch(`/api/inventory/insumos/buscar/?q=${encodeURIComponent(texto)}&limite=20`);
+                if (!response.ok) { throw new Error("Error al buscar insumos"); }
+                const insumos = await response.json();
+                if (input.value.trim() !== texto) { return; } // Llegó tarde: ya se escribió otra cosa
+                fillInsumosSelect(selectId, insumos);
+                if (insumos.length === 1) {
+                    const select = document.getElementById(selectId);
+                    select.value = insumos[0].id;
+                    select.dispatchEvent(new Event("change"));
+                }
+            } catch (error) {
+                console.error(error);
+            }
+        }, 250);
+    });
 }
 
-async function fetchInsumosForSelect(selectId) {
+function fillInsumosSelect(selectId, insumos) {
     const select = document.getElementById(selectId);
-    try {
-        const response = await apiFetch("/api/inventory/insumos/");
-        if (!response.ok) { throw new Error("Error al cargar insumos"); }
-        const insumos = await response.json();
-        select.innerHTML = '<option value="">-- Seleccione un insumo --</option>';
-        insumos.forEach(insumo => {
-            const option = document.createElement("option");
-            option.value = insumo.id;
-            option.textContent = `${insumo.nombre} (${insumo.codigo_producto || 'N/A'})`;
-            select.appendChild(option);
-        });
-    } catch (error) {
-        console.error(error);
-        select.innerHTML = '<option value="">Error al cargar insumos</option>';
-    }
+    const seleccionado = select.value;
+    select.innerHTML = '<option value="">-- Seleccione un insumo --</option>';
+    insumos.forEach(insumo => {
+        const option = document.createElement("option");
+        option.value = insumo.id;
+        option.textContent = `${insumo.nombre} (${insumo.codigo_producto || 'N/A'})`;
+        select.appendChild(option);
+    });
+    select.value = seleccionado;
 }
 
 function handleEntradaAddItem() {
@@ -416,7 +505,7 @@ async function handleRegistrarEntrada() {
         alertBox.className = "alert alert-success mt-3";
         currentMovementItems = [];
         renderEntradaTable();
-        fetchInsumos(); 
+        sincronizarInsumos(); 
     } catch (error) {
         console.error(error);
         alertBox.textContent = `Error al registrar: ${error.message}`;
@@ -432,8 +521,7 @@ async function handleRegistrarEntrada() {
 // =============================================
 
 function loadSalidaModule() {
-    fetchInsumosForSelect("salida-insumo-select");
-    fetchServiciosForSelect("salida-servicio-select");
+    initInsumoSearch("salida-insumo-buscar", "salida-insumo-select");
     document.getElementById("salida-servicio-select").addEventListener("change", (e) => {
         const serviceDisplay = document.getElementById("salida-servicio-display");
         serviceDisplay.value = e.target.value ? e.target.options[e.target.selectedIndex].text : "";
@@ -452,23 +540,17 @@ function loadSalidaModule() {
     document.getElementById("registrar-salida-btn").addEventListener("click", handleRegistrarSalida);
 }
 
-async function fetchServiciosForSelect(selectId) {
+function fillServiciosSelect(selectId, servicios) {
     const select = document.getElementById(selectId);
-    try {
-        const response = await apiFetch("/api/inventory/servicios/");
-        if (!response.ok) { throw new Error("Error al cargar servicios"); }
-        const servicios = await response.json();
-        select.innerHTML = '<option value="">-- Seleccione un servicio --</option>';
-        servicios.forEach(servicio => {
-            const option = document.createElement("option");
-            option.value = servicio.id;
-            option.textContent = servicio.nombre;
-            select.appendChild(option);
-        });
-    } catch (error) {
-        console.error(error);
-        select.innerHTML = '<option value="">Error al cargar servicios</option>';
-    }
+    const seleccionado = select.value;
+    select.innerHTML = '<option value="">-- Seleccione un servicio --</option>';
+    servicios.forEach(servicio => {
+        const option = document.createElement("option");
+        option.value = servicio.id;
+        option.textContent = servicio.nombre;
+        select.appendChild(option);
+    });
+    select.value = seleccionado;
 }
 
 async function fetchLotesForSelect(insumoId) {
@@ -487,6 +569,18 @@ async function fetchLotesForSelect(insumoId) {
             return;
         }
         select.innerHTML = '<option value="">-- Seleccione un lote --</option>';
+        // Opción FEFO: el servidor reparte la cantidad desde el lote que caduca antes
+        const hoy = new Date().toISOString().slice(0, 10);
+        const stockVigente = lotesConStock
+            .filter(lote => !lote.fecha_caducidad || lote.fecha_caducidad >= hoy)
+            .reduce((total, lote) => total + lote.stock_por_lote, 0);
+        if (stockVigente > 0) {
+            const fefoOption = document.createElement("option");
+            fefoOption.value = "fefo";
+            fefoOption.dataset.stock = stockVigente;
+            fefoOption.textContent = `Automático: primero el que caduca antes (Stock vigente: ${stockVigente})`;
+            select.appendChild(fefoOption);
+        }
         lotesConStock.forEach(lote => {
             const option = document.createElement("option");
             option.value = lote.id;
@@ -526,7 +620,7 @@ function handleSalidaAddItem() {
         alert(`Stock insuficiente. El lote seleccionado solo tiene ${maxStock} unidades.`);
         return;
     }
-    const yaExiste = currentMovementItems.some(item => item.loteId == loteSelect.value);
+    const yaExiste = currentMovementItems.some(item => item.loteId == loteSelect.value && item.insumoId == insumoSelect.value);
     if (yaExiste) {
         alert("Este lote ya ha sido añadido al detalle. Puede borrarlo y volver a añadirlo si desea cambiar la cantidad.");
         return;
@@ -534,8 +628,9 @@ function handleSalidaAddItem() {
     const newItem = {
         tempId: Date.now(),
         loteId: loteSelect.value,
+        insumoId: insumoSelect.value,
         insumoNombre: insumoSelect.options[insumoSelect.selectedIndex].text.split('(')[0].trim(),
-        numeroLote: selectedLoteOption.text.split('(')[0].trim(),
+        numeroLote: loteSelect.value === "fefo" ? "Automático (FEFO)" : selectedLoteOption.text.split('(')[0].trim(),
         cantidad: cantidad,
         servicioNombre: servicioSelect.options[servicioSelect.selectedIndex].text 
     };
@@ -585,10 +680,11 @@ async function handleRegistrarSalida() {
     registerBtn.disabled = true;
     registerBtn.innerHTML = '<span class="spinner-border spinner-border-sm"></span> Registrando...';
     alertBox.classList.add("d-none"); 
-    const payloadDetalles = currentMovementItems.map(item => ({
-        lote: parseInt(item.loteId), 
-        cantidad: item.cantidad
-    }));
+    const payloadDetalles = currentMovementItems.map(item => (
+        item.loteId === "fefo"
+            ? { insumo_id: parseInt(item.insumoId), cantidad: item.cantidad }
+            : { lote: parseInt(item.loteId), cantidad: item.cantidad }
+    ));
     const payload = {
         servicio_destino: parseInt(servicioSelect.value),
         detalles: payloadDetalles
@@ -618,7 +714,7 @@ async function handleRegistrarSalida() {
         renderSalidaTable();
         document.getElementById("salida-servicio-select").value = "";
         document.getElementById("salida-servicio-display").value = ""; 
-        fetchInsumos(); 
+        sincronizarInsumos(); 
     } catch (error) {
         console.error(error);
         alertBox.textContent = `Error al registrar: ${error.message}`;
@@ -633,13 +729,7 @@ async function handleRegistrarSalida() {
 // MÓDULO DE REPORTES
 // =============================================
 
-let reportFiltersLoaded = false;
-
 function loadReportesModule() {
-    if (!reportFiltersLoaded) {
-        loadReportFilters();
-        reportFiltersLoaded = true;
-    }
     document.getElementById("report-form").addEventListener("submit", (e) => {
         e.preventDefault();
         handleGenerateReport();
@@ -649,37 +739,27 @@ function loadReportesModule() {
         handleGenerateReport(); 
     });
     document.getElementById("report-download-csv-btn").addEventListener("click", exportReportToCSV);
+    document.getElementById("report-load-more-btn").addEventListener("click", () => fetchReportPage(true));
 }
 
-function loadReportFilters() {
-    fetchInsumosForSelect("report-insumo");
-    fetchServiciosForSelect("report-servicio");
-    fetchUsersForSelect("report-usuario");
-}
-
-async function fetchUsersForSelect(selectId) {
+function fillUsersSelect(selectId, usuarios) {
     const select = document.getElementById(selectId);
-    try {
-        const response = await apiFetch("/api/inventory/usuarios/"); 
-        if (!response.ok) { throw new Error("Error al cargar usuarios"); }
-        const usuarios = await response.json();
-        select.innerHTML = '<option value="">-- Todos los usuarios --</option>';
-        usuarios.forEach(user => {
-            const option = document.createElement("option");
-            option.value = user.id;
-            option.textContent = user.username;
-            select.appendChild(option);
-        });
-    } catch (error) {
-        console.error(error);
-        select.innerHTML = '<option value="">Error al cargar usuarios</option>';
-    }
+    const seleccionado = select.value;
+    select.innerHTML = '<option value="">-- Todos los usuarios --</option>';
+    usuarios.forEach(user => {
+        const option = document.createElement("option");
+        option.value = user.id;
+        option.textContent = user.username;
+        select.appendChild(option);
+    });
+    select.value = seleccionado;
 }
 
 async function handleGenerateReport() {
     const tableBody = document.getElementById("report-table-body");
     tableBody.innerHTML = `<tr><td colspan="8" class="text-center p-4"><div class="spinner-border" role="status"></div></td></tr>`;
     currentReportData = []; // Limpiar datos anteriores
+    currentReportCursor = null;
 
     const params = new URLSearchParams();
     const tipo = document.getElementById("report-tipo").value;
@@ -696,27 +776,43 @@ async function handleGenerateReport() {
     if (fechaInicio) params.append('fecha_inicio', fechaInicio);
     if (fechaFin) params.append('fecha_fin', fechaFin);
 
-    const queryString = params.toString();
+    currentReportQuery = params.toString();
+    await fetchReportPage(false);
+}
+
+// Carga una página del reporte. Si append es true, continúa desde el cursor actual.
+async function fetchReportPage(append) {
+    const tableBody = document.getElementById("report-table-body");
+    const loadMoreBtn = document.getElementById("report-load-more-btn");
+    loadMoreBtn.disabled = true;
+
+    const params = new URLSearchParams(currentReportQuery);
+    if (append && currentReportCursor) params.append('cursor', currentReportCursor);
 
     try {
-        const response = await apiFetch(`/api/inventory/reportes/movimientos/?${queryString}`); 
+        const response = await apiFetch(`/api/inventory/reportes/movimientos/?${params.toString()}`); 
         if (!response.ok) { throw new Error("No se pudo generar el reporte."); }
         
-        const movimientos = await response.json();
-        currentReportData = movimientos;
-        renderReportTable(movimientos);
+        const data = await response.json();
+        currentReportData = currentReportData.concat(data.results);
+        currentReportCursor = data.next_cursor;
+        renderReportTable(data.results, append);
 
     } catch (error) {
         console.error(error);
+        currentReportCursor = null;
         tableBody.innerHTML = `<tr><td colspan="8" class="text-center text-danger">${error.message}</td></tr>`;
+    } finally {
+        loadMoreBtn.disabled = false;
+        loadMoreBtn.classList.toggle("d-none", !currentReportCursor);
     }
 }
 
-function renderReportTable(movimientos) {
+function renderReportTable(movimientos, append = false) {
     const tableBody = document.getElementById("report-table-body");
-    tableBody.innerHTML = "";
+    if (!append) tableBody.innerHTML = "";
 
-    if (movimientos.length === 0) {
+    if (movimientos.length === 0 && !append) {
         tableBody.innerHTML = `<tr><td colspan="8" class="text-center text-muted p-4">No se encontraron movimientos con esos filtros.</td></tr>`;
         return;
     }
@@ -754,63 +850,46 @@ function renderReportTable(movimientos) {
     });
 }
 
-function exportReportToCSV() {
+// El CSV se genera en el servidor (en streaming) con los mismos filtros del reporte
+async function exportReportToCSV() {
     if (currentReportData.length === 0) {
         alert("Por favor, genere un reporte primero antes de exportar.");
         return;
     }
 
-    const headers = [
-        "Fecha", "Documento", "Tipo", "Insumo", 
-        "Lote", "Cantidad", "Destino", "Usuario"
-    ];
-    let csvContent = headers.join(",") + "\r\n"; 
-
-    const escapeCSV = (str) => `"${String(str || '').replace(/"/g, '""')}"`;
+    const exportBtn = document.getElementById("report-download-csv-btn");
+    const originalHtml = exportBtn.innerHTML;
+    exportBtn.disabled = true;
+    exportBtn.innerHTML = '<span class="spinner-border spinner-border-sm"></span> Exportando...';
 
-    currentReportData.forEach(mov => {
-        const fecha = new Date(mov.fecha_registro).toLocaleString("es-CL");
-        const doc = mov.numero_documento;
-        const tipo = mov.tipo_movimiento;
-        const destino = mov.servicio_destino || 'N/A';
-        const usuario = mov.usuario;
+    const params = new URLSearchParams(currentReportQuery);
+    params.append('formato', 'csv');
 
-        if (mov.detalles.length === 0) {
-            const row = [
-                fecha, doc, tipo, "N/A", "N/A", 0, destino, usuario
-            ].map(escapeCSV).join(",");
-            csvContent += row + "\r\n";
+    try {
+        const response = await apiFetch(`/api/inventory/reportes/movimientos/exportar/?${params.toString()}`);
+        if (!response.ok) { throw new Error("No se pudo exportar el reporte."); }
+        const blob = await response.blob();
+
+        // ---  Para la descarga ---
+        const link = document.createElement("a");
+        if (link.download !== undefined) { 
+            const url = URL.createObjectURL(blob);
+            link.setAttribute("href", url);
+            link.setAttribute("download", "reporte_inventario.csv");
+            link.style.visibility = 'hidden';
+            document.body.appendChild(link);
+            link.click();
+            document.body.removeChild(link);
+            URL.revokeObjectURL(url);
         } else {
-            mov.detalles.forEach(detalle => {
-                const row = [
-                    fecha,
-                    doc,
-                    tipo,
-                    detalle.insumo_nombre,
-                    detalle.lote_numero,
-                    detalle.cantidad,
-                    destino,
-                    usuario
-                ].map(escapeCSV).join(",");
-                csvContent += row + "\r\n";
-            });
+            alert("Tu navegador no soporta la descarga de archivos CSV. Por favor, actualízalo.");
         }
-    });
-
-    // ---  Para la descarga ---
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement("a");
-    
-    if (link.download !== undefined) { 
-        const url = URL.createObjectURL(blob);
-        link.setAttribute("href", url);
-        link.setAttribute("download", "reporte_inventario.csv");
-        link.style.visibility = 'hidden';
-        document.body.appendChild(link);
-        link.click();
-        document.body.removeChild(link);
-    } else {
-        alert("Tu navegador no soporta la descarga de archivos CSV. Por favor, actualízalo.");
+    } catch (error) {
+        console.error(error);
+        alert(`Error al exportar: ${error.message}`);
+    } finally {
+        exportBtn.disabled = false;
+        exportBtn.innerHTML = originalHtml;
     }
 }
 
@@ -822,76 +901,55 @@ function exportReportToCSV() {
 function loadAdministrarModule() {
     // Conectar los formularios
     document.getElementById("admin-create-insumo-form").addEventListener("submit", handleCreateInsumo);
+    document.getElementById("admin-import-insumos-form").addEventListener("submit", handleImportInsumos);
     document.getElementById("admin-create-servicio-form").addEventListener("submit", handleCreateServicio);
     document.getElementById("admin-create-user-form").addEventListener("submit", handleCreateUsuario);
 }
 
-// Carga las 3 tablas de la derecha (Insumos, Servicios, Usuarios)
-async function loadAdminTables() {
+// Dibuja las 3 tablas de la derecha (Insumos, Servicios, Usuarios) con los datos de loadCatalogos
+function renderAdminTables(catalogos) {
     
-    // --- 1. Cargar Insumos ---
+    // --- 1. Insumos ---
     const insumosTable = document.getElementById("admin-insumos-table");
-    insumosTable.innerHTML = `<tr><td colspan="4" class="text-center">Cargando...</td></tr>`;
-    try {
-        const response = await apiFetch("/api/inventory/admin/insumos/");
-        const insumos = await response.json();
-        insumosTable.innerHTML = "";
-        if (insumos.length === 0) {
-            insumosTable.innerHTML = `<tr><td colspan="4">No hay insumos creados.</td></tr>`;
-        }
-        insumos.forEach(insumo => {
-            const row = document.createElement("tr");
-            row.innerHTML = `
-                <td>${insumo.nombre}</td>
-                <td>${insumo.codigo_producto}</td>
-                <td>
-                    <input type="number" class="form-control form-control-sm" 
-                           id="umbral-input-${insumo.id}" 
-                           value="${insumo.umbral_critico}" 
-                           style="width: 100px;">
-                </td>
-                <td>
-                    <button class="btn btn-sm btn-outline-success" 
-                            onclick="handleUpdateUmbral(${insumo.id}, this)">
-                        <i class="bi bi-save"></i>
-                    </button>
-                </td>
-            `;
-            insumosTable.appendChild(row);
-        });
-    } catch (error) {
-        insumosTable.innerHTML = `<tr><td colspan="4" class="text-danger">Error al cargar insumos.</td></tr>`;
+    insumosTable.innerHTML = "";
+    if (catalogos.insumos.length === 0) {
+        insumosTable.innerHTML = `<tr><td colspan="4">No hay insumos creados.</td></tr>`;
     }
+    catalogos.insumos.forEach(insumo => {
+        const row = document.createElement("tr");
+        row.innerHTML = `
+            <td>${insumo.nombre}</td>
+            <td>${insumo.codigo_producto}</td>
+            <td>
+                <input type="number" class="form-control form-control-sm" 
+                       id="umbral-input-${insumo.id}" 
+                       value="${insumo.umbral_critico}" 
+                       style="width: 100px;">
+            </td>
+            <td>
+                <button class="btn btn-sm btn-outline-success" 
+                        onclick="handleUpdateUmbral(${insumo.id}, this)">
+                    <i class="bi bi-save"></i>
+                </button>
+            </td>
+        `;
+        insumosTable.appendChild(row);
+    });
 
-    // --- 2. Cargar Servicios ---
+    // --- 2. Servicios ---
     const serviciosTable = document.getElementById("admin-servicios-table");
-    serviciosTable.innerHTML = `<tr><td>Cargando...</td></tr>`;
-    try {
-        const response = await apiFetch("/api/inventory/admin/servicios/");
-        const servicios = await response.json();
-        serviciosTable.innerHTML = "";
-        if (servicios.length === 0) {
-            serviciosTable.innerHTML = `<tr><td>No hay servicios creados.</td></tr>`;
-        }
-        servicios.forEach(servicio => {
-            const row = document.createElement("tr");
-            row.innerHTML = `<td>${servicio.nombre}</td>`;
-            serviciosTable.appendChild(row);
-        });
-    } catch (error) {
-        serviciosTable.innerHTML = `<tr><td class="text-danger">Error al cargar servicios.</td></tr>`;
+    serviciosTable.innerHTML = "";
+    if (catalogos.servicios.length === 0) {
+        serviciosTable.innerHTML = `<tr><td>No hay servicios creados.</td></tr>`;
     }
+    catalogos.servicios.forEach(servicio => {
+        const row = document.createElement("tr");
+        row.innerHTML = `<td>${servicio.nombre}</td>`;
+        serviciosTable.appendChild(row);
+    });
     
-    // --- 3. Cargar Usuarios ---
-    const usuariosTable = document.getElementById("admin-usuarios-table");
-    usuariosTable.innerHTML = `<tr><td colspan="3" class="text-center">Cargando...</td></tr>`;
-    try {
-        const response = await apiFetch("/api/inventory/admin/usuarios/");
-        const usuarios = await response.json();
-        renderAdminUsuariosTable(usuarios);
-    } catch (error) {
-        usuariosTable.innerHTML = `<tr><td colspan="3" class="text-danger">Error al cargar usuarios.</td></tr>`;
-    }
+    // --- 3. Usuarios ---
+    renderAdminUsuariosTable(catalogos.admin_usuarios);
 }
 
 // Lógica para crear un nuevo Insumo
@@ -924,10 +982,46 @@ async function handleCreateInsumo(e) {
         alertBox.className = "alert alert-success mt-3";
         
         document.getElementById("admin-create-insumo-form").reset();
-        loadAdminTables(); 
-        fetchInsumosForSelect("entrada-insumo-select"); 
-        fetchInsumosForSelect("salida-insumo-select"); 
-        fetchInsumosForSelect("report-insumo"); 
+        loadCatalogos(); 
+
+    } catch (error) {
+        alertBox.textContent = `Error: ${error.message}`;
+        alertBox.className = "alert alert-danger mt-3";
+    }
+}
+
+// Importación masiva de insumos desde un CSV
+async function handleImportInsumos(e) {
+    e.preventDefault();
+    const archivo = document.getElementById("admin-insumos-csv").files[0];
+    const alertBox = document.getElementById("admin-import-alert");
+    alertBox.classList.add("d-none");
+    if (!archivo) return;
+
+    try {
+        const response = await apiFetch("/api/inventory/admin/insumos/importar/", {
+            method: "POST",
+            headers: { "Content-Type": "text/csv" },
+            body: archivo
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || JSON.stringify(data));
+        }
+
+        let mensaje = `${data.procesadas} fila(s): ${data.creados} creado(s), ${data.actualizados} actualizado(s).`;
+        if (data.errores.length > 0) {
+            const detalle = data.errores.slice(0, 10)
+                .map(error => `<li>Fila ${error.fila} (${error.codigo_producto || "sin código"}): ${error.errores.join(" ")}</li>`)
+                .join("");
+            const resto = data.errores.length > 10 ? `<li>... y ${data.errores.length - 10} más.</li>` : "";
+            mensaje += ` ${data.errores.length} fila(s) con errores:<ul class="mb-0">${detalle}${resto}</ul>`;
+        }
+        alertBox.innerHTML = mensaje;
+        alertBox.className = `alert ${data.errores.length > 0 ? "alert-warning" : "alert-success"} mt-3`;
+
+        document.getElementById("admin-import-insumos-form").reset();
+        loadCatalogos();
 
     } catch (error) {
         alertBox.textContent = `Error: ${error.message}`;
@@ -959,9 +1053,7 @@ async function handleCreateServicio(e) {
         alertBox.className = "alert alert-success mt-3";
 
         document.getElementById("admin-create-servicio-form").reset();
-        loadAdminTables(); // Refrescar la tabla de servicios
-        fetchServiciosForSelect("salida-servicio-select"); 
-        fetchServiciosForSelect("report-servicio"); 
+        loadCatalogos(); // Refrescar la tabla y los selects de servicios
         
     } catch (error) {
         alertBox.textContent = `Error: ${error.message}`;
@@ -1040,8 +1132,7 @@ async function handleCreateUsuario(e) {
         alertBox.className = "alert alert-success mt-3";
         
         document.getElementById("admin-create-user-form").reset();
-        loadAdminTables(); // Refrescar la tabla de usuarios
-        fetchUsersForSelect("report-usuario"); 
+        loadCatalogos(); // Refrescar la tabla y el select de usuarios
 
     } catch (error) {
         alertBox.textContent = `Error: ${error.message}`;
@@ -1112,6 +1203,6 @@ async function handleUpdateUserStatus(userId, field, isChecked) {
     } catch (error) {
         alert(`Error al actualizar el usuario: ${error.message}`);
         
-        loadAdminTables(); 
+        loadCatalogos(); 
     }
 }
\ No newline at end of file